@@ -0,0 +1,273 @@
+"""
+Benchmarks the value converters and schema accessors against an in-memory SQLite database and writes the
+results as JSON so that runs can be compared between versions:
+
+    python benchmark.py --output results.json
+    python benchmark.py --compare results.json
+
+Each result is the best time in microseconds of a single operation over several repeats.
+"""
+import json
+import os
+import platform
+import sys
+import timeit
+from argparse import ArgumentParser
+from datetime import datetime
+
+# Benchmarks run offline against SQLite unless database settings are given
+os.environ.setdefault('DB_SETTINGS', json.dumps({'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}))
+
+from settings import configure_settings  # noqa
+
+configure_settings()
+
+import django  # noqa
+
+django.setup()
+
+from django.core.management import call_command  # noqa
+from django.db import connection, transaction  # noqa
+
+from data_schema import __version__  # noqa
+from data_schema.convert_value import FIELD_SCHEMA_CONVERTERS  # noqa
+from data_schema.field_schema_type import FieldSchemaType  # noqa
+from data_schema.models import DataSchema, FieldOption, FieldSchema  # noqa
+
+
+# Inputs of each converter by kind of input. Each input is a tuple of a value, a format and a default value
+CONVERTER_INPUTS = {
+    FieldSchemaType.DATE: {
+        'clean': ('2020-01-02', None, None),
+        'formatted': ('01/02/2020', '%m/%d/%Y', None),
+        'dirty': ('Jan 2nd, 2020', None, None),
+        'timestamp': (1577923200, None, None),
+        'blank': ('', None, None),
+        'none': (None, None, None),
+        'default': (None, None, '2020-01-02'),
+    },
+    FieldSchemaType.DATETIME: {
+        'clean': ('2020-01-02T03:04:05', None, None),
+        'formatted': ('2020-01-02 03:04:05', '%Y-%m-%d %H:%M:%S', None),
+        'dirty': ('Thursday, Jan 2nd, 2020 3:04am', None, None),
+        'timestamp': (1577934245.5, None, None),
+        'blank': ('', None, None),
+        'none': (None, None, None),
+        'default': (None, None, '2020-01-02T03:04:05'),
+    },
+    FieldSchemaType.DATE_FLOORED: {
+        'clean': ('2020-01-02T03:04:05', None, None),
+        'dirty': ('Thursday, Jan 2nd, 2020 3:04am', None, None),
+        'blank': ('', None, None),
+        'none': (None, None, None),
+        'default': (None, None, '2020-01-02'),
+    },
+    FieldSchemaType.INT: {
+        'clean': ('12345', None, None),
+        'native': (12345, None, None),
+        'dirty': ('$12,345', None, None),
+        'blank': ('', None, None),
+        'none': (None, None, None),
+        'default': (None, None, '7'),
+    },
+    FieldSchemaType.FLOAT: {
+        'clean': ('12345.67', None, None),
+        'native': (12345.67, None, None),
+        'dirty': ('$12,345.67', None, None),
+        'blank': ('', None, None),
+        'none': (None, None, None),
+        'default': (None, None, '7.5'),
+    },
+    FieldSchemaType.STRING: {
+        'clean': ('hello world', None, None),
+        'formatted': ('abc-123-def', r'\d+', None),
+        'dirty': ('  hello world  ', None, None),
+        'blank': ('', None, None),
+        'none': (None, None, None),
+        'default': (None, None, 'hello'),
+    },
+    FieldSchemaType.BOOLEAN: {
+        'clean': (True, None, None),
+        'dirty': ('1', None, None),
+        'blank': ('', None, None),
+        'none': (None, None, None),
+        'default': (None, None, False),
+    },
+    FieldSchemaType.DURATION: {
+        'clean': (3600, None, None),
+        'dirty': ('1:02:03', None, None),
+        'blank': ('', None, None),
+        'none': (None, None, None),
+        'default': (None, None, 60),
+    },
+}
+
+# The numbers of fields that DataSchema.update is benchmarked with
+UPDATE_FIELD_COUNTS = (10, 100, 1000)
+
+
+def time_operation(func, number, repeat):
+    """
+    Returns the best time in microseconds of a single call of the function.
+    """
+    return min(timeit.Timer(func).repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def benchmark_converters(number, repeat):
+    results = {}
+    for field_schema_type, converter in sorted(FIELD_SCHEMA_CONVERTERS.items()):
+        for kind, (value, format_str, default_value) in CONVERTER_INPUTS[field_schema_type].items():
+            results['convert_value.{0}.{1}'.format(field_schema_type, kind)] = time_operation(
+                lambda: converter(value, format_str, default_value), number, repeat)
+    return results
+
+
+def create_accessor_schema():
+    """
+    Creates a schema that can read the attributes of field schemas, so that model instances can be read.
+    """
+    data_schema = DataSchema.objects.create()
+    FieldSchema.objects.create(
+        data_schema=data_schema, field_key='field_key', field_position=0, field_type=FieldSchemaType.STRING)
+    FieldSchema.objects.create(
+        data_schema=data_schema, field_key='field_position', field_position=1, field_type=FieldSchemaType.INT)
+    FieldSchema.objects.create(
+        data_schema=data_schema, field_key='display_name', field_position=2, field_type=FieldSchemaType.STRING,
+        default_value='unknown')
+    return DataSchema.objects.get(id=data_schema.id)
+
+
+def benchmark_accessors(number, repeat):
+    data_schema = create_accessor_schema()
+    rows = {
+        'dict': {'field_key': 'email', 'field_position': '3', 'display_name': None},
+        'list': ['email', '3', None],
+        'model': FieldSchema(field_key='email', field_position=3, display_name=None),
+    }
+
+    results = {}
+    for kind, row in rows.items():
+        results['get_value.{0}'.format(kind)] = time_operation(
+            lambda: data_schema.get_value(row, 'field_position'), number, repeat)
+    return results
+
+
+def benchmark_set_value(number, repeat):
+    data_schema = DataSchema.objects.create()
+    field_schema = FieldSchema.objects.create(
+        data_schema=data_schema, field_key='status', field_type=FieldSchemaType.STRING, has_options=True)
+    FieldOption.objects.bulk_create([
+        FieldOption(field_schema=field_schema, value='status{0}'.format(i)) for i in range(100)
+    ])
+    data_schema = DataSchema.objects.get(id=data_schema.id)
+
+    obj = {}
+    return {
+        'set_value.options': time_operation(lambda: data_schema.set_value(obj, 'status', 'status50'), number, repeat),
+    }
+
+
+def benchmark_lenient(number, repeat):
+    data_schema = DataSchema.objects.create()
+    for i, field_type in enumerate((FieldSchemaType.INT, FieldSchemaType.FLOAT, FieldSchemaType.DATETIME)):
+        FieldSchema.objects.create(
+            data_schema=data_schema, field_key='field{0}'.format(i), field_position=i, field_type=field_type)
+    data_schema = DataSchema.objects.get(id=data_schema.id)
+
+    # One in twenty rows has bad values
+    rows = [
+        ['1.2.3', '1.2.3', 'bad'] if i % 20 == 0 else [str(i), '{0}.5'.format(i), '2020-01-02T03:04:05']
+        for i in range(100)
+    ]
+    return {
+        'convert_rows_lenient.100_rows': time_operation(
+            lambda: data_schema.convert_rows_lenient(rows), max(number // 100, 1), repeat),
+    }
+
+
+def get_fieldschema_set(num_fields, display_name):
+    return [{
+        'field_key': 'field{0}'.format(i),
+        'display_name': display_name,
+        'field_type': FieldSchemaType.STRING,
+        'field_position': i,
+        'fieldoption_set': ['a', 'b'] if i % 10 == 0 else [],
+    } for i in range(num_fields)]
+
+
+def benchmark_update(repeat):
+    results = {}
+    for num_fields in UPDATE_FIELD_COUNTS:
+        data_schema = DataSchema.objects.create()
+        created = get_fieldschema_set(num_fields, 'created')
+        changed = get_fieldschema_set(num_fields, 'changed')
+
+        def update_changed():
+            # Alternate the templates so that every update changes every field
+            data_schema.update(fieldschema_set=created)
+            data_schema.update(fieldschema_set=changed)
+
+        results['update.{0}_fields.changed'.format(num_fields)] = time_operation(update_changed, 1, repeat) / 2
+        results['update.{0}_fields.unchanged'.format(num_fields)] = time_operation(
+            lambda: data_schema.update(fieldschema_set=changed), 1, repeat)
+    return results
+
+
+def run_benchmarks(number, repeat):
+    """
+    Runs all benchmarks in a transaction that is rolled back, and returns the results keyed by name.
+    """
+    results = {}
+    with transaction.atomic():
+        results.update(benchmark_converters(number, repeat))
+        results.update(benchmark_accessors(number, repeat))
+        results.update(benchmark_set_value(number, repeat))
+        results.update(benchmark_lenient(number, repeat))
+        results.update(benchmark_update(repeat))
+        transaction.set_rollback(True)
+    return results
+
+
+def compare(results, baseline):
+    """
+    Prints the relative change of each result to a baseline.
+    """
+    for name, microseconds in sorted(results.items()):
+        if name in baseline:
+            change = (microseconds - baseline[name]) / baseline[name] * 100
+            print('{0:50} {1:12.2f}us {2:+8.1f}%'.format(name, microseconds, change))
+        else:
+            print('{0:50} {1:12.2f}us'.format(name, microseconds))
+
+
+def main():
+    parser = ArgumentParser(description='Benchmarks the converters and schema accessors of django-data-schema')
+    parser.add_argument('--output', help='The file to write the JSON results to. Defaults to stdout')
+    parser.add_argument('--compare', help='A JSON results file of a previous run to compare against')
+    parser.add_argument('--number', type=int, default=1000, help='The number of calls of each timing')
+    parser.add_argument('--repeat', type=int, default=5, help='The number of timings of each benchmark')
+    args = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+    output = {
+        'version': __version__,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'created': datetime.utcnow().isoformat(),
+        'results': run_benchmarks(args.number, args.repeat),
+    }
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(output['results'], json.load(f)['results'])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2, sort_keys=True)
+    elif not args.compare:
+        json.dump(output, sys.stdout, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class DataSchemaConfig(AppConfig):
     name = 'data_schema'
     verbose_name = "Django Data Schema"
+
+    def ready(self):
+        from django.conf import settings
+
+        from data_schema import instrumentation
+        from data_schema.registry import connect_signals
+        connect_signals()
+
+        if getattr(settings, 'DATA_SCHEMA_INSTRUMENTATION', False):
+            instrumentation.enable()
@@ -0,0 +1,93 @@
+"""
+Functions for converting rows to Apache Arrow record batches and writing them to Parquet files. Each batch
+of rows is read into columns that are converted as a whole with ``convert_column`` and handed to Arrow
+along with their validity masks. pyarrow is an optional dependency of this module.
+"""
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from data_schema.compiled_schema import _iter_chunks
+from data_schema.convert_column import DATETIME_TYPES, convert_field_column
+from data_schema.field_schema_type import FieldSchemaType
+
+
+# The Arrow types of the columns that each field schema type is converted to. Dates and datetimes are
+# naive UTC timestamps and durations are numbers of seconds, the same as the values of the converters
+ARROW_TYPES = {
+    FieldSchemaType.DATE: pa.timestamp('us'),
+    FieldSchemaType.DATETIME: pa.timestamp('us'),
+    FieldSchemaType.DATE_FLOORED: pa.timestamp('us'),
+    FieldSchemaType.INT: pa.int64(),
+    FieldSchemaType.FLOAT: pa.float64(),
+    FieldSchemaType.STRING: pa.string(),
+    FieldSchemaType.BOOLEAN: pa.bool_(),
+    FieldSchemaType.DURATION: pa.int64(),
+}
+
+# The default number of rows of each record batch
+DEFAULT_BATCH_SIZE = 10000
+
+
+def get_arrow_field(definition):
+    """
+    Returns the Arrow field of a field definition. The field type, display name and uniqueness order of
+    the definition are kept as field metadata.
+    """
+    metadata = {'field_type': definition.field_type}
+    if definition.display_name is not None:
+        metadata['display_name'] = definition.display_name
+    if definition.uniqueness_order is not None:
+        metadata['uniqueness_order'] = str(definition.uniqueness_order)
+    return pa.field(definition.field_key, ARROW_TYPES[definition.field_type], metadata=metadata)
+
+
+def get_arrow_schema(compiled_schema):
+    """
+    Returns the Arrow schema of a compiled schema, with a field for each of its fields in field order.
+    """
+    metadata = None
+    if compiled_schema.schema_id is not None:
+        metadata = {'data_schema_id': str(compiled_schema.schema_id)}
+    return pa.schema([get_arrow_field(definition) for definition in compiled_schema.get_fields()], metadata=metadata)
+
+
+def _to_arrow_array(field_schema_type, column):
+    """
+    Converts a column converted by ``convert_column`` to an Arrow array. Masked values and NaT are null.
+    """
+    arrow_type = ARROW_TYPES[field_schema_type]
+    if isinstance(column, np.ma.MaskedArray):
+        return pa.array(column.data, mask=np.ma.getmaskarray(column), type=arrow_type)
+    return pa.array(column, type=arrow_type, from_pandas=field_schema_type in DATETIME_TYPES)
+
+
+def iter_record_batches(compiled_schema, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Lazily converts an iterable of rows (lists, dictionaries or objects) to Arrow record batches of up
+    to batch_size rows with the schema of ``get_arrow_schema``.
+    """
+    arrow_schema = get_arrow_schema(compiled_schema)
+    infer_format = compiled_schema.infer_datetime_formats
+
+    for batch in _iter_chunks(rows, batch_size):
+        arrays = []
+        for field in compiled_schema.fields:
+            column = convert_field_column(field, [field.read_value(row) for row in batch], infer_format)
+            arrays.append(_to_arrow_array(field.definition.field_type, column))
+        yield pa.RecordBatch.from_arrays(arrays, schema=arrow_schema)
+
+
+def write_parquet(compiled_schema, rows, where, batch_size=DEFAULT_BATCH_SIZE, **kwargs):
+    """
+    Converts an iterable of rows and streams them to a Parquet file, one record batch of up to batch_size
+    rows at a time, so that only one batch is held in memory. where is a path or a writable file, and any
+    other keyword arguments are passed to ``pyarrow.parquet.ParquetWriter``. Returns the number of
+    written rows.
+    """
+    num_rows = 0
+    with pq.ParquetWriter(where, get_arrow_schema(compiled_schema), **kwargs) as writer:
+        for record_batch in iter_record_batches(compiled_schema, rows, batch_size):
+            writer.write_batch(record_batch)
+            num_rows += record_batch.num_rows
+    return num_rows
@@ -0,0 +1,64 @@
+"""
+Helpers for storing data schemas in Django's cache framework. Every schema has a version that is part of
+the key it is cached under. Bumping the version makes every process miss the old entry.
+
+The cache alias and timeout can be configured with the ``DATA_SCHEMA_CACHE`` and
+``DATA_SCHEMA_CACHE_TIMEOUT`` settings.
+"""
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+
+# The prefix of all data schema cache keys
+CACHE_KEY_PREFIX = 'data_schema'
+
+
+def get_cache():
+    """
+    Returns the cache that data schemas are stored in.
+    """
+    return caches[getattr(settings, 'DATA_SCHEMA_CACHE', 'default')]
+
+
+def get_cache_timeout():
+    """
+    Returns the timeout of cached data schemas. Defaults to the timeout of the cache.
+    """
+    return getattr(settings, 'DATA_SCHEMA_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def _get_version_key(pk):
+    return '{0}:{1}:version'.format(CACHE_KEY_PREFIX, pk)
+
+
+def get_cache_version(pk):
+    """
+    Returns the current cache version of a data schema, creating one if it does not exist.
+    """
+    cache = get_cache()
+    version_key = _get_version_key(pk)
+
+    version = cache.get(version_key)
+    if version is None:
+        # Another process may have created the version in the meantime, in which case theirs is used
+        version = uuid4().hex
+        cache.add(version_key, version, None)
+        version = cache.get(version_key) or version
+    return version
+
+
+def bump_cache_version(pk):
+    """
+    Gives a data schema a new cache version so that all processes miss its previously cached entry.
+    """
+    get_cache().set(_get_version_key(pk), uuid4().hex, None)
+
+
+def get_cache_key(pk):
+    """
+    Returns the key of the current version of a data schema.
+    """
+    return '{0}:{1}:{2}'.format(CACHE_KEY_PREFIX, pk, get_cache_version(pk))
@@ -0,0 +1,584 @@
+"""
+Compiled, database-free plans for reading converted values out of data with a schema.
+"""
+from collections import deque, namedtuple
+import asyncio
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+import os
+from types import MappingProxyType
+
+from data_schema.convert_value import INVALID, get_converter
+from data_schema.deduplication import Keep, deduplicate
+from data_schema.exceptions import ErrorBudgetExceededException
+from data_schema.instrumentation import metrics
+from data_schema.records import make_record_class
+
+
+class FieldDefinition(namedtuple('FieldDefinition', [
+    'field_key', 'display_name', 'field_type', 'uniqueness_order', 'field_position', 'field_format',
+    'default_value', 'has_options', 'transform_case', 'options',
+], defaults=((),))):
+    """
+    The attributes of a field schema that are needed to read and convert its values, along with the
+    unconverted values of its field options.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_field_schema(cls, field_schema):
+        """
+        Builds a definition from a ``FieldSchema``.
+        """
+        options = ()
+        if field_schema.has_options:
+            options = tuple(field_option.value for field_option in field_schema.fieldoption_set.all())
+        return cls(*(getattr(field_schema, attr) for attr in cls._fields[:-1]), options=options)
+
+
+def _list_accessor(field_position, convert):
+    def from_list(obj):
+        return convert(obj[field_position] if 0 <= field_position < len(obj) else None)
+    return from_list
+
+
+def _dict_accessor(field_key, convert):
+    def from_dict(obj):
+        return convert(obj.get(field_key))
+    return from_dict
+
+
+def _object_accessor(field_key, convert):
+    def from_object(obj):
+        return convert(getattr(obj, field_key, None))
+    return from_object
+
+
+def _iter_chunks(iterable, chunk_size):
+    """
+    Yields lists of up to chunk_size items of the iterable.
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, chunk_size))
+
+
+async def _aiter_chunks(rows, chunk_size):
+    """
+    Yields lists of up to chunk_size items of an iterable or an async iterable.
+    """
+    if not hasattr(rows, '__aiter__'):
+        for chunk in _iter_chunks(rows, chunk_size):
+            yield chunk
+        return
+
+    chunk = []
+    async for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# The compiled schema of a conversion worker process. It is set once when the process starts
+_worker_schema = None
+
+
+def _init_worker(compiled_schema):
+    global _worker_schema
+    _worker_schema = compiled_schema
+
+
+def _convert_chunk(rows, output):
+    return list(_worker_schema.convert_rows(rows, output=output))
+
+
+# A value of a row that could not be converted by a lenient conversion
+ConversionError = namedtuple('ConversionError', ['row_index', 'field_key', 'bad_value', 'expected_type'])
+
+# The converted rows and the table of errors of a lenient conversion
+ConversionResult = namedtuple('ConversionResult', ['rows', 'errors'])
+
+
+class RowOutput(object):
+    """
+    Specifies the types of rows that batch conversions can produce.
+    """
+    # A dictionary keyed by field key
+    DICT = 'dict'
+    # A tuple of values in field order
+    TUPLE = 'tuple'
+    # An instance of the generated record class of the schema
+    RECORD = 'record'
+
+
+class RowView(Mapping):
+    """
+    A read-only mapping of the converted values of a row, keyed by field key. A value is converted the
+    first time it is read and memoized on the view, so fields that are never read are never converted.
+    """
+    __slots__ = ('schema', 'obj', '_values')
+
+    def __init__(self, schema, obj):
+        self.schema = schema
+        self.obj = obj
+        self._values = {}
+
+    def __getitem__(self, field_key):
+        try:
+            return self._values[field_key]
+        except KeyError:
+            value = self._values[field_key] = self.schema.get_value(self.obj, field_key)
+            return value
+
+    def __contains__(self, field_key):
+        return field_key in self.schema.field_map
+
+    def __iter__(self):
+        return iter(self.schema.field_keys)
+
+    def __len__(self):
+        return len(self.schema.fields)
+
+    def __repr__(self):
+        return '<{0}: {1} of {2} fields converted>'.format(self.__class__.__name__, len(self._values), len(self))
+
+    def materialize(self):
+        """
+        Converts every field that has not been read yet and returns a dictionary of all converted values in
+        field order. Fields that were already read are not converted again.
+        """
+        values = self._values
+        for field_key in self.schema.field_keys:
+            if field_key not in values:
+                self[field_key]
+        return {field_key: values[field_key] for field_key in self.schema.field_keys}
+
+
+class CompiledField(object):
+    """
+    A field of a compiled schema. The converter has the format, default value and case transform
+    of the field already applied, and each accessor reads and converts the value of the field from
+    a list, a dictionary or an object in a single call.
+    """
+    __slots__ = (
+        'definition', 'field_key', 'convert', 'convert_lenient', 'option_values', 'from_list', 'from_dict',
+        'from_object',
+    )
+
+    def __init__(self, definition, infer_datetime_format=False, schema_id=None):
+        convert = get_converter(
+            definition.field_type, definition.field_format, definition.default_value, definition.transform_case,
+            infer_format=infer_datetime_format)
+
+        object.__setattr__(self, 'definition', definition)
+        object.__setattr__(self, 'field_key', definition.field_key)
+        object.__setattr__(self, 'convert_lenient', get_converter(
+            definition.field_type, definition.field_format, definition.default_value, definition.transform_case,
+            infer_format=infer_datetime_format, lenient=True))
+        object.__setattr__(self, 'option_values', frozenset(
+            convert(option) for option in definition.options
+        ) if definition.has_options else None)
+
+        if metrics.enabled:
+            # Only fields compiled while instrumentation is enabled pay for recording their conversions
+            convert = metrics.instrument(schema_id, definition, infer_datetime_format)
+        object.__setattr__(self, 'convert', convert)
+        object.__setattr__(self, 'from_list', _list_accessor(definition.field_position, convert))
+        object.__setattr__(self, 'from_dict', _dict_accessor(definition.field_key, convert))
+        object.__setattr__(self, 'from_object', _object_accessor(definition.field_key, convert))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('{0} objects are immutable'.format(self.__class__.__name__))
+
+    def __repr__(self):
+        return '<{0}: {1} ({2})>'.format(self.__class__.__name__, self.field_key, self.definition.field_type)
+
+    def get_accessor(self, obj):
+        """
+        Returns the accessor of the field for the type of the object.
+        """
+        if isinstance(obj, list):
+            return self.from_list
+        elif isinstance(obj, dict):
+            return self.from_dict
+        return self.from_object
+
+    def get_lenient_accessor(self, obj):
+        """
+        Returns an accessor for the type of the object that returns INVALID for values that can not be
+        converted instead of raising.
+        """
+        definition = self.definition
+        if isinstance(obj, list):
+            return _list_accessor(definition.field_position, self.convert_lenient)
+        elif isinstance(obj, dict):
+            return _dict_accessor(definition.field_key, self.convert_lenient)
+        return _object_accessor(definition.field_key, self.convert_lenient)
+
+    def read_value(self, obj):
+        """
+        Given an object, return the unconverted value of the field in that object.
+        """
+        if isinstance(obj, list):
+            field_position = self.definition.field_position
+            return obj[field_position] if 0 <= field_position < len(obj) else None
+        elif isinstance(obj, dict):
+            return obj.get(self.field_key)
+        return getattr(obj, self.field_key, None)
+
+    def get_value(self, obj):
+        """
+        Given an object, return the converted value of the field in that object.
+        """
+        return self.get_accessor(obj)(obj)
+
+    def set_value(self, obj, value):
+        """
+        Given an object, set the value of the field in that object. The value must be one of the options
+        of the field if it has options.
+        """
+        if self.option_values is not None and value not in self.option_values:
+            raise Exception('Invalid option for {0}'.format(self.field_key))
+
+        if isinstance(obj, list):
+            obj[self.definition.field_position] = value
+        elif isinstance(obj, dict):
+            obj[self.field_key] = value
+        else:
+            setattr(obj, self.field_key, value)
+
+    def validate_options(self, values):
+        """
+        Returns the indices of the values that are not valid options of the field. All values are valid
+        if the field does not have options.
+        """
+        option_values = self.option_values
+        if option_values is None:
+            return []
+        return [index for index, value in enumerate(values) if value not in option_values]
+
+
+class CompiledDataSchema(object):
+    """
+    An immutable plan for reading values with a data schema. It is built once from the field
+    definitions of a schema, does not touch the database and can be reused for any number of objects.
+    """
+    __slots__ = (
+        'fields', 'field_map', 'unique_fields', 'infer_datetime_formats', 'schema_id', '_list_accessors',
+        '_dict_accessors', '_object_accessors', '_record_class',
+    )
+
+    def __init__(self, field_definitions, infer_datetime_formats=False, schema_id=None):
+        """
+        Compiles the field definitions, which are expected to be in field position order. If
+        infer_datetime_formats is True, date and datetime fields without a field format infer one
+        from the first values they convert. The schema id identifies the schema in instrumentation.
+        """
+        fields = tuple(
+            CompiledField(definition, infer_datetime_formats, schema_id) for definition in field_definitions)
+
+        object.__setattr__(self, 'fields', fields)
+        object.__setattr__(self, 'infer_datetime_formats', infer_datetime_formats)
+        object.__setattr__(self, 'schema_id', schema_id)
+        object.__setattr__(self, 'field_map', MappingProxyType({field.field_key: field for field in fields}))
+        object.__setattr__(self, 'unique_fields', tuple(sorted(
+            (field for field in fields if field.definition.uniqueness_order is not None),
+            key=lambda k: k.definition.uniqueness_order
+        )))
+        object.__setattr__(self, '_list_accessors', tuple(field.from_list for field in fields))
+        object.__setattr__(self, '_dict_accessors', tuple(field.from_dict for field in fields))
+        object.__setattr__(self, '_object_accessors', tuple(field.from_object for field in fields))
+        object.__setattr__(self, '_record_class', None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('{0} objects are immutable'.format(self.__class__.__name__))
+
+    def __reduce__(self):
+        # Compiled schemas are pickled as their field definitions and compiled again when unpickled
+        return (self.__class__, (self.get_fields(), self.infer_datetime_formats, self.schema_id))
+
+    @classmethod
+    def from_field_schemas(cls, field_schemas, **kwargs):
+        """
+        Compiles a list of ``FieldSchema`` objects that is in field position order.
+        """
+        return cls((FieldDefinition.from_field_schema(field_schema) for field_schema in field_schemas), **kwargs)
+
+    @property
+    def field_keys(self):
+        """
+        The field keys of the schema in field order.
+        """
+        return tuple(field.field_key for field in self.fields)
+
+    def get_fields(self):
+        """
+        Gets the field definitions of the schema in field order.
+        """
+        return [field.definition for field in self.fields]
+
+    def get_unique_fields(self):
+        """
+        Gets the field definitions that create the uniqueness constraint of a record.
+        """
+        return [field.definition for field in self.unique_fields]
+
+    def record_class(self):
+        """
+        Returns the record class of the schema, which is generated once. Records have a slot for each
+        field in field order, named after the field keys, and use far less memory than dictionaries.
+        Field keys that are not valid attribute names are renamed to an underscore followed by their index.
+        """
+        if self._record_class is None:
+            class_name = 'Record' if self.schema_id is None else 'Record{0}'.format(self.schema_id)
+            object.__setattr__(self, '_record_class', make_record_class(class_name, self.field_keys))
+        return self._record_class
+
+    def get_accessors(self, obj):
+        """
+        Returns the accessors of every field, in field order, for objects of the same type as the
+        object. This allows a batch of similar objects to be dispatched on only once.
+        """
+        if isinstance(obj, list):
+            return self._list_accessors
+        elif isinstance(obj, dict):
+            return self._dict_accessors
+        return self._object_accessors
+
+    def get_value(self, obj, field_key):
+        """
+        Given an object and a field key, return the value of the field in the object.
+        """
+        try:
+            return self.field_map[field_key].get_value(obj)
+        except Exception as e:
+            # Attach additional information to the exception to make higher level error handling easier
+            e.field_key = field_key
+            raise e
+
+    def set_value(self, obj, field_key, value):
+        """
+        Given an object and a field key, set the value of the field in the object.
+        """
+        return self.field_map[field_key].set_value(obj, value)
+
+    def view(self, obj):
+        """
+        Returns a ``RowView`` of the object, which converts each value when it is first read.
+        """
+        return RowView(self, obj)
+
+    def views(self, rows):
+        """
+        Lazily wraps an iterable of rows in ``RowView`` objects without converting any values.
+        """
+        return map(partial(RowView, self), rows)
+
+    def validate_options(self, field_key, values):
+        """
+        Returns the indices of the values that are not valid options of a field.
+        """
+        return self.field_map[field_key].validate_options(values)
+
+    def _get_unique_key_function(self):
+        """
+        Returns a function that returns the unique key of a row. The accessors of the unique fields are
+        looked up once per type of row.
+        """
+        unique_fields = self.unique_fields
+        accessors_by_type = {}
+
+        def get_unique_key(row):
+            accessors = accessors_by_type.get(row.__class__)
+            if accessors is None:
+                accessors = accessors_by_type[row.__class__] = tuple(
+                    field.get_accessor(row) for field in unique_fields)
+
+            values = []
+            try:
+                for accessor in accessors:
+                    values.append(accessor(row))
+            except Exception as e:
+                e.field_key = unique_fields[len(values)].field_key
+                raise e
+            return tuple(values)
+
+        return get_unique_key
+
+    def get_unique_key(self, obj):
+        """
+        Returns a tuple of the converted values of the unique fields of an object, in uniqueness order.
+        """
+        return self._get_unique_key_function()(obj)
+
+    def unique_keys(self, rows):
+        """
+        Lazily yields the unique key of each row of an iterable of rows.
+        """
+        return map(self._get_unique_key_function(), rows)
+
+    def deduplicate(self, rows, keep=Keep.FIRST, max_memory_keys=None, spill_dir=None):
+        """
+        Lazily yields the rows of an iterable that have distinct unique keys, keeping the first or the last
+        row of each key. See ``data_schema.deduplication.deduplicate``.
+        """
+        if not self.unique_fields:
+            raise ValueError('The schema has no unique fields to de-duplicate by')
+        return deduplicate(self._get_unique_key_function(), rows, keep, max_memory_keys, spill_dir)
+
+    def _get_row_factory(self, output):
+        """
+        Returns a function that builds an output row from a list of values in field order.
+        """
+        if output == RowOutput.DICT:
+            field_keys = self.field_keys
+            return lambda values: dict(zip(field_keys, values))
+        elif output == RowOutput.TUPLE:
+            return tuple
+        elif output == RowOutput.RECORD:
+            return self.record_class()._make
+        raise ValueError('Invalid row output {0}'.format(output))
+
+    def convert_rows(self, rows, output=RowOutput.DICT):
+        """
+        Lazily converts an iterable of rows (lists, dictionaries or objects) and yields each converted
+        row as a dictionary keyed by field key, a tuple in field order or a record. Accessors are looked
+        up once per type of row instead of once per value.
+        """
+        return self._convert_rows(rows, self._get_row_factory(output))
+
+    def _convert_rows(self, rows, row_factory):
+        field_keys = self.field_keys
+        accessors_by_type = {}
+
+        for row in rows:
+            accessors = accessors_by_type.get(row.__class__)
+            if accessors is None:
+                accessors = accessors_by_type[row.__class__] = self.get_accessors(row)
+
+            values = []
+            try:
+                for accessor in accessors:
+                    values.append(accessor(row))
+            except Exception as e:
+                # The failing field is the one after the last converted value
+                e.field_key = field_keys[len(values)]
+                raise e
+
+            yield row_factory(values)
+
+    def convert_value_rows(self, rows, output=RowOutput.DICT):
+        """
+        Lazily converts an iterable of sequences of unconverted values in field order, such as the tuples of
+        ``values_list``, and yields the converted rows. Values are read by their index in the sequence
+        rather than by the field position.
+        """
+        return self._convert_value_rows(rows, self._get_row_factory(output))
+
+    def _convert_value_rows(self, rows, row_factory):
+        converters = tuple(field.convert for field in self.fields)
+        field_keys = self.field_keys
+
+        for row in rows:
+            values = []
+            try:
+                for convert, value in zip(converters, row):
+                    values.append(convert(value))
+            except Exception as e:
+                e.field_key = field_keys[len(values)]
+                raise e
+
+            yield row_factory(values)
+
+    def aconvert_rows(self, rows, output=RowOutput.DICT, chunk_size=1000):
+        """
+        Converts an iterable or an async iterable of rows and returns an async iterator of the converted rows.
+        Rows are converted in chunks of chunk_size rows, and control is given back to the event loop after
+        every chunk so that it is not blocked for long.
+        """
+        return self._aconvert_rows(rows, self._get_row_factory(output), chunk_size)
+
+    async def _aconvert_rows(self, rows, row_factory, chunk_size):
+        async for chunk in _aiter_chunks(rows, chunk_size):
+            for converted_row in list(self._convert_rows(chunk, row_factory)):
+                yield converted_row
+            await asyncio.sleep(0)
+
+    def convert_rows_lenient(self, rows, output=RowOutput.DICT, max_errors=None):
+        """
+        Converts an iterable of rows without raising for values that can not be converted. Returns a
+        ``ConversionResult`` of the converted rows, where bad values are None, and a list of
+        ``ConversionError`` tuples of the row index, field key, unconverted value and expected type of
+        every bad value.
+
+        If max_errors is given, an ErrorBudgetExceededException with the errors so far is raised as soon
+        as there are more errors than that.
+        """
+        row_factory = self._get_row_factory(output)
+        fields = self.fields
+        accessors_by_type = {}
+        converted_rows = []
+        errors = []
+
+        for row_index, row in enumerate(rows):
+            accessors = accessors_by_type.get(row.__class__)
+            if accessors is None:
+                accessors = accessors_by_type[row.__class__] = tuple(
+                    field.get_lenient_accessor(row) for field in fields)
+
+            values = [accessor(row) for accessor in accessors]
+            if INVALID in values:
+                self._collect_errors(row_index, row, values, errors)
+                if max_errors is not None and len(errors) > max_errors:
+                    raise ErrorBudgetExceededException(
+                        'More than {0} values could not be converted'.format(max_errors), errors)
+
+            converted_rows.append(row_factory(values))
+
+        return ConversionResult(converted_rows, errors)
+
+    def _collect_errors(self, row_index, row, values, errors):
+        """
+        Replaces the invalid values of a converted row with None and adds their errors to the error table.
+        """
+        for index, value in enumerate(values):
+            if value is INVALID:
+                field = self.fields[index]
+                errors.append(ConversionError(
+                    row_index, field.field_key, field.read_value(row), field.definition.field_type))
+                values[index] = None
+
+    def convert_rows_parallel(self, rows, output=RowOutput.DICT, chunk_size=1000, max_workers=None):
+        """
+        Converts an iterable of rows across a pool of worker processes and yields the converted rows in
+        the same order as ``convert_rows``. Rows are sent to the workers in chunks of chunk_size rows, and
+        at most two chunks per worker are pending at a time so that the input is consumed lazily. Each
+        worker receives a pickled copy of this compiled schema once and never touches the database.
+        """
+        self._get_row_factory(output)
+        max_workers = max_workers or os.cpu_count() or 1
+        if output == RowOutput.RECORD:
+            # Pickled records carry their class name and field keys, so workers send back smaller tuples
+            return map(self.record_class()._make, self._convert_rows_parallel(
+                rows, RowOutput.TUPLE, chunk_size, max_workers))
+        return self._convert_rows_parallel(rows, output, chunk_size, max_workers)
+
+    def _convert_rows_parallel(self, rows, output, chunk_size, max_workers):
+        max_pending = max_workers * 2
+
+        with ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(self,)) as executor:
+            pending = deque()
+            for chunk in _iter_chunks(rows, chunk_size):
+                pending.append(executor.submit(_convert_chunk, chunk, output))
+                if len(pending) >= max_pending:
+                    yield from pending.popleft().result()
+
+            while pending:
+                yield from pending.popleft().result()
@@ -0,0 +1,300 @@
+"""
+Functions for converting whole columns of values into NumPy arrays. NumPy is an optional dependency
+of this module.
+"""
+from datetime import datetime, timedelta
+import warnings
+
+import numpy as np
+
+from data_schema.convert_value import FIELD_SCHEMA_CONVERTERS, get_converter, get_string_preprocessor
+from data_schema.exceptions import InvalidDateFormatException
+from data_schema.field_schema_type import FieldSchemaType
+
+
+# The NumPy dtypes of the arrays that each field schema type is converted to
+COLUMN_DTYPES = {
+    FieldSchemaType.DATE: np.dtype('datetime64[us]'),
+    FieldSchemaType.DATETIME: np.dtype('datetime64[us]'),
+    FieldSchemaType.DATE_FLOORED: np.dtype('datetime64[us]'),
+    FieldSchemaType.INT: np.dtype(np.int64),
+    FieldSchemaType.FLOAT: np.dtype(np.float64),
+    FieldSchemaType.STRING: np.dtype(object),
+    FieldSchemaType.BOOLEAN: np.dtype(np.bool_),
+    FieldSchemaType.DURATION: np.dtype(np.int64),
+}
+
+# The field schema types that are converted to masked arrays
+MASKED_TYPES = frozenset((
+    FieldSchemaType.INT, FieldSchemaType.FLOAT, FieldSchemaType.BOOLEAN, FieldSchemaType.DURATION,
+))
+
+# The field schema types that are converted to datetime64 arrays
+DATETIME_TYPES = frozenset((FieldSchemaType.DATE, FieldSchemaType.DATETIME, FieldSchemaType.DATE_FLOORED))
+
+# The field schema types whose clean string values are converted with NumPy
+NUMERIC_TYPES = frozenset((FieldSchemaType.INT, FieldSchemaType.FLOAT))
+
+# Converted datetimes are packed into datetime64 arrays as microseconds since the epoch
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+NAT = np.iinfo(np.int64).min
+
+# The range of unix timestamps that can be represented as python datetimes
+MIN_TIMESTAMP = -62135596800
+MAX_TIMESTAMP = 253402300799
+
+
+def _attach_error_info(e, bad_value, field_schema_type):
+    """
+    Attaches the same information to an exception as the value converters do.
+    """
+    e.bad_value = bad_value
+    e.expected_type = field_schema_type
+    return e
+
+
+def _convert_numeric_array(field_schema_type, values):
+    """
+    Converts an array of ints, floats or bools to an int64 or float64 masked array. Nothing is masked since
+    numeric arrays do not have missing values.
+    """
+    if values.dtype.kind == 'f':
+        invalid = np.isinf(values)
+        if field_schema_type != FieldSchemaType.FLOAT:
+            # Ints can not represent nan either
+            invalid |= np.isnan(values)
+        if invalid.any():
+            bad_value = values[invalid][0].item()
+            raise _attach_error_info(
+                ValueError('{0} not a valid value for numeric data'.format(bad_value)), bad_value, field_schema_type)
+
+    # Casting floats to ints truncates them the same way int() does
+    return np.ma.MaskedArray(values.astype(COLUMN_DTYPES[field_schema_type]), mask=np.zeros(len(values), bool))
+
+
+def _convert_boolean_array(values):
+    """
+    Converts an array of ints, floats or bools to a boolean masked array. Only ones and zeros are valid
+    boolean values, everything else is masked.
+    """
+    true_values = values == 1
+    return np.ma.MaskedArray(true_values, mask=~(true_values | (values == 0)))
+
+
+def _convert_timestamp_array(field_schema_type, values):
+    """
+    Converts an array of unix timestamps to a datetime64[us] array.
+    """
+    values = values.astype(np.float64)
+    invalid = ~((values >= MIN_TIMESTAMP) & (values <= MAX_TIMESTAMP))
+    if invalid.any():
+        bad_value = values[invalid][0].item()
+        raise _attach_error_info(
+            InvalidDateFormatException('Invalid date format: {0}'.format(bad_value)), bad_value, field_schema_type)
+
+    # Round fractional seconds to microseconds the same way datetime.utcfromtimestamp does
+    fractions, seconds = np.modf(values)
+    microseconds = seconds.astype(np.int64) * 1000000 + np.round(fractions * 1e6).astype(np.int64)
+    converted = microseconds.astype('datetime64[us]')
+
+    if field_schema_type == FieldSchemaType.DATE_FLOORED:
+        converted = converted.astype('datetime64[D]').astype('datetime64[us]')
+    return converted
+
+
+def _convert_array(field_schema_type, values):
+    """
+    Converts a NumPy array of ints, floats or bools without converting each value individually.
+    """
+    if field_schema_type == FieldSchemaType.BOOLEAN:
+        return _convert_boolean_array(values)
+    elif field_schema_type in DATETIME_TYPES:
+        return _convert_timestamp_array(field_schema_type, values)
+    return _convert_numeric_array(field_schema_type, values)
+
+
+def _to_array(field_schema_type, converted_values):
+    """
+    Packs a list of converted values into a masked array, or into a datetime64 array for date and datetime
+    field schema types. String columns are converted by ``convert_string_column`` and never packed.
+    """
+    dtype = COLUMN_DTYPES[field_schema_type]
+
+    if field_schema_type in MASKED_TYPES:
+        mask = np.fromiter((value is None for value in converted_values), bool, count=len(converted_values))
+        data = np.array([0 if value is None else value for value in converted_values], dtype=dtype)
+        return np.ma.MaskedArray(data, mask=mask)
+
+    # Assigning datetimes to a datetime64 array is slow, so the array is built from integer microseconds
+    return np.fromiter(
+        (NAT if value is None else (value - EPOCH) // MICROSECOND for value in converted_values),
+        np.int64, count=len(converted_values)).view(dtype)
+
+
+def _get_missing_mask(values):
+    """
+    Returns an object array of the values and a boolean array of the values that are None or blank strings.
+    """
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array, np.equal(array, None) | np.equal(array, '')
+
+
+def _fill_missing(field_schema_type, data, missing, default_value):
+    """
+    Returns a masked array of the values converted to data where missing values are replaced with the
+    converted default value, or masked if there is no default value.
+    """
+    array = np.zeros(len(missing), dtype=COLUMN_DTYPES[field_schema_type])
+    array[~missing] = data
+    if default_value is not None and missing.any():
+        array[missing] = FIELD_SCHEMA_CONVERTERS[field_schema_type](None, None, default_value)
+        missing = np.zeros(len(missing), bool)
+    return np.ma.MaskedArray(array, mask=missing)
+
+
+def _convert_numeric_strings(field_schema_type, values, default_value):
+    """
+    Converts a column of clean numeric strings and numbers with NumPy instead of converting each value
+    individually. Returns None if any value needs the non-numeric characters stripped or would not convert
+    the same way as ``convert_value``, in which case the values have to be converted one at a time.
+    """
+    array, missing = _get_missing_mask(values)
+    try:
+        data = array[~missing].astype(COLUMN_DTYPES[field_schema_type])
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+    # NaN strings are None and infinite values are invalid for convert_value
+    if data.dtype.kind == 'f' and not np.isfinite(data).all():
+        return None
+    return _fill_missing(field_schema_type, data, missing, default_value)
+
+
+def _is_iso_format_array(strings):
+    """
+    Vectorized ``DatetimeConverter.is_iso_format`` of a non-empty array of strings.
+    """
+    if np.char.str_len(strings).min() < 10:
+        return False
+    characters = strings.view(np.uint32).reshape(len(strings), -1)
+    return bool((characters[:, 4] == ord('-')).all() and (characters[:, 7] == ord('-')).all())
+
+
+def _convert_iso_strings(field_schema_type, values, default_value):
+    """
+    Converts a column of ISO-8601 date and datetime strings without time zones with NumPy's datetime
+    parser. Returns None if any value is not such a string, in which case the values have to be converted
+    one at a time.
+    """
+    array, missing = _get_missing_mask(values)
+    strings = array[~missing]
+    if not all(type(value) is str for value in strings):
+        return None
+
+    strings = strings.astype(str)
+    if len(strings) and not _is_iso_format_array(strings):
+        return None
+
+    with warnings.catch_warnings():
+        # NumPy warns about time zones, which are converted differently than by convert_value
+        warnings.simplefilter('error')
+        try:
+            data = strings.astype('datetime64[us]')
+        except (ValueError, TypeError, Warning):
+            return None
+
+    if field_schema_type == FieldSchemaType.DATE_FLOORED:
+        data = data.astype('datetime64[D]').astype('datetime64[us]')
+    return _fill_missing(field_schema_type, data, missing, default_value).filled(np.datetime64('NaT'))
+
+
+def convert_duration_column(values, default_value=None):
+    """
+    Converts a column of durations to an int64 masked array of seconds where None values are masked. Strings
+    in [hh]:mm:ss format are parsed directly and any other values are converted as a number of seconds.
+    """
+    if is_convertible_array(FieldSchemaType.DURATION, values):
+        return _convert_array(FieldSchemaType.DURATION, values)
+
+    converter = FIELD_SCHEMA_CONVERTERS[FieldSchemaType.DURATION]
+    parse_duration = converter.parse_duration
+    duration_match = converter.TIME_FORMAT_DURATION_REGEXP.match
+    convert_seconds = converter.INT_CONVERTER.bind(default_value=default_value)
+
+    return _to_array(FieldSchemaType.DURATION, [
+        parse_duration(value) if isinstance(value, str) and duration_match(value) else convert_seconds(value)
+        for value in values
+    ])
+
+
+def convert_string_column(values, format_str=None, default_value=None, transform_case=None):
+    """
+    Converts a column of strings to an object array. The format string regex and case transform are
+    applied with a single preprocessor for the whole column, and None values are replaced with the
+    default value.
+    """
+    preprocess = get_string_preprocessor(format_str, transform_case)
+    default_value = None if default_value is None else str(default_value)
+
+    array = np.empty(len(values), dtype=object)
+    array[:] = [default_value if value is None else str(value) for value in map(preprocess, values)]
+    return array
+
+
+def is_convertible_array(field_schema_type, values):
+    """
+    Returns True if the values are a NumPy array that can be converted without converting each value
+    individually. This is the case for arrays of ints, floats and bools that are not string columns.
+    """
+    if field_schema_type == FieldSchemaType.STRING:
+        return False
+    return isinstance(values, np.ndarray) and values.dtype.kind in 'iufb'
+
+
+def convert_column(
+        field_schema_type, values, format_str=None, default_value=None, transform_case=None, infer_format=False):
+    """
+    Converts a column of values to a NumPy array with the same semantics as ``convert_value``.
+
+    Int, float, boolean and duration columns are returned as int64, float64 and bool masked arrays where
+    None values are masked. Date and datetime columns are returned as datetime64[us] arrays where None
+    values are NaT, and string columns are returned as object arrays.
+
+    NumPy arrays of ints, floats and bools are converted as a whole. Any other values are converted with
+    a converter that is looked up once for the column. If infer_format is True, date and datetime columns
+    without a format string infer one from their first values.
+    """
+    if is_convertible_array(field_schema_type, values):
+        return _convert_array(field_schema_type, values)
+    elif field_schema_type == FieldSchemaType.DURATION:
+        return convert_duration_column(values, default_value)
+    elif field_schema_type == FieldSchemaType.STRING:
+        return convert_string_column(values, format_str, default_value, transform_case)
+
+    array = None
+    if field_schema_type in NUMERIC_TYPES:
+        array = _convert_numeric_strings(field_schema_type, values, default_value)
+    elif field_schema_type in DATETIME_TYPES and not format_str:
+        array = _convert_iso_strings(field_schema_type, values, default_value)
+    if array is not None:
+        return array
+
+    convert = get_converter(field_schema_type, format_str, default_value, transform_case, infer_format=infer_format)
+    return _to_array(field_schema_type, [convert(value) for value in values])
+
+
+def convert_field_column(compiled_field, values, infer_format=False):
+    """
+    Converts a column of unconverted values of a field of a compiled schema with ``convert_column``. The key
+    of the field is attached to conversion errors.
+    """
+    definition = compiled_field.definition
+    try:
+        return convert_column(
+            definition.field_type, values, definition.field_format, definition.default_value,
+            definition.transform_case, infer_format=infer_format)
+    except Exception as e:
+        e.field_key = compiled_field.field_key
+        raise e
@@ -2,7 +2,11 @@
 Functions for handling conversions of values from one type to another.
 """
 from datetime import datetime
+from functools import lru_cache, partial
+from operator import methodcaller
+import math
 import re
+import threading
 
 from dateutil.parser import parse
 import fleming
@@ -12,6 +16,18 @@ from data_schema.field_schema_type import FieldSchemaType, FieldSchemaCase
 from data_schema.exceptions import InvalidDateFormatException
 
 
+class InvalidValue(object):
+    """
+    The type of INVALID, which lenient converters return instead of raising when a value can not be converted.
+    """
+    def __repr__(self):
+        return 'INVALID'
+
+
+# Returned by lenient converters for values that can not be converted
+INVALID = InvalidValue()
+
+
 class ValueConverter(object):
     """
     A generic value converter.
@@ -57,14 +73,23 @@ class ValueConverter(object):
         """
         return self._python_type(value)
 
-    def __call__(self, value, format_str, default_value, transform_case=None):
+    def __call__(self, value, format_str, default_value, transform_case=None, on_default=None):
         """
-        Converts a provided value to the configured python type.
+        Converts a provided value to the configured python type. on_default is called without arguments
+        whenever the default value is substituted.
         """
         value = self._preprocess_value(value, format_str, transform_case=transform_case)
+        return self._convert_preprocessed(value, format_str, default_value, on_default)
 
+    def _convert_preprocessed(self, value, format_str, default_value, on_default=None):
+        """
+        Converts a preprocessed value, substituting the default value for None.
+        """
         # Set the value to the default if it is None and there is a default
-        value = default_value if value is None and default_value is not None else value
+        if value is None and default_value is not None:
+            value = default_value
+            if on_default is not None:
+                on_default()
 
         try:
             # Convert the value if it isn't None
@@ -75,6 +100,38 @@ class ValueConverter(object):
             e.expected_type = self._field_schema_type
             raise e
 
+    def bind(self, format_str=None, default_value=None, transform_case=None, on_default=None):
+        """
+        Returns a single argument callable that converts values with the format string, default value and
+        case transform already applied. Subclasses may override this to return a more specialized closure.
+        """
+        def convert(value):
+            return self(value, format_str, default_value, transform_case, on_default)
+        return convert
+
+    def bind_lenient(self, format_str=None, default_value=None, transform_case=None, on_default=None):
+        """
+        Returns a single argument callable like ``bind`` that returns INVALID for values that can not be
+        converted. No information is attached to the failure and nothing is raised, which keeps failures
+        cheap when many values are bad.
+        """
+        preprocess_value = self._preprocess_value
+        convert_value = self._convert_value
+
+        def convert(value):
+            try:
+                value = preprocess_value(value, format_str, transform_case=transform_case)
+                if value is None and default_value is not None:
+                    value = default_value
+                    if on_default is not None:
+                        on_default()
+                if value is None:
+                    return None
+                return convert_value(value, format_str)
+            except Exception:
+                return INVALID
+        return convert
+
 
 class BooleanConverter(ValueConverter):
     """
@@ -98,20 +155,30 @@ class NumericConverter(ValueConverter):
     # A compiled regex for extracting non-numeric characters
     NON_NUMERIC_REGEX = re.compile(r'[^\d\.\-eE]+')
 
+    # A compiled regex that matches strings without non-numeric characters, which the regex above leaves as is
+    CLEAN_NUMERIC_REGEX = re.compile(r'[\d\.\-eE]+')
+
+    def __init__(self, field_schema_type, python_type):
+        super(NumericConverter, self).__init__(field_schema_type, python_type)
+
+        # Only floats can be infinite
+        self._check_infinity = python_type is float
+
     def _preprocess_value(self, value, format_str, transform_case=None):
         """
-        Strips out any non-numeric characters for numeric values if they are a string.
+        Strips out any non-numeric characters for numeric values if they are a string. Clean strings such
+        as "12", "-4.5" or "1e5" are only matched, which is cheaper than substituting.
         """
         value = super(NumericConverter, self)._preprocess_value(value, format_str, transform_case=transform_case)
-        if self.is_string(value):
+        if self.is_string(value) and not value.isdecimal() and not self.CLEAN_NUMERIC_REGEX.fullmatch(value):
             value = self.NON_NUMERIC_REGEX.sub('', value) or None
 
         return value
 
     def _convert_value(self, value, format_str):
-        converted_value = super()._convert_value(value, format_str)
+        converted_value = self._python_type(value)
 
-        if converted_value in [float('inf'), float('-inf')]:
+        if self._check_infinity and math.isinf(converted_value):
             raise ValueError('inf not a valid value for numeric data')
 
         return converted_value
@@ -123,23 +190,89 @@ class DurationConverter(ValueConverter):
     """
     TIME_FORMAT_DURATION_REGEXP = re.compile(r'^\d{1,2}:\d{1,2}(:\d{1,2})?$')
 
-    def __call__(self, value, format_str, default_value, transform_case=None):
-        if self.is_string(value) and self.TIME_FORMAT_DURATION_REGEXP.match(value) is not None:
-            return super(DurationConverter, self).__call__(value, format_str, default_value, transform_case)
-        return NumericConverter(FieldSchemaType.INT, int)(value, format_str, default_value, transform_case)
+    # Converts values that are not in [hh]:mm:ss format as a number of seconds
+    INT_CONVERTER = NumericConverter(FieldSchemaType.INT, int)
 
-    def _convert_value(self, value, format_str):
+    def is_duration(self, value):
+        """
+        Returns True if the value is a string in [hh]:mm:ss format.
+        """
+        return self.is_string(value) and self.TIME_FORMAT_DURATION_REGEXP.match(value) is not None
+
+    def __call__(self, value, format_str, default_value, transform_case=None, on_default=None):
+        if self.is_duration(value):
+            return super(DurationConverter, self).__call__(
+                value, format_str, default_value, transform_case, on_default)
+        return self.INT_CONVERTER(value, format_str, default_value, transform_case, on_default)
+
+    def _bind_durations(self, convert_duration, convert_int):
+        is_duration = self.is_duration
+
+        def convert(value):
+            return convert_duration(value) if is_duration(value) else convert_int(value)
+        return convert
+
+    def bind(self, format_str=None, default_value=None, transform_case=None, on_default=None):
+        # Call the base converter directly since the value is already known to be a duration
+        call = super(DurationConverter, self).__call__
+
+        def convert_duration(value):
+            return call(value, format_str, default_value, transform_case, on_default)
+        convert_int = self.INT_CONVERTER.bind(format_str, default_value, transform_case, on_default)
+        return self._bind_durations(convert_duration, convert_int)
+
+    def bind_lenient(self, format_str=None, default_value=None, transform_case=None, on_default=None):
+        return self._bind_durations(
+            super(DurationConverter, self).bind_lenient(format_str, default_value, transform_case, on_default),
+            self.INT_CONVERTER.bind_lenient(format_str, default_value, transform_case, on_default))
+
+    def parse_duration(self, value):
+        """
+        Returns the number of seconds of a string in [hh]:mm:ss format.
+        """
         duration_constituents = value.split(':')
-        value = int(duration_constituents[-2]) * 60 + int(duration_constituents[-1])
+        seconds = int(duration_constituents[-2]) * 60 + int(duration_constituents[-1])
         if len(duration_constituents) == 3:
-            value += int(duration_constituents[0]) * 3600
-        return value
+            seconds += int(duration_constituents[0]) * 3600
+        return seconds
+
+    def _convert_value(self, value, format_str):
+        return self.parse_duration(value)
 
 
 class DatetimeConverter(ValueConverter):
     """
     Converts datetime values (date and datetime).
     """
+    # The strptime formats that can be inferred for values without a format string. The order is the
+    # order of preference when several formats match the same values. ISO-8601 formats are not inferred
+    # since datetime.fromisoformat parses them several times faster than strptime
+    INFERABLE_FORMATS = (
+        '%m/%d/%Y %H:%M:%S', '%m/%d/%Y %H:%M', '%m/%d/%Y %I:%M:%S %p', '%m/%d/%Y %I:%M %p', '%m/%d/%Y',
+        '%m/%d/%y', '%Y/%m/%d %H:%M:%S', '%Y/%m/%d', '%d-%b-%Y', '%d %b %Y', '%b %d, %Y', '%B %d, %Y',
+    )
+
+    # The number of values to infer a format from
+    INFERENCE_SAMPLE_SIZE = 20
+
+    def is_iso_format(self, value):
+        """
+        Returns True if a string looks like an ISO-8601 date. These can never be unix timestamps.
+        """
+        return len(value) >= 10 and value[4] == '-' and value[7] == '-'
+
+    def parse(self, value):
+        """
+        Parses a string without a format string. ISO-8601 strings are parsed with datetime.fromisoformat
+        and anything else that it can not parse is passed to dateutil's parse.
+        """
+        if self.is_iso_format(value):
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                pass
+        return parse(value)
+
     def _convert_value(self, value, format_str):
         """
         Formats datetimes based on the input type. If the input is a string, uses strptime and the
@@ -147,21 +280,102 @@ class DatetimeConverter(ValueConverter):
         it assumes it is a unix timestamp. This function also takes care of converting any
         aware datetimes to naive UTC.
         """
-        try:
-            value = datetime.utcfromtimestamp(float(value))
-        except Exception:
-            pass
-        if self.is_string(value):
-            value = datetime.strptime(value, format_str) if format_str else parse(value)
+        if self.is_string(value) and not format_str and self.is_iso_format(value):
+            # Skip trying to parse the value as a timestamp since it is a date
+            value = self.parse(value)
+        else:
+            value = self._convert_timestamp_or_string(value, format_str)
 
         # It is assumed that value is a datetime here. If it isn't a datetime, then it is a bad value like
         # a number that is too large to be parsed as an integer
-        if type(value) != datetime:
+        if type(value) is not datetime:
             raise InvalidDateFormatException(f'Invalid date format: {value}')
 
         # Convert any aware datetime objects to naive utc
         return value if value.tzinfo is None else fleming.convert_to_tz(value, pytz.utc, return_naive=True)
 
+    def _convert_timestamp_or_string(self, value, format_str):
+        try:
+            value = datetime.utcfromtimestamp(float(value))
+        except Exception:
+            pass
+        if self.is_string(value):
+            value = datetime.strptime(value, format_str) if format_str else self.parse(value)
+        return value
+
+    def infer_format(self, values):
+        """
+        Returns the first inferable format that parses every one of the string values to the same datetime
+        as parsing them without a format string does, or None if there is no such format. Values that can
+        not be parsed at all do not count against a format.
+        """
+        parsed = []
+        for value in values:
+            try:
+                parsed.append((value, self.parse(value)))
+            except Exception:
+                pass
+
+        for format_str in self.INFERABLE_FORMATS if parsed else ():
+            try:
+                if all(datetime.strptime(value, format_str) == expected for value, expected in parsed):
+                    return format_str
+            except ValueError:
+                pass
+        return None
+
+    def _is_inference_sample(self, value):
+        """
+        Returns True if the value can be used to infer a format. Numeric strings are excluded since they
+        are always parsed as timestamps, and ISO-8601 strings since they are always parsed with
+        datetime.fromisoformat.
+        """
+        if not self.is_string(value) or not value or self.is_iso_format(value):
+            return False
+        try:
+            float(value)
+            return False
+        except ValueError:
+            return True
+
+    def bind_inferred(self, default_value=None, sample_size=None, on_default=None):
+        """
+        Returns a single argument callable for values without a format string. It collects the first
+        sample_size string values it converts and infers a strptime format from them. Values are then
+        parsed with the inferred format and only fall back to parsing without a format string when they
+        do not match it. ISO-8601 strings are always parsed without a format string. The callable can be
+        shared by threads.
+        """
+        sample_size = sample_size or self.INFERENCE_SAMPLE_SIZE
+        convert_without_format = self.bind(None, default_value, on_default=on_default)
+        samples = []
+        inferred_format = None
+        lock = threading.Lock()
+
+        def convert(value):
+            nonlocal samples, inferred_format
+
+            stripped = value.strip() if self.is_string(value) else value
+            # Read the format once since another thread can infer it while the value is converted
+            format_str = inferred_format
+            if format_str and not (self.is_string(stripped) and self.is_iso_format(stripped)):
+                try:
+                    return self(value, format_str, default_value, on_default=on_default)
+                except ValueError:
+                    return convert_without_format(value)
+
+            if samples is not None and self._is_inference_sample(stripped):
+                with lock:
+                    if samples is not None:
+                        samples.append(stripped)
+                        if len(samples) >= sample_size:
+                            inferred_format = self.infer_format(samples)
+                            samples = None
+
+            return convert_without_format(value)
+
+        return convert
+
 
 class DateFlooredConverter(DatetimeConverter):
     """
@@ -172,6 +386,42 @@ class DateFlooredConverter(DatetimeConverter):
         return fleming.floor(value, day=1)
 
 
+# The maximum number of string preprocessors that are cached by format string and case transform
+STRING_PREPROCESSOR_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=STRING_PREPROCESSOR_CACHE_SIZE)
+def get_string_preprocessor(format_str=None, transform_case=None):
+    """
+    Returns a function that strips a string value, returns None if it does not match the format string
+    regex and applies the case transform. The regex is compiled once and preprocessors are kept in a
+    bounded cache, so many distinct format strings do not recompile their regexes on every value.
+    """
+    match = None
+    if format_str:
+        try:
+            match = re.compile(format_str).match
+        except re.error:
+            # Invalid patterns only raise for the string values that are matched against them, like re.match
+            match = partial(re.match, format_str)
+    transform = None
+    if transform_case:
+        transform = methodcaller('lower' if transform_case == FieldSchemaCase.LOWER else 'upper')
+
+    def preprocess(value):
+        if isinstance(value, str):
+            value = value.strip()
+            if match is not None and not match(value):
+                value = None
+
+        if value and transform is not None:
+            value = transform(value)
+
+        return value
+
+    return preprocess
+
+
 class StringConverter(ValueConverter):
     """
     Converts string values.
@@ -181,6 +431,10 @@ class StringConverter(ValueConverter):
         Performs additional regex matching for any provided format string. If the value
         does not match the format string, None is returned.
         """
+        # Most string fields have neither, so only strip them
+        if not format_str and not transform_case:
+            return value.strip() if isinstance(value, str) else value
+
         value = super(StringConverter, self)._preprocess_value(value, format_str, transform_case=transform_case)
         if self.is_string(value) and format_str:
             value = value if re.match(format_str, value) else None
@@ -193,6 +447,18 @@ class StringConverter(ValueConverter):
 
         return value
 
+    def bind(self, format_str=None, default_value=None, transform_case=None, on_default=None):
+        """
+        Returns a single argument callable with the format string regex compiled and the case transform
+        chosen once.
+        """
+        preprocess = get_string_preprocessor(format_str, transform_case)
+        convert_preprocessed = self._convert_preprocessed
+
+        def convert(value):
+            return convert_preprocessed(preprocess(value), format_str, default_value, on_default)
+        return convert
+
 
 # Create a mapping of the field schema types to their associated converters
 FIELD_SCHEMA_CONVERTERS = {
@@ -207,8 +473,40 @@ FIELD_SCHEMA_CONVERTERS = {
 }
 
 
-def convert_value(field_schema_type, value, format_str=None, default_value=None, transform_case=None):
+def convert_value(
+        field_schema_type, value, format_str=None, default_value=None, transform_case=None, on_default=None):
+    """
+    Converts a value to a type with an optional format string. on_default is called without arguments if
+    the default value is substituted for the value.
+    """
+    return FIELD_SCHEMA_CONVERTERS[field_schema_type](value, format_str, default_value, transform_case, on_default)
+
+
+def _lenient(convert):
+    def convert_lenient(value):
+        try:
+            return convert(value)
+        except Exception:
+            return INVALID
+    return convert_lenient
+
+
+def get_converter(
+        field_schema_type, format_str=None, default_value=None, transform_case=None, infer_format=False,
+        lenient=False, on_default=None):
     """
-    Converts a value to a type with an optional format string.
+    Returns a single argument conversion function for a type with an optional format string. The converter
+    lookup is done once so that the returned function can be applied to many values.
+
+    If infer_format is True, date and datetime converters without a format string infer one from the first
+    values they convert. If lenient is True, the function returns INVALID instead of raising for values that
+    can not be converted. on_default is called without arguments whenever the function substitutes the
+    default value for a value, which is used for counting substitutions.
     """
-    return FIELD_SCHEMA_CONVERTERS[field_schema_type](value, format_str, default_value, transform_case)
+    converter = FIELD_SCHEMA_CONVERTERS[field_schema_type]
+    if infer_format and not format_str and isinstance(converter, DatetimeConverter):
+        convert = converter.bind_inferred(default_value, on_default=on_default)
+        return _lenient(convert) if lenient else convert
+    elif lenient:
+        return converter.bind_lenient(format_str, default_value, transform_case, on_default)
+    return converter.bind(format_str, default_value, transform_case, on_default)
@@ -0,0 +1,78 @@
+"""
+Functions for building pandas DataFrames with the dtypes of a schema. Rows are read into columns and each
+column is converted as a whole with ``convert_column``, so pandas never has to infer types from object
+columns. pandas is an optional dependency of this module.
+"""
+import numpy as np
+import pandas as pd
+
+from data_schema.convert_column import convert_field_column
+from data_schema.field_schema_type import FieldSchemaType
+
+
+# The pandas dtypes of the columns that each field schema type is converted to
+DATAFRAME_DTYPES = {
+    FieldSchemaType.DATE: 'datetime64[ns]',
+    FieldSchemaType.DATETIME: 'datetime64[ns]',
+    FieldSchemaType.DATE_FLOORED: 'datetime64[ns]',
+    FieldSchemaType.INT: 'Int64',
+    FieldSchemaType.FLOAT: 'Float64',
+    FieldSchemaType.STRING: 'string',
+    FieldSchemaType.BOOLEAN: 'boolean',
+    FieldSchemaType.DURATION: 'Int64',
+}
+
+
+def get_dtypes(compiled_schema):
+    """
+    Returns a dictionary of the pandas dtype of each field of a compiled schema keyed by field key, in field
+    order.
+    """
+    return {field.field_key: DATAFRAME_DTYPES[field.definition.field_type] for field in compiled_schema.fields}
+
+
+def _to_pandas_array(field_schema_type, column):
+    """
+    Wraps a column converted by ``convert_column`` in a pandas array of the dtype of the field schema type.
+    """
+    dtype = DATAFRAME_DTYPES[field_schema_type]
+    if field_schema_type == FieldSchemaType.BOOLEAN:
+        return pd.arrays.BooleanArray(column.data, np.ma.getmaskarray(column))
+    elif field_schema_type == FieldSchemaType.FLOAT:
+        return pd.arrays.FloatingArray(column.data, np.ma.getmaskarray(column))
+    elif dtype == 'Int64':
+        return pd.arrays.IntegerArray(column.data, np.ma.getmaskarray(column))
+    return pd.array(column, dtype=dtype)
+
+
+def _to_pandas_column(compiled_field, column):
+    """
+    Wraps a converted column of a field with ``_to_pandas_array``. Datetimes outside of the range of the
+    nanosecond datetimes of pandas (the years 1677 to 2262) raise OutOfBoundsDatetime, with the field key,
+    expected type and the first such datetime attached.
+    """
+    field_type = compiled_field.definition.field_type
+    try:
+        return _to_pandas_array(field_type, column)
+    except pd.errors.OutOfBoundsDatetime as e:
+        out_of_bounds = column[(column < np.datetime64(pd.Timestamp.min)) | (column > np.datetime64(pd.Timestamp.max))]
+        e.field_key = compiled_field.field_key
+        e.expected_type = field_type
+        e.bad_value = out_of_bounds[0].item() if len(out_of_bounds) else None
+        raise e
+
+
+def to_dataframe(compiled_schema, rows):
+    """
+    Builds a DataFrame with a column of the dtype of each field of a compiled schema from an iterable of
+    rows (lists, dictionaries or objects). The unconverted values of each field are read into a column,
+    and the columns are converted one at a time.
+    """
+    rows = rows if isinstance(rows, list) else list(rows)
+
+    columns = {}
+    for field in compiled_schema.fields:
+        column = convert_field_column(
+            field, [field.read_value(row) for row in rows], compiled_schema.infer_datetime_formats)
+        columns[field.field_key] = _to_pandas_column(field, column)
+    return pd.DataFrame(columns, columns=list(compiled_schema.field_keys))
@@ -0,0 +1,136 @@
+"""
+Streaming de-duplication of rows by their unique keys. Keys are hashed to fixed size digests so that only a
+few bytes are held per distinct key, and the digests can be spilled to a temporary SQLite database once a
+number of them is held in memory.
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+import tempfile
+
+
+# The number of bytes of the digests that unique keys are hashed to
+DIGEST_SIZE = 16
+
+
+class Keep(object):
+    """
+    Specifies which of the rows with the same unique key is kept when de-duplicating.
+    """
+    # The first row with a key, yielded as soon as it is read
+    FIRST = 'first'
+    # The last row with a key, yielded in the order of last occurrence once all rows are read
+    LAST = 'last'
+
+
+def hash_key(key):
+    """
+    Hashes a unique key to a digest of DIGEST_SIZE bytes. Equal keys of converted values have equal digests.
+    """
+    return hashlib.blake2b(repr(key).encode('utf-8'), digest_size=DIGEST_SIZE).digest()
+
+
+class _SpillDatabase(object):
+    """
+    A temporary SQLite database of digests, and optionally of the last row and position of each digest.
+    The database file is removed when it is closed.
+    """
+    def __init__(self, spill_dir=None):
+        fd, self.path = tempfile.mkstemp(prefix='data_schema_', suffix='.sqlite3', dir=spill_dir)
+        os.close(fd)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute('CREATE TABLE digests (digest BLOB PRIMARY KEY, position INTEGER, row BLOB)')
+
+    def __contains__(self, digest):
+        return self.connection.execute('SELECT 1 FROM digests WHERE digest = ?', (digest,)).fetchone() is not None
+
+    def add_digests(self, digests):
+        self.connection.executemany('INSERT OR IGNORE INTO digests (digest) VALUES (?)', ((d,) for d in digests))
+
+    def add_rows(self, rows_by_digest):
+        """
+        Stores a dictionary of (position, row) tuples keyed by digest, replacing any stored rows of the digests.
+        """
+        self.connection.executemany('INSERT OR REPLACE INTO digests VALUES (?, ?, ?)', (
+            (digest, position, pickle.dumps(row, pickle.HIGHEST_PROTOCOL))
+            for digest, (position, row) in rows_by_digest.items()
+        ))
+
+    def iter_rows(self):
+        """
+        Yields the stored rows in position order.
+        """
+        for (row,) in self.connection.execute('SELECT row FROM digests ORDER BY position'):
+            yield pickle.loads(row)
+
+    def close(self):
+        self.connection.close()
+        os.remove(self.path)
+
+
+def _deduplicate_first(get_unique_key, rows, max_memory_keys, spill_dir):
+    digests = set()
+    spill = None
+
+    try:
+        for row in rows:
+            digest = hash_key(get_unique_key(row))
+            if digest in digests or (spill is not None and digest in spill):
+                continue
+
+            digests.add(digest)
+            if max_memory_keys is not None and len(digests) >= max_memory_keys:
+                spill = spill or _SpillDatabase(spill_dir)
+                spill.add_digests(digests)
+                digests = set()
+
+            yield row
+    finally:
+        if spill is not None:
+            spill.close()
+
+
+def _deduplicate_last(get_unique_key, rows, max_memory_keys, spill_dir):
+    # Holds the position and row of the last occurrence of each digest, in order of last occurrence
+    latest = {}
+    spill = None
+
+    try:
+        for position, row in enumerate(rows):
+            digest = hash_key(get_unique_key(row))
+            latest.pop(digest, None)
+            latest[digest] = (position, row)
+
+            if max_memory_keys is not None and len(latest) >= max_memory_keys:
+                spill = spill or _SpillDatabase(spill_dir)
+                spill.add_rows(latest)
+                latest = {}
+
+        if spill is None:
+            for position, row in latest.values():
+                yield row
+        else:
+            spill.add_rows(latest)
+            yield from spill.iter_rows()
+    finally:
+        if spill is not None:
+            spill.close()
+
+
+def deduplicate(get_unique_key, rows, keep=Keep.FIRST, max_memory_keys=None, spill_dir=None):
+    """
+    Lazily de-duplicates an iterable of rows by the unique keys that get_unique_key returns for them.
+
+    With ``Keep.FIRST``, the first row of each key is yielded as it is read and only the digests of the keys
+    are held. With ``Keep.LAST``, the last row of each key is yielded once all rows are read, in the order
+    of the last occurrences, which requires holding the rows.
+
+    If max_memory_keys is given, the digests (and for ``Keep.LAST`` the pickled rows) are moved to a
+    temporary SQLite database in spill_dir whenever that many are held in memory, which bounds memory usage.
+    """
+    if keep == Keep.FIRST:
+        return _deduplicate_first(get_unique_key, rows, max_memory_keys, spill_dir)
+    elif keep == Keep.LAST:
+        return _deduplicate_last(get_unique_key, rows, max_memory_keys, spill_dir)
+    raise ValueError('Invalid keep {0}'.format(keep))
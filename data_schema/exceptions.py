@@ -2,3 +2,13 @@
 
 class InvalidDateFormatException(Exception):
     pass
+
+
+class ErrorBudgetExceededException(Exception):
+    """
+    Raised by lenient conversions when more values could not be converted than allowed. The errors
+    collected before aborting are available as ``errors``.
+    """
+    def __init__(self, message, errors):
+        super(ErrorBudgetExceededException, self).__init__(message)
+        self.errors = errors
@@ -0,0 +1,376 @@
+"""
+Loading converted rows into the model of a schema. Rows are converted with the compiled schema and upserted
+in batches keyed on the unique fields of the schema, or inserted with ``COPY`` on PostgreSQL.
+"""
+from collections import namedtuple
+from datetime import timezone
+import json
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import UniqueConstraint
+from manager_utils import bulk_upsert2
+
+from data_schema.compiled_schema import RowOutput, _iter_chunks
+from data_schema.field_schema_type import FieldSchemaType
+
+
+# The numbers of rows that an ingest inserted, updated and left unchanged
+IngestResult = namedtuple('IngestResult', ['inserted', 'updated', 'unchanged'])
+
+
+def get_model_field_names(compiled_schema, model):
+    """
+    Returns the field keys of the schema, raising a ValueError if any of them is not a concrete field of
+    the model.
+    """
+    model_field_names = {field.name for field in model._meta.concrete_fields}
+    model_field_names.update(field.attname for field in model._meta.concrete_fields)
+
+    missing_field_keys = [field_key for field_key in compiled_schema.field_keys if field_key not in model_field_names]
+    if missing_field_keys:
+        raise ValueError('{0} are not fields of {1}'.format(', '.join(missing_field_keys), model.__name__))
+    return compiled_schema.field_keys
+
+
+def get_model_factory(compiled_schema, model):
+    """
+    Returns a function that builds a model object from a dictionary of converted values. The values are
+    normalized with the ``to_python`` of their model fields, so that they compare equal to the values of
+    objects loaded from the database (dates of date fields and decimals of decimal fields, for example).
+    Datetime converters return naive datetimes in UTC, so they are made aware in UTC for datetime fields
+    when time zone support is enabled.
+    """
+    model_fields = [(field_key, model._meta.get_field(field_key)) for field_key in compiled_schema.field_keys]
+    aware_field_keys = frozenset(
+        field_key for field_key, model_field in model_fields
+        if settings.USE_TZ and model_field.get_internal_type() == 'DateTimeField'
+    )
+
+    def make_model_obj(values):
+        for field_key, model_field in model_fields:
+            value = values[field_key]
+            if value is None:
+                continue
+            if field_key in aware_field_keys and value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            values[field_key] = model_field.to_python(value)
+        return model(**values)
+    return make_model_obj
+
+
+def get_unique_field_sets(model):
+    """
+    Returns the sets of names of the fields of the model that the database enforces to be unique together,
+    from unique fields, ``unique_together`` and unconditional unique constraints.
+    """
+    opts = model._meta
+    unique_field_sets = [{field.name} for field in opts.concrete_fields if field.unique]
+    unique_field_sets.extend(set(field_names) for field_names in opts.unique_together)
+    unique_field_sets.extend(
+        set(constraint.fields) for constraint in opts.constraints
+        if isinstance(constraint, UniqueConstraint) and constraint.fields and constraint.condition is None
+    )
+    return unique_field_sets
+
+
+def can_upsert_natively(queryset, unique_fields):
+    """
+    Returns True if a batch can be upserted into the queryset with a native PostgreSQL upsert. Native upserts
+    run on the default database, ignore any filters of the queryset and need a unique constraint on exactly
+    the unique fields to conflict on.
+    """
+    if queryset.db != DEFAULT_DB_ALIAS or connections[queryset.db].vendor != 'postgresql':
+        return False
+    elif queryset.query.where:
+        return False
+
+    model = queryset.model
+    return {model._meta.get_field(field).name for field in unique_fields} in get_unique_field_sets(model)
+
+
+def _iter_existing(queryset, unique_fields, keys):
+    """
+    Yields the objects of the queryset that may have one of the unique keys. Objects are looked up by the
+    unique field with the most distinct values among the keys, in chunks of as many values as the database
+    accepts in a query, and the full keys are matched by the caller.
+    """
+    values_by_field = [set(key[index] for key in keys) for index in range(len(unique_fields))]
+    index = max(range(len(unique_fields)), key=lambda index: len(values_by_field[index]))
+    field = queryset.model._meta.get_field(unique_fields[index])
+    values = [value for value in values_by_field[index] if value is not None]
+
+    chunk_size = connections[queryset.db].ops.bulk_batch_size([field], values) or len(values)
+    for chunk in _iter_chunks(values, chunk_size):
+        yield from queryset.filter(**{'{0}__in'.format(unique_fields[index]): chunk})
+
+
+def _upsert_batch(queryset, model_objs, unique_fields, update_fields):
+    """
+    Upserts a batch of model objects by comparing them with the objects that exist in the queryset. This
+    works with every database, and objects whose values did not change are not written.
+    """
+    model_objs_by_key = {
+        tuple(getattr(model_obj, field) for field in unique_fields): model_obj for model_obj in model_objs
+    }
+    extant_model_objs = {}
+    for extant_model_obj in _iter_existing(queryset, unique_fields, model_objs_by_key):
+        key = tuple(getattr(extant_model_obj, field) for field in unique_fields)
+        if key in model_objs_by_key:
+            extant_model_objs[key] = extant_model_obj
+
+    model_objs_to_create, model_objs_to_update = [], []
+    for key, model_obj in model_objs_by_key.items():
+        extant_model_obj = extant_model_objs.get(key)
+        if extant_model_obj is None:
+            model_objs_to_create.append(model_obj)
+        elif any(getattr(extant_model_obj, field) != getattr(model_obj, field) for field in update_fields):
+            for field in update_fields:
+                setattr(extant_model_obj, field, getattr(model_obj, field))
+            model_objs_to_update.append(extant_model_obj)
+
+    if model_objs_to_update:
+        queryset.bulk_update(model_objs_to_update, update_fields)
+    queryset.bulk_create(model_objs_to_create)
+
+    num_unchanged = len(model_objs_by_key) - len(model_objs_to_create) - len(model_objs_to_update)
+    return IngestResult(len(model_objs_to_create), len(model_objs_to_update), num_unchanged)
+
+
+def _upsert_batch_native(queryset, model_objs, unique_fields, update_fields):
+    """
+    Upserts a batch of model objects with a single native PostgreSQL upsert that skips unchanged rows.
+    """
+    # Upserts can not touch a row twice, so only the last object of each unique key is kept
+    model_objs = list({
+        tuple(getattr(model_obj, field) for field in unique_fields): model_obj for model_obj in model_objs
+    }.values())
+    results = bulk_upsert2(
+        queryset, model_objs, unique_fields, update_fields, returning=[queryset.model._meta.pk.attname],
+        return_untouched=True)
+    return IngestResult(
+        sum(1 for _ in results.created), sum(1 for _ in results.updated), sum(1 for _ in results.untouched))
+
+
+def ingest(compiled_schema, queryset, rows, batch_size=1000):
+    """
+    Converts an iterable of rows with a compiled schema and upserts them into the model of the queryset
+    in batches of batch_size rows, keyed on the unique fields of the schema. Every field key of the schema
+    must be a field of the model. If several rows of a batch have the same unique key, the last one is
+    upserted. Returns an ``IngestResult`` of the numbers of inserted, updated and unchanged rows.
+
+    Batches are upserted with a single native upsert on PostgreSQL when ``can_upsert_natively`` allows it,
+    and otherwise by comparing them with the existing objects of the queryset.
+    """
+    if not compiled_schema.unique_fields:
+        raise ValueError('The schema has no unique fields to upsert by')
+
+    model = queryset.model
+    field_names = get_model_field_names(compiled_schema, model)
+    unique_fields = [field.field_key for field in compiled_schema.unique_fields]
+    update_fields = [field_name for field_name in field_names if field_name not in unique_fields]
+
+    if can_upsert_natively(queryset, unique_fields):
+        upsert_batch = _upsert_batch_native
+    else:
+        upsert_batch = _upsert_batch
+
+    make_model_obj = get_model_factory(compiled_schema, model)
+    inserted = updated = unchanged = 0
+    for batch in _iter_chunks(compiled_schema.convert_rows(rows), batch_size):
+        with transaction.atomic(using=queryset.db):
+            result = upsert_batch(queryset, [make_model_obj(values) for values in batch], unique_fields, update_fields)
+        inserted += result.inserted
+        updated += result.updated
+        unchanged += result.unchanged
+    return IngestResult(inserted, updated, unchanged)
+
+
+# The text format representation of NULL values in COPY
+COPY_NULL = '\\N'
+
+# The characters that are escaped in the text format of COPY
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+# The number of characters of COPY data that are sent to the database at a time
+COPY_BUFFER_SIZE = 1 << 16
+
+
+def _copy_string(value):
+    return str(value).translate(COPY_ESCAPES)
+
+
+def _copy_boolean(value):
+    return 't' if value else 'f'
+
+
+def _copy_datetime(value):
+    # Datetime converters return naive datetimes in UTC
+    return value.isoformat() + ('+00:00' if value.tzinfo is None else '')
+
+
+def _copy_date(value):
+    return value.date().isoformat()
+
+
+def get_copy_serializers(compiled_schema, model):
+    """
+    Returns a function for each field of the schema that serializes its converted, non-null values to the
+    text format of COPY. Date, datetime and floored date values are naive UTC datetimes, and are written
+    with an explicit UTC offset unless the model field is a date.
+    """
+    serializers = []
+    for field in compiled_schema.fields:
+        field_type = field.definition.field_type
+        if field_type == FieldSchemaType.BOOLEAN:
+            serializers.append(_copy_boolean)
+        elif field_type in (FieldSchemaType.DATE, FieldSchemaType.DATETIME, FieldSchemaType.DATE_FLOORED):
+            is_date = model._meta.get_field(field.field_key).get_internal_type() == 'DateField'
+            serializers.append(_copy_date if is_date else _copy_datetime)
+        elif field_type in (FieldSchemaType.INT, FieldSchemaType.FLOAT, FieldSchemaType.DURATION):
+            serializers.append(str)
+        else:
+            serializers.append(_copy_string)
+    return tuple(serializers)
+
+
+def _copy_value(value):
+    """
+    Serializes a prepared model field value of any type to the text format of COPY.
+    """
+    if value is None:
+        return COPY_NULL
+    elif isinstance(value, bool):
+        return _copy_boolean(value)
+    elif isinstance(value, (dict, list)):
+        return _copy_string(json.dumps(value))
+    return _copy_string(value)
+
+
+def _is_filled_by_database(field):
+    return field is field.model._meta.auto_field or getattr(field, 'generated', False)
+
+
+def get_copy_defaults(compiled_schema, model):
+    """
+    Returns the concrete fields of the model that are not fields of the schema, except for auto and generated
+    fields that the database fills in, along with a function for each of them that returns its default
+    value in the text format of COPY. These fields are filled in the same way as when model objects are
+    created, and callable defaults are called for every row.
+    """
+    field_keys = set(compiled_schema.field_keys)
+    default_fields, defaults = [], []
+    for field in model._meta.concrete_fields:
+        if field.name in field_keys or field.attname in field_keys or _is_filled_by_database(field):
+            continue
+
+        default_fields.append(field)
+        if field.has_default() and callable(field.default):
+            defaults.append(lambda field=field: _copy_value(field.get_prep_value(field.get_default())))
+        else:
+            default = _copy_value(field.get_prep_value(field.get_default()))
+            defaults.append(lambda default=default: default)
+    return default_fields, defaults
+
+
+def iter_copy_lines(compiled_schema, model, rows):
+    """
+    Lazily converts an iterable of rows and yields each of them as a line of the text format of COPY. The
+    columns of the fields of the schema are followed by the default values of the fields returned by
+    ``get_copy_defaults``.
+    """
+    serializers = get_copy_serializers(compiled_schema, model)
+    defaults = get_copy_defaults(compiled_schema, model)[1]
+    for values in compiled_schema.convert_rows(rows, output=RowOutput.TUPLE):
+        line = '\t'.join(
+            COPY_NULL if value is None else serialize(value) for serialize, value in zip(serializers, values))
+        if defaults:
+            line += ''.join('\t' + default() for default in defaults)
+        yield line + '\n'
+
+
+def _iter_buffered(lines, buffer_size=COPY_BUFFER_SIZE):
+    """
+    Joins lines into chunks of at least buffer_size characters.
+    """
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= buffer_size:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+class CopyStream(object):
+    """
+    A file-like object that reads lines of COPY data from an iterator, for drivers that copy from files.
+    """
+    def __init__(self, lines):
+        self._chunks = _iter_buffered(lines)
+        self._buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+
+        if size < 0:
+            data, self._buffer = self._buffer, ''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _copy_postgres(compiled_schema, queryset, rows):
+    """
+    Streams the converted rows into the table of the model with a single COPY in the text format and
+    returns the number of copied rows. Every column that the database does not fill in is copied, with
+    default values for the fields that are not in the schema. Both psycopg 3 and psycopg2 are supported.
+    """
+    connection = connections[queryset.db]
+    model = queryset.model
+    fields = [model._meta.get_field(field_key) for field_key in compiled_schema.field_keys]
+    fields.extend(get_copy_defaults(compiled_schema, model)[0])
+    sql = 'COPY {0} ({1}) FROM STDIN'.format(
+        connection.ops.quote_name(model._meta.db_table),
+        ', '.join(connection.ops.quote_name(field.column) for field in fields))
+    lines = iter_copy_lines(compiled_schema, model, rows)
+
+    with connection.cursor() as cursor:
+        driver_cursor = cursor.cursor
+        if hasattr(driver_cursor, 'copy_expert'):
+            driver_cursor.copy_expert(sql, CopyStream(lines))
+        else:
+            with driver_cursor.copy(sql) as copy:
+                for chunk in _iter_buffered(lines):
+                    copy.write(chunk)
+        return driver_cursor.rowcount
+
+
+def copy_rows(compiled_schema, queryset, rows, batch_size=1000):
+    """
+    Converts an iterable of rows with a compiled schema and inserts them into the model of the queryset.
+    On PostgreSQL the rows are streamed with a single ``COPY ... FROM STDIN``, and on other databases they
+    are inserted with ``bulk_create`` in batches of batch_size rows. Every field key of the schema must be
+    a field of the model, and the other fields of the model get their default values. Returns the number
+    of inserted rows.
+    """
+    model = queryset.model
+    get_model_field_names(compiled_schema, model)
+
+    if connections[queryset.db].vendor == 'postgresql':
+        with transaction.atomic(using=queryset.db):
+            return _copy_postgres(compiled_schema, queryset, rows)
+
+    make_model_obj = get_model_factory(compiled_schema, model)
+    num_rows = 0
+    with transaction.atomic(using=queryset.db):
+        for batch in _iter_chunks(compiled_schema.convert_rows(rows), batch_size):
+            queryset.bulk_create([make_model_obj(values) for values in batch])
+            num_rows += len(batch)
+    return num_rows
@@ -0,0 +1,229 @@
+"""
+Opt-in instrumentation of value conversions. While it is enabled, the conversions of compiled schemas and
+of ``DataSchema.get_value`` record call counts, latencies, None results, default substitutions and
+exceptions per schema and field. The metrics can be read with ``metrics.snapshot()`` and exported in the
+Prometheus text format with ``metrics.to_prometheus()``.
+
+Compiled schemas are instrumented when they are compiled, so schemas compiled while instrumentation is
+disabled do not pay for it. Instrumentation can be enabled at startup with the ``DATA_SCHEMA_INSTRUMENTATION``
+setting.
+"""
+from collections import Counter
+import random
+import threading
+import time
+
+from data_schema.convert_value import get_converter
+
+
+# The default number of latencies sampled per field for computing percentiles
+DEFAULT_RESERVOIR_SIZE = 1024
+
+# The latency percentiles that are exported
+EXPORTED_QUANTILES = (0.5, 0.9, 0.99)
+
+
+class FieldMetrics(object):
+    """
+    The conversion metrics of a field of a schema. Latencies are sampled into a fixed size reservoir so
+    that percentiles can be computed with bounded memory.
+    """
+    def __init__(self, schema_id, field_key, field_type, reservoir_size=DEFAULT_RESERVOIR_SIZE):
+        self.schema_id = schema_id
+        self.field_key = field_key
+        self.field_type = field_type
+        self.reservoir_size = reservoir_size
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.nulls = 0
+        self.defaults = 0
+        self.errors = Counter()
+        self._latencies = []
+        self._lock = threading.Lock()
+
+    def _record_latency(self, seconds):
+        self.calls += 1
+        self.total_seconds += seconds
+        if len(self._latencies) < self.reservoir_size:
+            self._latencies.append(seconds)
+        else:
+            index = random.randrange(self.calls)
+            if index < self.reservoir_size:
+                self._latencies[index] = seconds
+
+    def record_default(self):
+        """
+        Records a default value substitution. This is passed to converters as their on_default callback.
+        """
+        with self._lock:
+            self.defaults += 1
+
+    def convert(self, convert, value):
+        """
+        Converts a value with a conversion function and records the conversion. Default value substitutions
+        are recorded by the converter with ``record_default``.
+        """
+        start = time.perf_counter()
+        try:
+            converted_value = convert(value)
+        except Exception as e:
+            with self._lock:
+                self._record_latency(time.perf_counter() - start)
+                self.errors[getattr(e, 'expected_type', None)] += 1
+            raise
+
+        with self._lock:
+            self._record_latency(time.perf_counter() - start)
+            if converted_value is None:
+                self.nulls += 1
+        return converted_value
+
+    def percentile(self, q):
+        """
+        Returns an estimate of the q-th quantile (between 0 and 1) of the latency in seconds, or None if
+        nothing was recorded.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        return latencies[min(int(q * len(latencies)), len(latencies) - 1)]
+
+    def snapshot(self):
+        """
+        Returns a dictionary of the metrics.
+        """
+        with self._lock:
+            snapshot = {
+                'schema_id': self.schema_id,
+                'field_key': self.field_key,
+                'field_type': self.field_type,
+                'calls': self.calls,
+                'total_seconds': self.total_seconds,
+                'nulls': self.nulls,
+                'defaults': self.defaults,
+                'errors': dict(self.errors),
+            }
+        snapshot['percentiles'] = {q: self.percentile(q) for q in EXPORTED_QUANTILES}
+        return snapshot
+
+
+def _escape_label(value):
+    return str('' if value is None else value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(**labels):
+    return ','.join('{0}="{1}"'.format(name, _escape_label(value)) for name, value in labels.items())
+
+
+class ConversionMetrics(object):
+    """
+    The conversion metrics of all schemas and fields of the process.
+    """
+    def __init__(self, reservoir_size=DEFAULT_RESERVOIR_SIZE):
+        self.enabled = False
+        self.reservoir_size = reservoir_size
+        self._fields = {}
+        self._lock = threading.Lock()
+
+    def get_field_metrics(self, schema_id, field_key, field_type):
+        """
+        Returns the metrics of a field of a schema, creating them if they do not exist.
+        """
+        key = (schema_id, field_key)
+        field_metrics = self._fields.get(key)
+        if field_metrics is None:
+            with self._lock:
+                field_metrics = self._fields.setdefault(key, FieldMetrics(
+                    schema_id, field_key, field_type, self.reservoir_size))
+        return field_metrics
+
+    def instrument(self, schema_id, definition, infer_format=False):
+        """
+        Returns a conversion function of a field definition that records its conversions.
+        """
+        field_metrics = self.get_field_metrics(schema_id, definition.field_key, definition.field_type)
+        convert = get_converter(
+            definition.field_type, definition.field_format, definition.default_value, definition.transform_case,
+            infer_format=infer_format, on_default=field_metrics.record_default)
+
+        def instrumented_convert(value):
+            return field_metrics.convert(convert, value)
+        return instrumented_convert
+
+    def snapshot(self):
+        """
+        Returns a list of the metrics of every recorded field.
+        """
+        with self._lock:
+            fields = list(self._fields.values())
+        return [field_metrics.snapshot() for field_metrics in fields]
+
+    def reset(self):
+        """
+        Removes the metrics of all fields.
+        """
+        with self._lock:
+            self._fields.clear()
+
+    def to_prometheus(self):
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        samples = {
+            'data_schema_conversions_total': ('counter', 'Number of converted values.', []),
+            'data_schema_conversion_seconds': ('summary', 'Latency of value conversions.', []),
+            'data_schema_conversion_nulls_total': ('counter', 'Number of conversions that returned None.', []),
+            'data_schema_conversion_defaults_total': ('counter', 'Number of default value substitutions.', []),
+            'data_schema_conversion_errors_total': ('counter', 'Number of failed conversions.', []),
+        }
+
+        for snapshot in self.snapshot():
+            labels = {
+                'schema': snapshot['schema_id'], 'field': snapshot['field_key'], 'type': snapshot['field_type'],
+            }
+            samples['data_schema_conversions_total'][2].append(('', labels, snapshot['calls']))
+            samples['data_schema_conversion_nulls_total'][2].append(('', labels, snapshot['nulls']))
+            samples['data_schema_conversion_defaults_total'][2].append(('', labels, snapshot['defaults']))
+            latency_samples = samples['data_schema_conversion_seconds'][2]
+            for q, seconds in snapshot['percentiles'].items():
+                if seconds is not None:
+                    latency_samples.append(('', dict(labels, quantile=q), seconds))
+            latency_samples.append(('_sum', labels, snapshot['total_seconds']))
+            latency_samples.append(('_count', labels, snapshot['calls']))
+            for expected_type, count in snapshot['errors'].items():
+                samples['data_schema_conversion_errors_total'][2].append((
+                    '', dict(labels, expected_type=expected_type), count))
+
+        lines = []
+        for name, (metric_type, description, metric_samples) in samples.items():
+            lines.append('# HELP {0} {1}'.format(name, description))
+            lines.append('# TYPE {0} {1}'.format(name, metric_type))
+            for suffix, labels, value in metric_samples:
+                lines.append('{0}{1}{{{2}}} {3}'.format(name, suffix, _format_labels(**labels), repr(value)))
+        return '\n'.join(lines) + '\n'
+
+
+# The conversion metrics of this process
+metrics = ConversionMetrics()
+
+
+def enable():
+    """
+    Enables instrumentation. The registry of compiled schemas is cleared so that schemas are compiled again
+    with instrumentation.
+    """
+    from data_schema.registry import schema_registry
+
+    metrics.enabled = True
+    schema_registry.clear()
+
+
+def disable():
+    """
+    Disables instrumentation. Compiled schemas that are still referenced keep recording their conversions.
+    """
+    from data_schema.registry import schema_registry
+
+    metrics.enabled = False
+    schema_registry.clear()
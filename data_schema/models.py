@@ -1,9 +1,21 @@
+from functools import partial
+
+from asgiref.sync import sync_to_async
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldError
 from django.db import models, transaction
-from manager_utils import ManagerUtilsManager, sync
+from manager_utils import ManagerUtilsManager
 
+from data_schema.cache import get_cache, get_cache_key, get_cache_timeout
+from data_schema.compiled_schema import CompiledDataSchema, FieldDefinition, RowOutput
 from data_schema.convert_value import convert_value
+from data_schema.deduplication import Keep
 from data_schema.field_schema_type import FieldSchemaType
+from data_schema.ingest import copy_rows, ingest
+from data_schema.instrumentation import metrics
+from data_schema.readers import CsvHeader, read_csv
+from data_schema.registry import invalidate_data_schema, schema_registry, signal_invalidation_disabled
+from data_schema.snapshot import DataSchemaSnapshot
 
 
 class DataSchemaManager(ManagerUtilsManager):
@@ -12,7 +24,68 @@ class DataSchemaManager(ManagerUtilsManager):
     """
     def get_queryset(self):
         return super(DataSchemaManager, self).get_queryset().select_related(
-            'model_content_type').prefetch_related('fieldschema_set')
+            'model_content_type').prefetch_related('fieldschema_set', 'fieldschema_set__fieldoption_set')
+
+    def get_cached(self, pk):
+        """
+        Gets a data schema, its fields and their options from the data schema cache, or from the database
+        if the current version of the schema is not cached yet. Raises DoesNotExist if there is no schema.
+        """
+        cache = get_cache()
+        cache_key = get_cache_key(pk)
+
+        serialized = cache.get(cache_key)
+        if serialized is not None:
+            return self.model._deserialize(serialized, self.db)
+
+        data_schema = self.get(pk=pk)
+        cache.set(cache_key, data_schema._serialize(), get_cache_timeout())
+        return data_schema
+
+    def get_compiled(self, pk=None, model_content_type=None):
+        """
+        Gets the compiled schema of a data schema id or of a model content type from the schema registry
+        of this process. Compiled schemas are loaded with ``get_cached`` when they are not registered.
+        """
+        if model_content_type is not None:
+            return schema_registry.get_for_content_type(model_content_type)
+        return schema_registry.get(pk)
+
+    async def aget_compiled(self, pk=None, model_content_type=None):
+        """
+        Async version of ``get_compiled``. Registered schemas are returned without leaving the event loop,
+        and only schemas that need to be loaded are loaded in a thread.
+        """
+        compiled_schema = schema_registry.peek(pk=pk, model_content_type=model_content_type)
+        if compiled_schema is not None:
+            return compiled_schema
+        return await sync_to_async(self.get_compiled)(pk=pk, model_content_type=model_content_type)
+
+
+def _serialize_model(obj):
+    """
+    Returns the values of the concrete fields of a model instance.
+    """
+    return {field.attname: getattr(obj, field.attname) for field in obj._meta.concrete_fields}
+
+
+def _deserialize_model(model, values, db):
+    """
+    Builds a model instance as if it were loaded from the database.
+    """
+    concrete_fields = model._meta.concrete_fields
+    return model.from_db(
+        db, [field.attname for field in concrete_fields], [values[field.attname] for field in concrete_fields])
+
+
+def _set_prefetched(obj, related_name, related_objs):
+    """
+    Caches related objects on an instance in the same way prefetch_related does.
+    """
+    queryset = getattr(obj, related_name).all()
+    queryset._result_cache = related_objs
+    queryset._prefetch_done = True
+    obj._prefetched_objects_cache = {related_name: queryset}
 
 
 class DataSchema(models.Model):
@@ -29,6 +102,41 @@ class DataSchema(models.Model):
     # A custom model manager that caches objects
     objects = DataSchemaManager()
 
+    def _serialize(self):
+        """
+        Serializes the schema, its fields and their options to a dictionary of primitive values.
+        """
+        return dict(_serialize_model(self), fieldschema_set=[
+            dict(_serialize_model(field), fieldoption_set=[
+                _serialize_model(field_option) for field_option in field.fieldoption_set.all()
+            ])
+            for field in self.fieldschema_set.all()
+        ])
+
+    @classmethod
+    def _deserialize(cls, serialized, db):
+        """
+        Builds a schema from its serialized values. The fields and their options are cached on the
+        schema as if they were prefetched, so using it does not query the database.
+        """
+        data_schema = _deserialize_model(cls, serialized, db)
+        if data_schema.model_content_type_id is not None:
+            data_schema.model_content_type = ContentType.objects.db_manager(db).get_for_id(
+                data_schema.model_content_type_id)
+
+        fields = []
+        for field_values in serialized['fieldschema_set']:
+            field = _deserialize_model(FieldSchema, field_values, db)
+            FieldSchema.data_schema.field.set_cached_value(field, data_schema)
+            _set_prefetched(field, 'fieldoption_set', [
+                _deserialize_model(FieldOption, option_values, db)
+                for option_values in field_values['fieldoption_set']
+            ])
+            fields.append(field)
+
+        _set_prefetched(data_schema, 'fieldschema_set', fields)
+        return data_schema
+
     @transaction.atomic
     def update(self, **updates):
         """
@@ -44,55 +152,125 @@ class DataSchema(models.Model):
             'field_position': The position of this field if it can be parsed by an array (or None by default),
             'field_format': The format of this field (or None by default),
             'default_value': The default value of this field (or None by default),
+            'transform_case': The FieldSchemaCase of this field (or None by default),
             'fieldoption_set': The set of options for the field schema (optional),
         }, {
             Additional field schemas...
         }]
+
+        Only the values that differ from the stored schema are written, and a fixed number of queries is
+        used regardless of the number of fields. Returns True if anything changed.
+        """
+        with signal_invalidation_disabled():
+            changed = self._update_model_content_type(updates)
+            if 'fieldschema_set' in updates:
+                fields_changed, field_ids = self._update_field_schemas(updates['fieldschema_set'])
+                options_changed = self._update_field_options(updates['fieldschema_set'], field_ids)
+                changed = changed or fields_changed or options_changed
+
+        if changed:
+            # Make all processes load the updated schema once it has been committed
+            invalidate_data_schema(self.pk)
+            self._clear_field_caches()
+        return changed
+
+    async def aupdate(self, **updates):
+        """
+        Async version of ``update``. The update runs in a single thread since it is done in a transaction.
         """
+        return await sync_to_async(self.update)(**updates)
+
+    def _update_model_content_type(self, updates):
+        """
+        Saves the schema if it is new or if its model content type is updated. Returns True if it was saved.
+        """
+        changed = self.pk is None
         if 'model_content_type' in updates:
-            self.model_content_type = updates['model_content_type']
-
-        self.save()
-
-        if 'fieldschema_set' in updates:
-            # Sync the field schema models
-            field_schemas = [
-                FieldSchema(
-                    data_schema=self,
-                    field_key=fs_values['field_key'],
-                    display_name=fs_values.get('display_name', ''),
-                    field_type=fs_values['field_type'],
-                    uniqueness_order=fs_values.get('uniqueness_order', None),
-                    field_position=fs_values.get('field_position', None),
-                    field_format=fs_values.get('field_format', None),
-                    default_value=fs_values.get('default_value', None),
-                    has_options=bool(('fieldoption_set' in fs_values) and fs_values['fieldoption_set']),
-                    transform_case=fs_values.get('transform_case', None),
-                )
-                for fs_values in updates['fieldschema_set']
-            ]
-
-            sync(
-                self.fieldschema_set.all(),
-                field_schemas,
-                ['field_key'],
-                [
-                    'display_name', 'field_key', 'field_type', 'uniqueness_order', 'field_position',
-                    'field_format', 'default_value', 'has_options', 'transform_case'
-                ]
-            )
-
-            # Sync the options of the field schema models if they are present
-            for fs_values in updates['fieldschema_set']:
-                if 'fieldoption_set' in fs_values:
-                    fs = self.fieldschema_set.get(field_key=fs_values['field_key'])
-                    sync(fs.fieldoption_set.all(), [
-                        FieldOption(
-                            field_schema=fs,
-                            value=f_option,
-                        )
-                        for f_option in fs_values['fieldoption_set']
-                    ], ['value'], ['value'])
+            model_content_type = updates['model_content_type']
+            changed = changed or self.model_content_type_id != getattr(model_content_type, 'id', None)
+            self.model_content_type = model_content_type
+
+        if changed:
+            self.save()
+        return changed
+
+    def _update_field_schemas(self, fieldschema_set):
+        """
+        Syncs the field schemas with a list of field schema templates by fetching all fields at once and
+        diffing them in memory. Returns whether anything changed and the ids of the fields by field key.
+        """
+        existing_fields = {field.field_key: field for field in FieldSchema.objects.filter(data_schema=self)}
+        fields = []
+        fields_to_create = []
+        fields_to_update = []
+
+        for fs_values in fieldschema_set:
+            values = FieldSchema._get_update_values(fs_values)
+            field = existing_fields.pop(values['field_key'], None)
+            if field is None:
+                field = FieldSchema(data_schema=self, **values)
+                fields_to_create.append(field)
+            elif any(getattr(field, attr) != value for attr, value in values.items()):
+                for attr, value in values.items():
+                    setattr(field, attr, value)
+                fields_to_update.append(field)
+            fields.append(field)
+
+        if existing_fields:
+            FieldSchema.objects.filter(id__in=[field.id for field in existing_fields.values()]).delete()
+        if fields_to_update:
+            # Use the queryset since the manager's bulk_update relies on postgres specific sql
+            FieldSchema.objects.all().bulk_update(fields_to_update, FieldSchema.UPDATE_FIELDS)
+        if fields_to_create:
+            FieldSchema.objects.bulk_create(fields_to_create)
+
+        if any(field.id is None for field in fields_to_create):
+            # Databases that do not return the ids of created rows need them to be fetched
+            field_ids = dict(FieldSchema.objects.filter(data_schema=self).values_list('field_key', 'id'))
+        else:
+            field_ids = {field.field_key: field.id for field in fields}
+
+        return bool(existing_fields or fields_to_update or fields_to_create), field_ids
+
+    def _update_field_options(self, fieldschema_set, field_ids):
+        """
+        Syncs the options of the field schemas that have a 'fieldoption_set' in their template with one
+        query for fetching them. Returns True if any options were created or deleted.
+        """
+        option_values = {
+            fs_values['field_key']: set(str(value) for value in fs_values['fieldoption_set'])
+            for fs_values in fieldschema_set if 'fieldoption_set' in fs_values
+        }
+        if not option_values:
+            return False
+
+        field_keys = {field_ids[field_key]: field_key for field_key in option_values}
+        options_to_delete = []
+        for field_option in FieldOption.objects.filter(field_schema_id__in=field_keys.keys()):
+            values = option_values[field_keys[field_option.field_schema_id]]
+            if field_option.value in values:
+                values.remove(field_option.value)
+            else:
+                options_to_delete.append(field_option.id)
+
+        options_to_create = [
+            FieldOption(field_schema_id=field_ids[field_key], value=value)
+            for field_key, values in option_values.items() for value in sorted(values)
+        ]
+
+        if options_to_delete:
+            FieldOption.objects.filter(id__in=options_to_delete).delete()
+        if options_to_create:
+            FieldOption.objects.bulk_create(options_to_create)
+        return bool(options_to_delete or options_to_create)
+
+    def _clear_field_caches(self):
+        """
+        Clears the fields and anything derived from them that is cached on the schema.
+        """
+        for attr in ('_unique_fields', '_field_map', '_compiled_schemas'):
+            self.__dict__.pop(attr, None)
+        getattr(self, '_prefetched_objects_cache', {}).pop('fieldschema_set', None)
 
     def get_unique_fields(self):
         """
@@ -124,23 +302,261 @@ class DataSchema(models.Model):
             }
         return self._field_map
 
+    def compile(self, infer_datetime_formats=False):
+        """
+        Returns a cached, immutable ``CompiledDataSchema`` of the fields. Each compiled field holds
+        pre-bound accessors and a converter with its format, default value and case transform applied,
+        so reading values with it does no per-value dispatch.
+
+        If infer_datetime_formats is True, date and datetime fields without a field format infer a
+        strptime format from the first values they convert.
+        """
+        if not hasattr(self, '_compiled_schemas'):
+            self._compiled_schemas = {}
+
+        # Schemas are compiled again when instrumentation is enabled or disabled
+        key = (infer_datetime_formats, metrics.enabled)
+        if key not in self._compiled_schemas:
+            self._compiled_schemas[key] = CompiledDataSchema.from_field_schemas(
+                self.get_fields(), infer_datetime_formats=infer_datetime_formats, schema_id=self.pk)
+        return self._compiled_schemas[key]
+
+    async def acompile(self, infer_datetime_formats=False):
+        """
+        Async version of ``compile``. The fields are only loaded in a thread if they are not loaded yet.
+        """
+        compiled_schema = getattr(self, '_compiled_schemas', {}).get((infer_datetime_formats, metrics.enabled))
+        if compiled_schema is not None:
+            return compiled_schema
+        return await sync_to_async(self.compile)(infer_datetime_formats=infer_datetime_formats)
+
+    async def aget_value(self, obj, field_key):
+        """
+        Async version of ``get_value`` that reads the value with the compiled schema.
+        """
+        return (await self.acompile()).get_value(obj, field_key)
+
     def get_value(self, obj, field_key):
         """
         Given an object and a field key, return the value of the field in the object.
         """
         try:
-            return self._get_field_map()[field_key].get_value(obj)
+            field = self._get_field_map()[field_key]
+            if metrics.enabled:
+                field_metrics = metrics.get_field_metrics(self.pk, field_key, field.field_type)
+                convert = partial(
+                    convert_value, field.field_type, format_str=field.field_format,
+                    default_value=field.default_value, transform_case=field.transform_case,
+                    on_default=field_metrics.record_default)
+                return field_metrics.convert(convert, field.read_value(obj))
+            return field.get_value(obj)
         except Exception as e:
             # Attach additional information to the exception to make higher level error handling easier
             e.field_key = field_key
             raise e
 
+    def convert_rows(self, rows, output=RowOutput.DICT):
+        """
+        Lazily converts an iterable of rows (lists, dictionaries or model instances) with the compiled
+        schema. Yields each converted row as a dictionary keyed by field key, a tuple in the order of
+        ``get_fields`` or an instance of ``record_class``, depending on the ``RowOutput`` type given as output.
+        """
+        return self.compile().convert_rows(rows, output=output)
+
+    def _get_model_queryset(self, queryset=None):
+        """
+        Returns the queryset if it is given, or else all objects of the model content type of the schema.
+        """
+        if queryset is not None:
+            return queryset
+        if self.model_content_type_id is None:
+            raise ValueError('A queryset is required for schemas without a model content type')
+        return self.model_content_type.model_class()._default_manager.all()
+
+    def iter_queryset(self, queryset=None, chunk_size=2000, output=RowOutput.DICT):
+        """
+        Lazily converts the rows of a queryset, which defaults to all objects of the model content type of
+        the schema. Only the field keys of the schema are selected with ``values_list``, the rows are
+        streamed with ``iterator(chunk_size)`` and the values are converted with the compiled schema, so
+        no model instances are built. If a field key is not a field of the model, for example a property,
+        model instances are streamed and converted instead.
+        """
+        queryset = self._get_model_queryset(queryset)
+        compiled_schema = self.compile()
+        try:
+            values = queryset.values_list(*compiled_schema.field_keys)
+        except FieldError:
+            return compiled_schema.convert_rows(queryset.iterator(chunk_size=chunk_size), output=output)
+        return compiled_schema.convert_value_rows(values.iterator(chunk_size=chunk_size), output=output)
+
+    def ingest(self, rows, batch_size=1000, queryset=None):
+        """
+        Converts an iterable of rows with the compiled schema and upserts them in batches of batch_size rows
+        into the queryset, which defaults to all objects of the model content type of the schema. Rows are
+        keyed on the unique fields of the schema, and rows whose values did not change are not written.
+        Returns an ``IngestResult`` of the numbers of inserted, updated and unchanged rows. See
+        ``data_schema.ingest.ingest``.
+        """
+        return ingest(self.compile(), self._get_model_queryset(queryset), rows, batch_size=batch_size)
+
+    def copy_rows(self, rows, batch_size=1000, queryset=None):
+        """
+        Converts an iterable of rows with the compiled schema and inserts them into the queryset, which
+        defaults to all objects of the model content type of the schema. On PostgreSQL the rows are streamed
+        with ``COPY ... FROM STDIN``, and elsewhere they are inserted with ``bulk_create`` in batches of
+        batch_size rows. Returns the number of inserted rows. See ``data_schema.ingest.copy_rows``.
+        """
+        return copy_rows(self.compile(), self._get_model_queryset(queryset), rows, batch_size=batch_size)
+
+    def dtypes(self):
+        """
+        Returns a dictionary of the pandas dtype of each field keyed by field key, in the order of
+        ``get_fields``. Requires pandas.
+        """
+        from data_schema.dataframes import get_dtypes
+
+        return get_dtypes(self.compile())
+
+    def to_dataframe(self, rows):
+        """
+        Builds a pandas DataFrame with the dtypes of ``dtypes`` from an iterable of rows. The values are read
+        into columns that are converted one at a time with ``convert_column``. Requires pandas.
+        """
+        from data_schema.dataframes import to_dataframe
+
+        return to_dataframe(self.compile(), rows)
+
+    def arrow_schema(self):
+        """
+        Returns the ``pyarrow.Schema`` of the fields, with the field type, display name and uniqueness order
+        of each field kept as field metadata. Requires pyarrow.
+        """
+        from data_schema.arrow import get_arrow_schema
+
+        return get_arrow_schema(self.compile())
+
+    def to_arrow(self, rows, batch_size=10000):
+        """
+        Lazily converts an iterable of rows to ``pyarrow.RecordBatch`` objects of up to batch_size rows with the
+        schema of ``arrow_schema``. The values of each batch are converted one column at a time. Requires pyarrow.
+        """
+        from data_schema.arrow import iter_record_batches
+
+        return iter_record_batches(self.compile(), rows, batch_size=batch_size)
+
+    def write_parquet(self, rows, where, batch_size=10000, **kwargs):
+        """
+        Converts an iterable of rows and streams them to a Parquet file at a path or in a writable file one
+        record batch at a time. Returns the number of written rows. See ``data_schema.arrow.write_parquet``.
+        """
+        from data_schema.arrow import write_parquet
+
+        return write_parquet(self.compile(), rows, where, batch_size=batch_size, **kwargs)
+
+    def read_csv(self, path_or_file, header=CsvHeader.POSITION, chunk_size=10000, output=RowOutput.DICT, **kwargs):
+        """
+        Lazily reads and converts the rows of a CSV or TSV file. Columns are mapped to fields by field position,
+        or by the column names in the first row with ``header=CsvHeader.NAMES``. Only the columns that fields
+        reference are converted. See ``data_schema.readers.read_csv``.
+        """
+        return read_csv(
+            self.compile(), path_or_file, header=header, chunk_size=chunk_size, output=output, **kwargs)
+
+    def view(self, obj):
+        """
+        Returns a read-only mapping of the converted values of an object keyed by field key. Each value is
+        converted the first time it is read and memoized, and ``materialize`` converts all of them at once.
+        """
+        return self.compile().view(obj)
+
+    def views(self, rows):
+        """
+        Lazily wraps an iterable of rows in views without converting any values up front.
+        """
+        return self.compile().views(rows)
+
+    def record_class(self):
+        """
+        Returns the generated record class of the compiled schema. It has a slot for each field in the order
+        of ``get_fields`` and is used for rows converted with ``RowOutput.RECORD``.
+        """
+        return self.compile().record_class()
+
+    async def aconvert_rows(self, rows, output=RowOutput.DICT, chunk_size=1000):
+        """
+        Converts an iterable or an async iterable of rows with the compiled schema and asynchronously yields
+        the converted rows. Rows are converted in chunks of chunk_size rows, and control is given back to
+        the event loop after every chunk. See ``CompiledDataSchema.aconvert_rows``.
+        """
+        compiled_schema = await self.acompile()
+        async for converted_row in compiled_schema.aconvert_rows(rows, output=output, chunk_size=chunk_size):
+            yield converted_row
+
+    def convert_rows_lenient(self, rows, output=RowOutput.DICT, max_errors=None):
+        """
+        Converts an iterable of rows without raising for values that can not be converted. Returns the
+        converted rows along with a table of the row index, field key, bad value and expected type of
+        every value that could not be converted. An ErrorBudgetExceededException is raised as soon as
+        there are more than max_errors errors. See ``CompiledDataSchema.convert_rows_lenient``.
+        """
+        return self.compile().convert_rows_lenient(rows, output=output, max_errors=max_errors)
+
+    def to_snapshot(self, infer_datetime_formats=False):
+        """
+        Returns a ``DataSchemaSnapshot`` of the fields and options of the schema. Snapshots can be serialized
+        with ``to_bytes`` and loaded with ``DataSchemaSnapshot.from_bytes`` in processes without a database.
+        """
+        model_content_type = None
+        if self.model_content_type_id is not None:
+            model_content_type = self.model_content_type.natural_key()
+
+        return DataSchemaSnapshot(
+            [FieldDefinition.from_field_schema(field_schema) for field_schema in self.get_fields()],
+            infer_datetime_formats=infer_datetime_formats, schema_id=self.pk, model_content_type=model_content_type)
+
+    def convert_rows_parallel(self, rows, output=RowOutput.DICT, chunk_size=1000, max_workers=None):
+        """
+        Converts an iterable of rows across a pool of worker processes, yielding converted rows in order.
+        The workers receive a database-free copy of the compiled schema. See
+        ``CompiledDataSchema.convert_rows_parallel``.
+        """
+        return self.compile().convert_rows_parallel(
+            rows, output=output, chunk_size=chunk_size, max_workers=max_workers)
+
+    def get_unique_key(self, obj):
+        """
+        Given an object, return a tuple of the converted values of the unique fields in the object,
+        in the order of ``get_unique_fields``.
+        """
+        return self.compile().get_unique_key(obj)
+
+    def unique_keys(self, rows):
+        """
+        Lazily yields the unique key of each row of an iterable of rows.
+        """
+        return self.compile().unique_keys(rows)
+
+    def deduplicate(self, rows, keep=Keep.FIRST, max_memory_keys=None, spill_dir=None):
+        """
+        Lazily yields the rows of an iterable that have distinct unique keys, keeping the first or the
+        last row of each key. Keys are held as fixed size digests and can be spilled to a temporary
+        SQLite database in spill_dir once max_memory_keys are held. See ``CompiledDataSchema.deduplicate``.
+        """
+        return self.compile().deduplicate(rows, keep=keep, max_memory_keys=max_memory_keys, spill_dir=spill_dir)
+
     def set_value(self, obj, field_key, value):
         """
         Given an object and a field key, set the value of the field in the object.
         """
         return self._get_field_map()[field_key].set_value(obj, value)
 
+    def validate_options(self, field_key, values):
+        """
+        Given a field key and a list of values, return the indices of the values that are not valid
+        options of the field.
+        """
+        return self._get_field_map()[field_key].validate_options(values)
+
 
 class FieldSchema(models.Model):
     """
@@ -188,22 +604,102 @@ class FieldSchema(models.Model):
     # Use django manager utils to manage FieldSchema objects
     objects = ManagerUtilsManager()
 
+    # The fields that are set from the templates given to DataSchema.update
+    UPDATE_FIELDS = [
+        'display_name', 'field_type', 'uniqueness_order', 'field_position', 'field_format', 'default_value',
+        'has_options', 'transform_case',
+    ]
+
+    @classmethod
+    def _get_update_values(cls, fs_values):
+        """
+        Returns the field values of a field schema template given to DataSchema.update, converted to the
+        python types they are stored as.
+        """
+        values = {
+            'field_key': fs_values['field_key'],
+            'display_name': fs_values.get('display_name', ''),
+            'field_type': fs_values['field_type'],
+            'uniqueness_order': fs_values.get('uniqueness_order', None),
+            'field_position': fs_values.get('field_position', None),
+            'field_format': fs_values.get('field_format', None),
+            'default_value': fs_values.get('default_value', None),
+            'has_options': bool(('fieldoption_set' in fs_values) and fs_values['fieldoption_set']),
+            'transform_case': fs_values.get('transform_case', None),
+        }
+        return {attr: cls._meta.get_field(attr).to_python(value) for attr, value in values.items()}
+
+    def get_option_values(self):
+        """
+        Returns a set of the possible values of the field. The values are built by calling self.get_value
+        on the stored value options, which makes sure they are the right data type because they are stored
+        as strings. Options are read from the database unless they are prefetched, in which case the
+        values are built once and cached for as long as the same prefetched options are on the instance.
+        """
+        field_options = self._get_prefetched_options()
+        if field_options is None:
+            return self._build_option_values(self.fieldoption_set.all())
+        return self._get_cached_option_values(field_options)
+
+    async def aget_option_values(self):
+        """
+        Async version of ``get_option_values``. Options that are not prefetched are fetched with an async query.
+        """
+        field_options = self._get_prefetched_options()
+        if field_options is None:
+            field_options = self.fieldoption_set.all()
+            if hasattr(field_options, '__aiter__'):
+                field_options = [field_option async for field_option in field_options]
+            else:
+                # Querysets can only be iterated asynchronously as of Django 4.1
+                field_options = await sync_to_async(list)(field_options)
+            return self._build_option_values(field_options)
+        return self._get_cached_option_values(field_options)
+
+    def _get_prefetched_options(self):
+        return getattr(self, '_prefetched_objects_cache', {}).get('fieldoption_set')
+
+    def _get_cached_option_values(self, field_options):
+        # The cached values are only valid for the prefetched options they were built from
+        cached = self.__dict__.get('_option_values')
+        if cached is None or cached[0] is not field_options:
+            cached = self._option_values = (field_options, self._build_option_values(field_options))
+        return cached[1]
+
+    def _build_option_values(self, field_options):
+        return frozenset(
+            self.get_value({
+                self.field_key: field_option.value
+            })
+            for field_option in field_options
+        )
+
+    def clear_option_cache(self):
+        """
+        Clears the cached option values, along with any prefetched options.
+        """
+        self.__dict__.pop('_option_values', None)
+        getattr(self, '_prefetched_objects_cache', {}).pop('fieldoption_set', None)
+
+    def validate_options(self, values):
+        """
+        Given a list of values, return the indices of the values that are not valid options of the field.
+        All values are valid if the field does not have options.
+        """
+        if not self.has_options:
+            return []
+        option_values = self.get_option_values()
+        return [index for index, value in enumerate(values) if value not in option_values]
+
     def set_value(self, obj, value):
         """
         Given an object, set the value of the field in that object.
         """
-        if self.has_options:
-            # Build a set of possible values by calling self.get_value on the stored value options. This will
-            # make sure they are the right data type because they are stored as strings
-            values = set(
-                self.get_value({
-                    self.field_key: field_option.value
-                })
-                for field_option in self.fieldoption_set.all()
-            )
-            if value not in values:
-                raise Exception('Invalid option for {0}'.format(self.field_key))
+        if self.has_options and value not in self.get_option_values():
+            raise Exception('Invalid option for {0}'.format(self.field_key))
+        self._set_value(obj, value)
 
+    def _set_value(self, obj, value):
         if isinstance(obj, list):
             obj[self.field_position] = value
         elif isinstance(obj, dict):
@@ -211,19 +707,37 @@ class FieldSchema(models.Model):
         else:
             setattr(obj, self.field_key, value)
 
-    def get_value(self, obj):
+    async def aset_value(self, obj, value):
         """
-        Given an object, return the value of the field in that object.
+        Async version of ``set_value``. The options of the field are fetched with an async query if they
+        are not prefetched.
+        """
+        if self.has_options and value not in await self.aget_option_values():
+            raise Exception('Invalid option for {0}'.format(self.field_key))
+        self._set_value(obj, value)
+
+    def read_value(self, obj):
+        """
+        Given an object, return the unconverted value of the field in that object.
         """
         if isinstance(obj, list):
-            value = obj[self.field_position] if 0 <= self.field_position < len(obj) else None
+            return obj[self.field_position] if 0 <= self.field_position < len(obj) else None
         elif isinstance(obj, dict):
-            value = obj[self.field_key] if self.field_key in obj else None
-        else:
-            value = getattr(obj, self.field_key) if hasattr(obj, self.field_key) else None
+            return obj[self.field_key] if self.field_key in obj else None
+        return getattr(obj, self.field_key) if hasattr(obj, self.field_key) else None
 
+    def convert(self, value):
+        """
+        Converts a value with the type, format, default value and case transform of the field.
+        """
         return convert_value(self.field_type, value, self.field_format, self.default_value, self.transform_case)
 
+    def get_value(self, obj):
+        """
+        Given an object, return the value of the field in that object.
+        """
+        return self.convert(self.read_value(obj))
+
     def save(self, *args, **kwargs):
         if not self.display_name:
             self.display_name = self.field_key
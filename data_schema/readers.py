@@ -0,0 +1,108 @@
+"""
+Streaming readers of delimited text files. Only the columns that the fields of a schema reference are read,
+and their values are converted with the compiled converters of the fields.
+"""
+import csv
+from itertools import islice
+from operator import itemgetter
+import os
+
+from data_schema.compiled_schema import RowOutput
+
+
+class CsvHeader(object):
+    """
+    Specifies how the columns of a CSV file are mapped to fields.
+    """
+    # Columns are mapped by the field position of each field and the file has no header row
+    POSITION = 'position'
+    # The first row of the file holds column names that are mapped to field keys
+    NAMES = 'names'
+
+
+def _get_column_indices(compiled_schema, header, reader):
+    """
+    Returns the index of the column of each field in field order, or None for fields without a column. The
+    header is validated by ``read_csv``.
+    """
+    if header == CsvHeader.POSITION:
+        return [
+            field_position if field_position is not None and field_position >= 0 else None
+            for field_position in (field.definition.field_position for field in compiled_schema.fields)
+        ]
+
+    header_row = next((row for row in reader if row), [])
+    column_indices = {name: index for index, name in reversed(list(enumerate(header_row)))}
+    return [column_indices.get(field_key) for field_key in compiled_schema.field_keys]
+
+
+def _get_projection(column_indices):
+    """
+    Returns a function that reads the referenced columns of a row in field order. Missing columns are read
+    as None.
+    """
+    def project_padded(row):
+        return [row[index] if index is not None and index < len(row) else None for index in column_indices]
+
+    indices = [index for index in column_indices if index is not None]
+    if len(indices) != len(column_indices) or not indices:
+        return project_padded
+
+    # Rows with all referenced columns are read with a single itemgetter call
+    min_length = max(indices) + 1
+    get_columns = itemgetter(*indices) if len(indices) > 1 else lambda row: (row[indices[0]],)
+
+    def project(row):
+        return get_columns(row) if len(row) >= min_length else project_padded(row)
+    return project
+
+
+def _convert_csv_rows(compiled_schema, reader, column_indices, chunk_size, row_factory):
+    project = _get_projection(column_indices)
+    converters = tuple(field.convert for field in compiled_schema.fields)
+    field_keys = compiled_schema.field_keys
+
+    chunk = list(islice(reader, chunk_size))
+    while chunk:
+        for row in chunk:
+            # csv.reader reads blank lines as empty rows
+            if not row:
+                continue
+
+            values = []
+            try:
+                for convert, value in zip(converters, project(row)):
+                    values.append(convert(value))
+            except Exception as e:
+                e.field_key = field_keys[len(values)]
+                raise e
+
+            yield row_factory(values)
+        chunk = list(islice(reader, chunk_size))
+
+
+def read_csv(
+        compiled_schema, path_or_file, header=CsvHeader.POSITION, chunk_size=10000, output=RowOutput.DICT,
+        encoding='utf-8', **fmtparams):
+    """
+    Lazily reads and converts the rows of a CSV file at a path or in an open text file. Columns are mapped
+    to fields by field position, or by the names in the first row of the file if header is
+    ``CsvHeader.NAMES``. Rows are read chunk_size rows at a time, and columns that no field references
+    are never converted. Any other keyword arguments, such as ``delimiter='\\t'`` for TSV files, are passed
+    to ``csv.reader``.
+    """
+    row_factory = compiled_schema._get_row_factory(output)
+    if header not in (CsvHeader.POSITION, CsvHeader.NAMES):
+        raise ValueError('Invalid CSV header {0}'.format(header))
+    return _read_csv(compiled_schema, path_or_file, header, chunk_size, row_factory, encoding, fmtparams)
+
+
+def _read_csv(compiled_schema, path_or_file, header, chunk_size, row_factory, encoding, fmtparams):
+    if isinstance(path_or_file, (str, bytes, os.PathLike)):
+        with open(path_or_file, newline='', encoding=encoding) as f:
+            yield from _read_csv(compiled_schema, f, header, chunk_size, row_factory, encoding, fmtparams)
+        return
+
+    reader = csv.reader(path_or_file, **fmtparams)
+    column_indices = _get_column_indices(compiled_schema, header, reader)
+    yield from _convert_csv_rows(compiled_schema, reader, column_indices, chunk_size, row_factory)
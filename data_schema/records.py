@@ -0,0 +1,107 @@
+"""
+Generated record classes for converted rows. A record class has one slot per field of a schema, so its
+instances do not carry a per-row dictionary and take a fraction of the memory of a converted dictionary.
+"""
+from keyword import iskeyword
+import threading
+import weakref
+
+
+# The generated record classes that are in use by class name and field keys. Records are pickled by their
+# class name and field keys, so unpickling them in the same process yields records of the same class
+_record_classes = weakref.WeakValueDictionary()
+_record_classes_lock = threading.Lock()
+
+
+class Record(object):
+    """
+    The base class of generated record classes. The attributes of a record are in field order and are
+    listed in ``_fields``, and ``_field_keys`` holds the field keys that they are named after. Field keys
+    that are not valid attribute names are renamed to an underscore followed by their index.
+    """
+    __slots__ = ()
+    _fields = ()
+    _field_keys = ()
+
+    @classmethod
+    def _make(cls, values):
+        """
+        Makes a record from an iterable of values in field order.
+        """
+        return cls(*values)
+
+    def _asdict(self):
+        """
+        Returns a dictionary of the values of the record keyed by field key.
+        """
+        return dict(zip(self._field_keys, self))
+
+    def __iter__(self):
+        for name in self._fields:
+            yield getattr(self, name)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # Generated classes can not be pickled by reference, so records are rebuilt from their values
+        return _make_record, (self.__class__.__name__, self._field_keys, tuple(self))
+
+    def __repr__(self):
+        return '{0}({1})'.format(self.__class__.__name__, ', '.join(
+            '{0}={1!r}'.format(name, value) for name, value in zip(self._fields, self)))
+
+
+def get_attribute_names(field_keys):
+    """
+    Returns the attribute names of a record with the given field keys.
+    """
+    names = []
+    seen = set()
+    for index, field_key in enumerate(field_keys):
+        if not field_key.isidentifier() or iskeyword(field_key) or field_key.startswith('_') or field_key in seen:
+            field_key = '_{0}'.format(index)
+        names.append(field_key)
+        seen.add(field_key)
+    return tuple(names)
+
+
+def make_record_class(class_name, field_keys):
+    """
+    Returns a record class with a slot for each of the field keys. The constructor takes the values of
+    the record in field order. Classes are generated once and reused for as long as they are in use.
+    """
+    field_keys = tuple(field_keys)
+    with _record_classes_lock:
+        record_class = _record_classes.get((class_name, field_keys))
+        if record_class is None:
+            record_class = _record_classes[(class_name, field_keys)] = _generate_record_class(class_name, field_keys)
+    return record_class
+
+
+def _make_record(class_name, field_keys, values):
+    return make_record_class(class_name, field_keys)._make(values)
+
+
+def _generate_record_class(class_name, field_keys):
+    names = get_attribute_names(field_keys)
+
+    # Generate the constructor so that building a record does not loop over the fields
+    arguments = ''.join(', {0}=None'.format(name) for name in names)
+    body = ''.join('\n    self.{0} = {0}'.format(name) for name in names) or '\n    pass'
+    namespace = {}
+    exec('def __init__(self{0}):{1}'.format(arguments, body), namespace)
+
+    return type(class_name, (Record,), {
+        '__slots__': names,
+        '__init__': namespace['__init__'],
+        '_fields': names,
+        '_field_keys': field_keys,
+    })
@@ -0,0 +1,308 @@
+"""
+An in-process registry of compiled data schemas. Compiled schemas are kept in a bounded LRU keyed by the
+id and by the model content type of their data schema, and are evicted when the schema, its fields or
+their options are saved or deleted in this process. Schemas changed by other processes are evicted once
+their cache version is checked, which happens at most once per version check interval.
+
+The size, the time to live and the version check interval (in seconds) of the default registry can be
+configured with the ``DATA_SCHEMA_REGISTRY_SIZE``, ``DATA_SCHEMA_REGISTRY_TTL`` and
+``DATA_SCHEMA_REGISTRY_VERSION_CHECK_INTERVAL`` settings.
+"""
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from data_schema.cache import bump_cache_version, get_cache_version
+
+
+# The default maximum number of compiled schemas in a registry
+DEFAULT_REGISTRY_SIZE = 256
+
+# The default number of seconds that compiled schemas are used before their cache version is checked again
+DEFAULT_VERSION_CHECK_INTERVAL = 1
+
+
+_RegistryEntry = namedtuple('_RegistryEntry', [
+    'compiled_schema', 'model_content_type_id', 'field_ids', 'version', 'expires_at', 'checks_at',
+])
+
+
+class SchemaRegistry(object):
+    """
+    A thread safe LRU of compiled data schemas with an optional time to live. Schemas are loaded with
+    ``DataSchema.objects.get_cached`` when they are missing, and are evicted by ``get`` when their cache
+    version changed since they were loaded. Hits, misses and evictions are counted.
+    """
+    def __init__(self, max_size=None, ttl=None, version_check_interval=None, clock=time.monotonic):
+        self.max_size = max_size or getattr(settings, 'DATA_SCHEMA_REGISTRY_SIZE', DEFAULT_REGISTRY_SIZE)
+        self.ttl = ttl or getattr(settings, 'DATA_SCHEMA_REGISTRY_TTL', None)
+        if version_check_interval is None:
+            version_check_interval = getattr(
+                settings, 'DATA_SCHEMA_REGISTRY_VERSION_CHECK_INTERVAL', DEFAULT_VERSION_CHECK_INTERVAL)
+        self.version_check_interval = version_check_interval
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._content_type_pks = {}
+        # Invalidations are counted per data schema id, and for field schemas and clears across all of them,
+        # so that schemas loaded while they are invalidated are not registered
+        self._generations = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get_entry(self, pk):
+        """
+        Returns the entry of a data schema if it is present and not expired.
+        """
+        entry = self._entries.get(pk)
+        if entry is not None and entry.expires_at is not None and entry.expires_at <= self._clock():
+            self._remove(pk)
+            self.evictions += 1
+            entry = None
+        return entry
+
+    def _remove(self, pk):
+        entry = self._entries.pop(pk, None)
+        if entry is not None and self._content_type_pks.get(entry.model_content_type_id) == pk:
+            del self._content_type_pks[entry.model_content_type_id]
+
+    def _get_generation(self, pk):
+        return self._generation, self._generations.get(pk, 0)
+
+    def _add(self, data_schema, generation, version):
+        """
+        Compiles and registers a data schema that was loaded at the generation of its id and at its cache
+        version, unless it was invalidated since then. Returns the compiled schema either way.
+        """
+        compiled_schema = data_schema.compile()
+        now = self._clock()
+        expires_at = now + self.ttl if self.ttl else None
+        field_ids = frozenset(field.id for field in data_schema.get_fields())
+
+        with self._lock:
+            if self._get_generation(data_schema.pk) != generation:
+                return compiled_schema
+
+            self._remove(data_schema.pk)
+            self._entries[data_schema.pk] = _RegistryEntry(
+                compiled_schema, data_schema.model_content_type_id, field_ids, version, expires_at,
+                now + self.version_check_interval)
+            if data_schema.model_content_type_id is not None:
+                self._content_type_pks[data_schema.model_content_type_id] = data_schema.pk
+
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+        return compiled_schema
+
+    def peek(self, pk=None, model_content_type=None):
+        """
+        Returns the compiled schema of a data schema id or of a model content type (or content type id) if
+        it is registered and its cache version does not need to be checked, or None. Never touches the cache
+        or the database.
+        """
+        with self._lock:
+            if model_content_type is not None:
+                pk = self._content_type_pks.get(getattr(model_content_type, 'id', model_content_type))
+
+            entry = self._get_entry(pk) if pk is not None else None
+            if entry is None or entry.checks_at <= self._clock():
+                return None
+
+            self._entries.move_to_end(pk)
+            self.hits += 1
+            return entry.compiled_schema
+
+    def get(self, pk):
+        """
+        Returns the compiled schema of a data schema id. Raises DataSchema.DoesNotExist if there is no schema.
+        """
+        from data_schema.models import DataSchema
+
+        with self._lock:
+            compiled_schema = self.peek(pk)
+            if compiled_schema is not None:
+                return compiled_schema
+            entry = self._get_entry(pk)
+
+        if entry is not None:
+            compiled_schema = self._check_version(pk, entry)
+            if compiled_schema is not None:
+                return compiled_schema
+
+        with self._lock:
+            self.misses += 1
+            generation = self._get_generation(pk)
+
+        # The version is read before the schema is loaded so that schemas updated in the meantime are reloaded
+        version = get_cache_version(pk)
+        return self._add(DataSchema.objects.get_cached(pk), generation, version)
+
+    def _check_version(self, pk, entry):
+        """
+        Returns the compiled schema of an entry if its data schema still has the cache version that it was
+        loaded at. Otherwise the schema was changed by another process and the entry is removed.
+        """
+        version = get_cache_version(pk)
+
+        with self._lock:
+            if self._entries.get(pk) is not entry:
+                return None
+
+            if version != entry.version:
+                self._remove(pk)
+                self.evictions += 1
+                return None
+
+            self._entries[pk] = entry._replace(checks_at=self._clock() + self.version_check_interval)
+            self._entries.move_to_end(pk)
+            self.hits += 1
+            return entry.compiled_schema
+
+    def get_for_content_type(self, model_content_type):
+        """
+        Returns the compiled schema of the data schema of a model content type (or content type id).
+        Raises DataSchema.DoesNotExist if there is no schema and MultipleObjectsReturned if there are several.
+        """
+        from data_schema.models import DataSchema
+
+        compiled_schema = self.peek(model_content_type=model_content_type)
+        if compiled_schema is not None:
+            return compiled_schema
+
+        content_type_id = getattr(model_content_type, 'id', model_content_type)
+        with self._lock:
+            pk = self._content_type_pks.get(content_type_id)
+        if pk is None:
+            pk = DataSchema.objects.filter(model_content_type_id=content_type_id).values_list('id', flat=True).get()
+        return self.get(pk)
+
+    def invalidate(self, pk):
+        """
+        Removes the compiled schema of a data schema id.
+        """
+        with self._lock:
+            self._generations[pk] = self._generations.get(pk, 0) + 1
+            self._remove(pk)
+
+    def invalidate_field_schema(self, field_schema_id):
+        """
+        Removes any compiled schema with a field of the field schema id.
+        """
+        with self._lock:
+            self._generation += 1
+            for pk, entry in list(self._entries.items()):
+                if field_schema_id in entry.field_ids:
+                    self._remove(pk)
+
+    def clear(self):
+        """
+        Removes all compiled schemas and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._content_type_pks.clear()
+            self._generation += 1
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Returns the number of compiled schemas, hits, misses and evictions of the registry.
+        """
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+# The registry of compiled schemas of this process
+schema_registry = SchemaRegistry()
+
+
+# Holds whether signal handlers of the current thread skip invalidating data schemas
+_signal_state = threading.local()
+
+
+@contextmanager
+def signal_invalidation_disabled():
+    """
+    Disables invalidating data schemas from signal handlers within the block. Callers are expected to
+    invalidate the schemas they change themselves, which avoids the queries that handlers would make
+    for every changed field option.
+    """
+    previous = getattr(_signal_state, 'disabled', False)
+    _signal_state.disabled = True
+    try:
+        yield
+    finally:
+        _signal_state.disabled = previous
+
+
+def _is_signal_invalidation_disabled():
+    return getattr(_signal_state, 'disabled', False)
+
+
+def invalidate_data_schema(pk):
+    """
+    Invalidates a data schema in the shared cache and in the registry of this process once the current
+    transaction commits.
+    """
+    def invalidate():
+        bump_cache_version(pk)
+        schema_registry.invalidate(pk)
+    transaction.on_commit(invalidate)
+
+
+def _data_schema_changed(sender, instance, **kwargs):
+    if not _is_signal_invalidation_disabled():
+        invalidate_data_schema(instance.pk)
+
+
+def _field_schema_changed(sender, instance, **kwargs):
+    if not _is_signal_invalidation_disabled():
+        invalidate_data_schema(instance.data_schema_id)
+
+
+def _field_option_changed(sender, instance, **kwargs):
+    from data_schema.models import FieldOption, FieldSchema
+
+    # Clear the option values cached on the field schema instance of the option, if it has one
+    field_schema = FieldOption.field_schema.field.get_cached_value(instance, None)
+    if field_schema is not None:
+        field_schema.clear_option_cache()
+
+    if _is_signal_invalidation_disabled():
+        return
+
+    field_schema_id = instance.field_schema_id
+    transaction.on_commit(lambda: schema_registry.invalidate_field_schema(field_schema_id))
+
+    # The field schema is already gone if the option is deleted along with it
+    data_schema_id = FieldSchema.objects.filter(id=field_schema_id).values_list('data_schema_id', flat=True).first()
+    if data_schema_id is not None:
+        invalidate_data_schema(data_schema_id)
+
+
+def connect_signals():
+    """
+    Connects the signals that invalidate data schemas when they, their fields or their options change.
+    """
+    from data_schema.models import DataSchema, FieldOption, FieldSchema
+
+    for signal in (post_save, post_delete):
+        signal.connect(_data_schema_changed, sender=DataSchema, dispatch_uid='data_schema_registry_data_schema')
+        signal.connect(_field_schema_changed, sender=FieldSchema, dispatch_uid='data_schema_registry_field_schema')
+        signal.connect(_field_option_changed, sender=FieldOption, dispatch_uid='data_schema_registry_field_option')
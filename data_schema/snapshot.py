@@ -0,0 +1,106 @@
+"""
+Database-free snapshots of data schemas. A snapshot holds the field definitions and option values of a
+schema in a compact, versioned JSON or msgpack document, so that processes without a database connection
+can read and convert values with the schema:
+
+    data = data_schema.to_snapshot().to_bytes()
+    snapshot = DataSchemaSnapshot.from_bytes(data)
+    snapshot.get_value(row, 'field_key')
+
+msgpack is optional and only needs to be installed to use the msgpack format.
+"""
+import json
+
+from data_schema.compiled_schema import CompiledDataSchema, FieldDefinition
+
+
+# The version of the snapshot format. Snapshots of other versions can not be loaded
+SNAPSHOT_VERSION = 1
+
+
+class SnapshotFormat(object):
+    """
+    Specifies the formats that snapshots can be serialized to.
+    """
+    JSON = 'json'
+    MSGPACK = 'msgpack'
+
+
+def _import_msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError('msgpack must be installed to use msgpack snapshots')
+    return msgpack
+
+
+class DataSchemaSnapshot(CompiledDataSchema):
+    """
+    A read-only, compiled data schema that can be serialized to bytes and loaded without a database.
+    The model content type is stored as its natural key, an (app_label, model) tuple.
+    """
+    __slots__ = ('model_content_type',)
+
+    def __init__(self, field_definitions, infer_datetime_formats=False, schema_id=None, model_content_type=None):
+        super(DataSchemaSnapshot, self).__init__(
+            field_definitions, infer_datetime_formats=infer_datetime_formats, schema_id=schema_id)
+        object.__setattr__(
+            self, 'model_content_type', tuple(model_content_type) if model_content_type is not None else None)
+
+    def __reduce__(self):
+        return (self.__class__, (
+            self.get_fields(), self.infer_datetime_formats, self.schema_id, self.model_content_type))
+
+    def to_dict(self):
+        """
+        Returns the snapshot as a dictionary of JSON serializable values. Each field is a list of the
+        attributes of its definition, with the list of its option values last.
+        """
+        return {
+            'version': SNAPSHOT_VERSION,
+            'schema_id': self.schema_id,
+            'model_content_type': list(self.model_content_type) if self.model_content_type else None,
+            'infer_datetime_formats': self.infer_datetime_formats,
+            'fields': [list(definition[:-1]) + [list(definition.options)] for definition in self.get_fields()],
+        }
+
+    @classmethod
+    def from_dict(cls, snapshot):
+        """
+        Loads a snapshot from a dictionary made by ``to_dict``. Raises a ValueError if the snapshot is
+        of another version.
+        """
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            raise ValueError('Unsupported schema snapshot version {0}'.format(snapshot.get('version')))
+
+        return cls(
+            [FieldDefinition(*field[:-1], options=tuple(field[-1])) for field in snapshot['fields']],
+            infer_datetime_formats=snapshot['infer_datetime_formats'],
+            schema_id=snapshot['schema_id'],
+            model_content_type=snapshot['model_content_type'],
+        )
+
+    def to_bytes(self, format=SnapshotFormat.JSON):
+        """
+        Serializes the snapshot to JSON or msgpack bytes.
+        """
+        if format == SnapshotFormat.JSON:
+            return json.dumps(self.to_dict(), separators=(',', ':')).encode('utf-8')
+        elif format == SnapshotFormat.MSGPACK:
+            return _import_msgpack().packb(self.to_dict(), use_bin_type=True)
+        raise ValueError('Unsupported schema snapshot format {0}'.format(format))
+
+    @classmethod
+    def from_bytes(cls, data, format=None):
+        """
+        Loads a snapshot from bytes made by ``to_bytes``. The format is detected from the data if it
+        is not given.
+        """
+        if format is None:
+            format = SnapshotFormat.JSON if data[:1] == b'{' else SnapshotFormat.MSGPACK
+
+        if format == SnapshotFormat.JSON:
+            return cls.from_dict(json.loads(data))
+        elif format == SnapshotFormat.MSGPACK:
+            return cls.from_dict(_import_msgpack().unpackb(data, raw=False))
+        raise ValueError('Unsupported schema snapshot format {0}'.format(format))
@@ -0,0 +1,82 @@
+from datetime import datetime
+import io
+
+from django.test import TestCase
+from django_dynamic_fixture import G
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from data_schema.field_schema_type import FieldSchemaType
+from data_schema.models import DataSchema, FieldSchema
+
+
+class ArrowTest(TestCase):
+    """
+    Tests converting rows to Arrow record batches and Parquet files.
+    """
+    def setUp(self):
+        self.data_schema = G(DataSchema)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='name', field_position=0,
+            field_type=FieldSchemaType.STRING, display_name='Name', uniqueness_order=1)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='count', field_position=1,
+            field_type=FieldSchemaType.INT, display_name='Count')
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='active', field_position=2,
+            field_type=FieldSchemaType.BOOLEAN, display_name='Active')
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='time', field_position=3,
+            field_type=FieldSchemaType.DATETIME, display_name='Time')
+        self.data_schema = DataSchema.objects.get(id=self.data_schema.id)
+        self.rows = [
+            ['a', '1', 'true', '2020-01-02T03:04:05'],
+            {'name': 'b', 'count': '', 'active': 'x'},
+            ['c', '$3', '0', 1577934245],
+        ]
+
+    def test_arrow_schema(self):
+        schema = self.data_schema.arrow_schema()
+
+        self.assertEquals(schema.names, ['name', 'count', 'active', 'time'])
+        self.assertEquals(schema.types, [pa.string(), pa.int64(), pa.bool_(), pa.timestamp('us')])
+        self.assertEquals(
+            schema.field('name').metadata,
+            {b'field_type': b'STRING', b'display_name': b'Name', b'uniqueness_order': b'1'})
+        self.assertEquals(schema.field('count').metadata, {b'field_type': b'INT', b'display_name': b'Count'})
+        self.assertEquals(schema.metadata, {b'data_schema_id': str(self.data_schema.id).encode()})
+
+    def test_to_arrow(self):
+        batches = list(self.data_schema.to_arrow(iter(self.rows), batch_size=2))
+
+        self.assertEquals([batch.num_rows for batch in batches], [2, 1])
+        self.assertTrue(all(batch.schema.equals(self.data_schema.arrow_schema()) for batch in batches))
+        self.assertEquals(pa.Table.from_batches(batches).to_pylist(), [
+            {'name': 'a', 'count': 1, 'active': True, 'time': datetime(2020, 1, 2, 3, 4, 5)},
+            {'name': 'b', 'count': None, 'active': None, 'time': None},
+            {'name': 'c', 'count': 3, 'active': False, 'time': datetime(2020, 1, 2, 3, 4, 5)},
+        ])
+        self.assertEquals(batches[0].column(1).null_count, 1)
+        self.assertEquals(batches[1].column(3).null_count, 0)
+
+    def test_to_arrow_exception(self):
+        with self.assertRaises(ValueError) as ctx:
+            list(self.data_schema.to_arrow([['a', '1.2.3']]))
+
+        self.assertEquals(ctx.exception.field_key, 'count')
+
+    def test_write_parquet(self):
+        f = io.BytesIO()
+
+        self.assertEquals(self.data_schema.write_parquet(self.rows, f, batch_size=2), 3)
+
+        table = pq.read_table(io.BytesIO(f.getvalue()))
+        self.assertEquals(table.num_rows, 3)
+        self.assertEquals(table.column('count').to_pylist(), [1, None, 3])
+        self.assertEquals(table.schema.field('name').metadata[b'uniqueness_order'], b'1')
+
+    def test_write_parquet_empty(self):
+        f = io.BytesIO()
+
+        self.assertEquals(self.data_schema.write_parquet([], f), 0)
+        self.assertEquals(pq.read_table(io.BytesIO(f.getvalue())).schema.names, ['name', 'count', 'active', 'time'])
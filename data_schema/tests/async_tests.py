@@ -0,0 +1,88 @@
+from asgiref.sync import sync_to_async
+from django.db.models import QuerySet
+from django.test import TestCase
+from django_dynamic_fixture import G
+from unittest.mock import patch
+
+from data_schema.cache import get_cache
+from data_schema.compiled_schema import RowOutput
+from data_schema.field_schema_type import FieldSchemaType
+from data_schema.models import DataSchema, FieldOption, FieldSchema
+from data_schema.registry import schema_registry
+
+
+async def to_async_iterable(rows):
+    for row in rows:
+        yield row
+
+
+class AsyncDataSchemaTest(TestCase):
+    """
+    Tests the async API of data schemas.
+    """
+    def setUp(self):
+        get_cache().clear()
+        schema_registry.clear()
+        self.data_schema = G(DataSchema)
+        self.field = G(
+            FieldSchema, data_schema=self.data_schema, field_key='count', field_position=0,
+            field_type=FieldSchemaType.INT, has_options=True)
+        G(FieldOption, field_schema=self.field, value='1')
+        G(FieldOption, field_schema=self.field, value='2')
+
+    async def test_aget_compiled(self):
+        compiled = await DataSchema.objects.aget_compiled(self.data_schema.id)
+
+        self.assertEquals(compiled.field_keys, ('count',))
+        self.assertIs(await DataSchema.objects.aget_compiled(self.data_schema.id), compiled)
+        self.assertEquals(schema_registry.stats()['misses'], 1)
+
+    async def test_aget_compiled_registered(self):
+        compiled = await sync_to_async(DataSchema.objects.get_compiled)(self.data_schema.id)
+
+        with patch('data_schema.models.sync_to_async', side_effect=AssertionError):
+            self.assertIs(await DataSchema.objects.aget_compiled(self.data_schema.id), compiled)
+        self.assertEquals(schema_registry.stats()['hits'], 1)
+
+    async def test_aupdate(self):
+        changed = await self.data_schema.aupdate(fieldschema_set=[{'field_key': 'name', 'field_type': 'STRING'}])
+
+        self.assertTrue(changed)
+        self.assertEquals(
+            await sync_to_async(list)(self.data_schema.fieldschema_set.values_list('field_key', flat=True)), ['name'])
+
+    async def test_aget_value(self):
+        self.assertEquals(await self.data_schema.aget_value({'count': '5'}, 'count'), 5)
+
+    async def test_aconvert_rows(self):
+        rows = [['1'], ['2'], [None]]
+        expected = [(1,), (2,), (None,)]
+
+        converted = [row async for row in self.data_schema.aconvert_rows(
+            to_async_iterable(rows), output=RowOutput.TUPLE, chunk_size=2)]
+        self.assertEquals(converted, expected)
+
+        converted = [row async for row in self.data_schema.aconvert_rows(rows, output=RowOutput.TUPLE)]
+        self.assertEquals(converted, expected)
+
+    async def test_aset_value(self):
+        obj = {}
+        await self.field.aset_value(obj, 2)
+        self.assertEquals(obj, {'count': 2})
+
+        with self.assertRaises(Exception):
+            await self.field.aset_value(obj, 3)
+
+    async def test_aget_option_values(self):
+        self.assertEquals(await self.field.aget_option_values(), frozenset([1, 2]))
+
+    async def test_aget_option_values_no_async_iteration(self):
+        """
+        Verifies that options are fetched in a thread on Django versions without async queryset iteration
+        """
+        aiter = QuerySet.__aiter__
+        del QuerySet.__aiter__
+        try:
+            self.assertEquals(await self.field.aget_option_values(), frozenset([1, 2]))
+        finally:
+            QuerySet.__aiter__ = aiter
@@ -0,0 +1,103 @@
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase, override_settings
+from django_dynamic_fixture import G
+
+from data_schema.cache import bump_cache_version, get_cache, get_cache_key, get_cache_version
+from data_schema.field_schema_type import FieldSchemaType
+from data_schema.models import DataSchema, FieldOption, FieldSchema
+
+
+class CacheVersionTest(TestCase):
+    def setUp(self):
+        get_cache().clear()
+
+    def test_get_cache_version_stable(self):
+        self.assertEquals(get_cache_version(1), get_cache_version(1))
+        self.assertNotEquals(get_cache_version(1), get_cache_version(2))
+
+    def test_bump_cache_version(self):
+        cache_key = get_cache_key(1)
+        bump_cache_version(1)
+        self.assertNotEquals(get_cache_key(1), cache_key)
+
+    @override_settings(DATA_SCHEMA_CACHE='other', CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'other': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'other'},
+    })
+    def test_cache_alias_setting(self):
+        get_cache_version(1)
+        self.assertIsNotNone(get_cache().get('data_schema:1:version'))
+
+
+class GetCachedTest(TestCase):
+    """
+    Tests DataSchema.objects.get_cached.
+    """
+    def setUp(self):
+        get_cache().clear()
+        self.data_schema = G(DataSchema, model_content_type=ContentType.objects.get_for_model(DataSchema))
+        self.field = G(
+            FieldSchema, data_schema=self.data_schema, field_key='name', field_type=FieldSchemaType.STRING,
+            field_position=0, uniqueness_order=1, has_options=True)
+        G(FieldOption, field_schema=self.field, value='a')
+        G(FieldOption, field_schema=self.field, value='b')
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='count', field_type=FieldSchemaType.INT,
+            field_position=1)
+
+    def test_miss(self):
+        data_schema = DataSchema.objects.get_cached(self.data_schema.id)
+
+        self.assertEquals(data_schema, self.data_schema)
+        self.assertEquals(data_schema.compile().field_keys, ('name', 'count'))
+
+    def test_hit_no_queries(self):
+        DataSchema.objects.get_cached(self.data_schema.id)
+
+        with self.assertNumQueries(0):
+            data_schema = DataSchema.objects.get_cached(self.data_schema.id)
+
+            self.assertEquals(data_schema.id, self.data_schema.id)
+            self.assertEquals(data_schema.model_content_type, ContentType.objects.get_for_model(DataSchema))
+            self.assertEquals([f.field_key for f in data_schema.get_fields()], ['name', 'count'])
+            self.assertEquals([f.field_key for f in data_schema.get_unique_fields()], ['name'])
+            self.assertEquals(data_schema.get_value({'count': '5'}, 'count'), 5)
+            self.assertEquals(data_schema.get_fields()[0].data_schema, data_schema)
+
+            obj = {}
+            data_schema.set_value(obj, 'name', 'a')
+            self.assertEquals(obj, {'name': 'a'})
+
+    def test_hit_instances_saved(self):
+        """
+        Tests that instances loaded from the cache behave like instances loaded from the database.
+        """
+        DataSchema.objects.get_cached(self.data_schema.id)
+        data_schema = DataSchema.objects.get_cached(self.data_schema.id)
+        field = data_schema.get_fields()[1]
+
+        self.assertFalse(data_schema._state.adding)
+        self.assertFalse(field._state.adding)
+
+        field.display_name = 'Count'
+        field.save()
+        self.assertEquals(FieldSchema.objects.get(id=field.id).display_name, 'Count')
+
+    def test_hit_no_content_type(self):
+        data_schema = G(DataSchema)
+        DataSchema.objects.get_cached(data_schema.id)
+
+        self.assertIsNone(DataSchema.objects.get_cached(data_schema.id).model_content_type)
+
+    def test_update_bumps_version(self):
+        DataSchema.objects.get_cached(self.data_schema.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data_schema.update(fieldschema_set=[{'field_key': 'other', 'field_type': FieldSchemaType.STRING}])
+
+        self.assertEquals(
+            [f.field_key for f in DataSchema.objects.get_cached(self.data_schema.id).get_fields()], ['other'])
+
+    def test_does_not_exist(self):
+        with self.assertRaises(DataSchema.DoesNotExist):
+            DataSchema.objects.get_cached(0)
@@ -0,0 +1,450 @@
+from datetime import datetime
+import pickle
+
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from django_dynamic_fixture import G
+from unittest.mock import patch
+
+from data_schema.compiled_schema import (
+    CompiledDataSchema, CompiledField, ConversionError, FieldDefinition, RowOutput,
+)
+from data_schema.exceptions import ErrorBudgetExceededException
+from data_schema.field_schema_type import FieldSchemaCase, FieldSchemaType
+from data_schema.models import DataSchema, FieldOption, FieldSchema
+
+
+class CompiledDataSchemaTest(TestCase):
+    """
+    Tests the CompiledDataSchema returned by DataSchema.compile.
+    """
+    def setUp(self):
+        self.data_schema = G(DataSchema)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='time', field_position=1,
+            field_type=FieldSchemaType.DATETIME, field_format='%Y-%m-%d', uniqueness_order=2)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='name', field_position=0,
+            field_type=FieldSchemaType.STRING, transform_case=FieldSchemaCase.UPPER, uniqueness_order=1)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='count', field_position=2,
+            field_type=FieldSchemaType.INT, default_value='7')
+
+    def test_compile_cached(self):
+        """
+        Tests that the compiled schema is cached on the data schema.
+        """
+        self.assertIs(self.data_schema.compile(), self.data_schema.compile())
+
+    def test_compile_no_queries(self):
+        """
+        Tests that compiling a schema fetched with the model manager does not incur queries.
+        """
+        data_schema = DataSchema.objects.get(id=self.data_schema.id)
+
+        with self.assertNumQueries(0):
+            compiled = data_schema.compile()
+
+        self.assertEquals(compiled.field_keys, ('name', 'time', 'count'))
+
+    def test_get_fields(self):
+        compiled = self.data_schema.compile()
+        self.assertEquals([f.field_key for f in compiled.get_fields()], ['name', 'time', 'count'])
+        self.assertEquals(compiled.get_fields()[1].field_format, '%Y-%m-%d')
+
+    def test_get_unique_fields(self):
+        compiled = self.data_schema.compile()
+        self.assertEquals([f.field_key for f in compiled.get_unique_fields()], ['name', 'time'])
+
+    def test_get_value_dict(self):
+        compiled = self.data_schema.compile()
+        obj = {'name': ' bob ', 'time': '2013-04-05', 'count': None}
+
+        self.assertEquals(compiled.get_value(obj, 'name'), 'BOB')
+        self.assertEquals(compiled.get_value(obj, 'time'), datetime(2013, 4, 5))
+        self.assertEquals(compiled.get_value(obj, 'count'), 7)
+
+    def test_get_value_list(self):
+        compiled = self.data_schema.compile()
+        obj = ['bob', '2013-04-05']
+
+        self.assertEquals(compiled.get_value(obj, 'name'), 'BOB')
+        self.assertEquals(compiled.get_value(obj, 'time'), datetime(2013, 4, 5))
+        self.assertEquals(compiled.get_value(obj, 'count'), 7)
+
+    def test_get_value_obj(self):
+        class Input:
+            name = 'bob'
+            count = '$1,000'
+
+        compiled = self.data_schema.compile()
+
+        self.assertEquals(compiled.get_value(Input(), 'name'), 'BOB')
+        self.assertIsNone(compiled.get_value(Input(), 'time'))
+        self.assertEquals(compiled.get_value(Input(), 'count'), 1000)
+
+    def test_get_value_matches_field_schema(self):
+        """
+        Tests that compiled fields return the same values as the field schemas they were compiled from.
+        """
+        compiled = self.data_schema.compile()
+        objs = [{'name': 'a', 'time': ' 2013-04-05 ', 'count': '4'}, ['a', '2013-04-05', ''], {}, []]
+
+        for obj in objs:
+            for field in self.data_schema.get_fields():
+                self.assertEquals(compiled.get_value(obj, field.field_key), field.get_value(obj))
+
+    def test_get_value_exception(self):
+        compiled = self.data_schema.compile()
+
+        with self.assertRaises(ValueError) as ctx:
+            compiled.get_value({'count': '-'}, 'count')
+
+        self.assertEquals(ctx.exception.field_key, 'count')
+        self.assertEquals(ctx.exception.bad_value, '-')
+        self.assertEquals(ctx.exception.expected_type, FieldSchemaType.INT)
+
+    def test_get_accessors(self):
+        compiled = self.data_schema.compile()
+
+        self.assertEquals(
+            [accessor(['bob', '2013-04-05', '3']) for accessor in compiled.get_accessors([])],
+            ['BOB', datetime(2013, 4, 5), 3])
+        self.assertEquals(
+            [accessor({'name': 'bob'}) for accessor in compiled.get_accessors({})],
+            ['BOB', None, 7])
+        self.assertEquals(compiled.get_accessors(object()), tuple(f.from_object for f in compiled.fields))
+
+    def test_immutable(self):
+        compiled = self.data_schema.compile()
+
+        with self.assertRaises(AttributeError):
+            compiled.fields = ()
+        with self.assertRaises(AttributeError):
+            compiled.fields[0].convert = None
+        with self.assertRaises(TypeError):
+            compiled.field_map['name'] = None
+
+    def test_repr(self):
+        compiled = self.data_schema.compile()
+        self.assertEquals(repr(compiled.field_map['count']), '<CompiledField: count (INT)>')
+
+    def test_from_definitions(self):
+        """
+        Tests compiling field definitions without any models.
+        """
+        compiled = CompiledDataSchema([
+            FieldDefinition('a', 'a', FieldSchemaType.FLOAT, None, 0, None, None, False, None),
+        ])
+        self.assertEquals(compiled.get_value(['1.5'], 'a'), 1.5)
+        self.assertEquals(compiled.get_unique_fields(), [])
+
+
+class ConvertRowsTest(TestCase):
+    """
+    Tests converting batches of rows with DataSchema.convert_rows.
+    """
+    def setUp(self):
+        self.data_schema = G(DataSchema)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='name', field_position=0,
+            field_type=FieldSchemaType.STRING)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='count', field_position=1,
+            field_type=FieldSchemaType.INT, default_value='0')
+
+    def test_dict_output(self):
+        rows = self.data_schema.convert_rows([{'name': 'a', 'count': '1'}, ['b', ' 2 '], {}])
+        self.assertEquals(list(rows), [
+            {'name': 'a', 'count': 1},
+            {'name': 'b', 'count': 2},
+            {'name': None, 'count': 0},
+        ])
+
+    def test_tuple_output(self):
+        class Input:
+            name = 'c'
+            count = 3
+
+        rows = self.data_schema.convert_rows([['a', '1'], Input()], output=RowOutput.TUPLE)
+        self.assertEquals(list(rows), [('a', 1), ('c', 3)])
+
+    def test_record_output(self):
+        rows = list(self.data_schema.convert_rows([['a', '1'], {'name': 'b'}], output=RowOutput.RECORD))
+
+        self.assertEquals([(row.name, row.count) for row in rows], [('a', 1), ('b', 0)])
+        self.assertIsInstance(rows[0], self.data_schema.record_class())
+        self.assertEquals(rows[1]._asdict(), {'name': 'b', 'count': 0})
+
+    def test_lazy(self):
+        """
+        Tests that rows are converted only as they are consumed.
+        """
+        def rows():
+            yield ['a', '1']
+            raise AssertionError('Consumed too many rows')
+
+        self.assertEquals(next(self.data_schema.convert_rows(rows())), {'name': 'a', 'count': 1})
+
+    def test_invalid_output(self):
+        with self.assertRaises(ValueError):
+            self.data_schema.convert_rows([], output='invalid')
+
+    def test_exception(self):
+        """
+        Tests that the key of the failing field is attached to conversion errors.
+        """
+        with self.assertRaises(ValueError) as ctx:
+            list(self.data_schema.convert_rows([['a', '1'], ['b', '-']]))
+
+        self.assertEquals(ctx.exception.field_key, 'count')
+        self.assertEquals(ctx.exception.bad_value, '-')
+
+
+class ConvertRowsParallelTest(TestCase):
+    """
+    Tests converting rows across worker processes.
+    """
+    def setUp(self):
+        self.data_schema = G(DataSchema)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='name', field_position=0,
+            field_type=FieldSchemaType.STRING, uniqueness_order=1)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='count', field_position=1,
+            field_type=FieldSchemaType.INT, default_value='0')
+
+    def test_pickle(self):
+        """
+        Tests that compiled schemas are pickled as their definitions.
+        """
+        compiled = pickle.loads(pickle.dumps(self.data_schema.compile()))
+
+        self.assertIsInstance(compiled, CompiledDataSchema)
+        self.assertEquals(compiled.get_fields(), self.data_schema.compile().get_fields())
+        self.assertEquals(compiled.get_value(['a', ''], 'count'), 0)
+
+    def test_preserves_order(self):
+        rows = [[str(i), str(i)] for i in range(25)]
+
+        self.assertEquals(
+            list(self.data_schema.convert_rows_parallel(rows, chunk_size=2, max_workers=2)),
+            list(self.data_schema.convert_rows(rows)))
+
+    def test_tuple_output(self):
+        rows = ({'name': 'a', 'count': str(i)} for i in range(5))
+
+        self.assertEquals(
+            list(self.data_schema.convert_rows_parallel(rows, output=RowOutput.TUPLE, chunk_size=3, max_workers=1)),
+            [('a', i) for i in range(5)])
+
+    def test_record_output(self):
+        rows = [['a', str(i)] for i in range(5)]
+
+        self.assertEquals(
+            list(self.data_schema.convert_rows_parallel(rows, output=RowOutput.RECORD, chunk_size=3, max_workers=1)),
+            list(self.data_schema.convert_rows(rows, output=RowOutput.RECORD)))
+
+    def test_no_rows(self):
+        self.assertEquals(list(self.data_schema.convert_rows_parallel([])), [])
+
+    def test_invalid_output(self):
+        with self.assertRaises(ValueError):
+            self.data_schema.convert_rows_parallel([], output='invalid')
+
+    def test_exception(self):
+        with self.assertRaises(ValueError) as ctx:
+            list(self.data_schema.convert_rows_parallel([['a', '1'], ['b', '-']], chunk_size=1, max_workers=2))
+
+        self.assertEquals(ctx.exception.field_key, 'count')
+        self.assertEquals(ctx.exception.bad_value, '-')
+
+
+class InferDatetimeFormatsTest(TestCase):
+    def test_compile_infer_datetime_formats(self):
+        data_schema = G(DataSchema)
+        G(FieldSchema, data_schema=data_schema, field_key='time', field_type=FieldSchemaType.DATETIME)
+
+        compiled = data_schema.compile(infer_datetime_formats=True)
+
+        self.assertIsNot(compiled, data_schema.compile())
+        self.assertIs(compiled, data_schema.compile(infer_datetime_formats=True))
+        self.assertTrue(compiled.infer_datetime_formats)
+        self.assertTrue(pickle.loads(pickle.dumps(compiled)).infer_datetime_formats)
+        self.assertEquals(
+            [row['time'] for row in compiled.convert_rows({'time': '04/05/2013'} for i in range(30))],
+            [datetime(2013, 4, 5)] * 30)
+
+
+class CompiledOptionsTest(TestCase):
+    def test_option_values(self):
+        data_schema = G(DataSchema)
+        field_schema = G(
+            FieldSchema, data_schema=data_schema, field_type=FieldSchemaType.FLOAT, field_key='key', has_options=True)
+        G(FieldOption, field_schema=field_schema, value='1.5')
+        G(FieldOption, field_schema=field_schema, value='2')
+        data_schema = DataSchema.objects.get(id=data_schema.id)
+
+        with self.assertNumQueries(0):
+            compiled = data_schema.compile()
+
+        self.assertEquals(compiled.get_fields()[0].options, ('1.5', '2'))
+        self.assertEquals(compiled.field_map['key'].option_values, frozenset([1.5, 2.0]))
+        self.assertEquals(compiled.validate_options('key', [2, 1.5, 3]), [2])
+
+
+class ConvertRowsLenientTest(TestCase):
+    """
+    Tests converting rows with DataSchema.convert_rows_lenient.
+    """
+    def setUp(self):
+        self.data_schema = G(DataSchema)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='count', field_position=0,
+            field_type=FieldSchemaType.INT)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='time', field_position=1,
+            field_type=FieldSchemaType.DATETIME, field_format='%Y-%m-%d')
+        self.rows = [['1', '2020-01-02'], ['1.2.3', 'bad'], {'count': '3', 'time': None}, ['4', '01/02/2020']]
+
+    def test_errors(self):
+        result = self.data_schema.convert_rows_lenient(self.rows, output=RowOutput.TUPLE)
+
+        self.assertEquals(result.rows, [(1, datetime(2020, 1, 2)), (None, None), (3, None), (4, None)])
+        self.assertEquals(result.errors, [
+            ConversionError(1, 'count', '1.2.3', FieldSchemaType.INT),
+            ConversionError(1, 'time', 'bad', FieldSchemaType.DATETIME),
+            ConversionError(3, 'time', '01/02/2020', FieldSchemaType.DATETIME),
+        ])
+
+    def test_matches_convert_rows(self):
+        rows = [self.rows[0], self.rows[2]]
+
+        result = self.data_schema.convert_rows_lenient(rows)
+
+        self.assertEquals(result.rows, list(self.data_schema.convert_rows(rows)))
+        self.assertEquals(result.errors, [])
+
+    def test_error_budget(self):
+        with self.assertRaises(ErrorBudgetExceededException) as ctx:
+            self.data_schema.convert_rows_lenient(iter(self.rows), max_errors=1)
+
+        self.assertEquals([error.row_index for error in ctx.exception.errors], [1, 1])
+
+    def test_within_error_budget(self):
+        self.assertEquals(len(self.data_schema.convert_rows_lenient(self.rows, max_errors=3).errors), 3)
+
+
+class RowViewTest(TestCase):
+    """
+    Tests lazily converting rows with DataSchema.view.
+    """
+    def setUp(self):
+        self.data_schema = G(DataSchema)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='name', field_position=0,
+            field_type=FieldSchemaType.STRING, transform_case=FieldSchemaCase.UPPER)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='count', field_position=1,
+            field_type=FieldSchemaType.INT, default_value='0')
+
+    def test_mapping(self):
+        view = self.data_schema.view(['a', '2'])
+
+        self.assertEquals(view['name'], 'A')
+        self.assertEquals(view.get('count'), 2)
+        self.assertIsNone(view.get('other'))
+        self.assertIn('count', view)
+        self.assertNotIn('other', view)
+        self.assertEquals(list(view), ['name', 'count'])
+        self.assertEquals(len(view), 2)
+        self.assertEquals(dict(view), {'name': 'A', 'count': 2})
+
+    def test_converts_on_first_access(self):
+        """
+        Tests that only the fields that are read are converted, and that they are converted once.
+        """
+        view = self.data_schema.view({'name': 'a', 'count': '-'})
+
+        self.assertEquals(view['name'], 'A')
+        view.obj['name'] = 'b'
+        self.assertEquals(view['name'], 'A')
+        with self.assertRaises(ValueError) as ctx:
+            view['count']
+        self.assertEquals(ctx.exception.field_key, 'count')
+
+    def test_materialize(self):
+        view = self.data_schema.view({'name': 'a'})
+        view['name']
+
+        with patch.object(CompiledField, 'get_value', autospec=True, side_effect=CompiledField.get_value) as mock:
+            self.assertEquals(list(view.materialize().items()), [('name', 'A'), ('count', 0)])
+        self.assertEquals([call[0][0].field_key for call in mock.call_args_list], ['count'])
+        self.assertEquals(repr(view), '<RowView: 2 of 2 fields converted>')
+
+    def test_views(self):
+        def rows():
+            yield ['a', '1']
+            yield ['b', '-']
+
+        views = list(self.data_schema.views(rows()))
+
+        self.assertEquals([view['name'] for view in views], ['A', 'B'])
+        self.assertEquals(views[0].materialize(), {'name': 'A', 'count': 1})
+
+
+class IterQuerysetTest(TestCase):
+    """
+    Tests converting querysets with DataSchema.iter_queryset.
+    """
+    def setUp(self):
+        self.data_schema = G(DataSchema, model_content_type=ContentType.objects.get_for_model(FieldSchema))
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='field_key', field_position=0,
+            field_type=FieldSchemaType.STRING, transform_case=FieldSchemaCase.UPPER)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='field_position', field_position=1,
+            field_type=FieldSchemaType.FLOAT)
+        self.data_schema = DataSchema.objects.get(id=self.data_schema.id)
+        self.data_schema.compile()
+
+    def test_model_content_type(self):
+        with self.assertNumQueries(1):
+            rows = list(self.data_schema.iter_queryset(chunk_size=1, output=RowOutput.TUPLE))
+
+        self.assertEquals(rows, [('FIELD_KEY', 0.0), ('FIELD_POSITION', 1.0)])
+
+    def test_queryset(self):
+        queryset = FieldSchema.objects.filter(field_key='field_position')
+
+        self.assertEquals(
+            list(self.data_schema.iter_queryset(queryset)), [{'field_key': 'FIELD_POSITION', 'field_position': 1.0}])
+
+    def test_matches_convert_rows(self):
+        queryset = FieldSchema.objects.order_by('id')
+
+        self.assertEquals(
+            list(self.data_schema.iter_queryset(queryset)), list(self.data_schema.convert_rows(queryset)))
+
+    def test_not_model_fields(self):
+        """
+        Tests that model instances are converted when a field key is not a field of the model.
+        """
+        G(FieldSchema, data_schema=self.data_schema, field_key='other', field_position=2, field_type='INT')
+        data_schema = DataSchema.objects.get(id=self.data_schema.id)
+
+        rows = list(data_schema.iter_queryset(FieldSchema.objects.order_by('id'), output=RowOutput.TUPLE))
+
+        self.assertEquals(rows, [('FIELD_KEY', 0.0, None), ('FIELD_POSITION', 1.0, None), ('OTHER', 2.0, None)])
+
+    def test_exception(self):
+        data_schema = G(DataSchema)
+        G(FieldSchema, data_schema=data_schema, field_key='field_key', field_position=0, field_type='INT')
+
+        with self.assertRaises(ValueError) as ctx:
+            list(data_schema.iter_queryset(FieldSchema.objects.all()))
+        self.assertEquals(ctx.exception.field_key, 'field_key')
+
+    def test_no_model_content_type(self):
+        with self.assertRaises(ValueError):
+            G(DataSchema).iter_queryset()
@@ -0,0 +1,172 @@
+from datetime import datetime
+
+from django.test import SimpleTestCase
+import numpy as np
+
+from data_schema.convert_column import convert_column, convert_duration_column, convert_string_column
+from data_schema.convert_value import convert_value
+from data_schema.exceptions import InvalidDateFormatException
+from data_schema.field_schema_type import FieldSchemaType
+
+
+class ConvertColumnTest(SimpleTestCase):
+    def assertMaskedEqual(self, array, expected):
+        self.assertEqual(array.tolist(), expected)
+
+    def test_int(self):
+        array = convert_column(FieldSchemaType.INT, [' 1 ', '$2,000', '', None, 5.7])
+
+        self.assertEqual(array.dtype, np.int64)
+        self.assertMaskedEqual(array, [1, 2000, None, None, 5])
+
+    def test_int_vectorized(self):
+        values = ['1', '+5', ' 3 ', None, '', 7]
+        array = convert_column(FieldSchemaType.INT, values, default_value='9')
+
+        expected = [convert_value(FieldSchemaType.INT, value, default_value='9') for value in values]
+        self.assertMaskedEqual(array, expected)
+        self.assertMaskedEqual(array, [1, 5, 3, 9, 9, 7])
+
+    def test_float_nan_not_vectorized(self):
+        array = convert_column(FieldSchemaType.FLOAT, ['nan', '1.5', '1e5'])
+
+        self.assertMaskedEqual(array, [None, 1.5, 100000.0])
+
+    def test_float_default(self):
+        array = convert_column(FieldSchemaType.FLOAT, ['1.5', '', None], default_value='0.5')
+
+        self.assertEqual(array.dtype, np.float64)
+        self.assertMaskedEqual(array, [1.5, 0.5, 0.5])
+        self.assertFalse(array.mask.any())
+
+    def test_float_inf(self):
+        with self.assertRaises(ValueError) as ctx:
+            convert_column(FieldSchemaType.FLOAT, ['1', '1e999'])
+
+        self.assertEqual(ctx.exception.expected_type, FieldSchemaType.FLOAT)
+
+    def test_boolean(self):
+        array = convert_column(FieldSchemaType.BOOLEAN, ['t', 'F', 'bad', None, 1])
+
+        self.assertEqual(array.dtype, np.bool_)
+        self.assertMaskedEqual(array, [True, False, None, None, True])
+
+    def test_duration(self):
+        array = convert_column(FieldSchemaType.DURATION, ['1:05', '70', None])
+        self.assertMaskedEqual(array, [65, 70, None])
+
+    def test_string_column(self):
+        values = [' abc ', '123', '', None, 'Def']
+        array = convert_string_column(values, r'^[a-zA-Z]*$', 'none', 'UPPER')
+
+        self.assertEqual(array.dtype, object)
+        self.assertEqual(
+            array.tolist(),
+            [convert_value(FieldSchemaType.STRING, value, r'^[a-zA-Z]*$', 'none', 'UPPER') for value in values])
+
+    def test_duration_column(self):
+        values = ['1:05', '2:01:05', ' 1:05 ', '$70', 70.5, '', None]
+        array = convert_duration_column(values, default_value='10')
+
+        self.assertEqual(array.dtype, np.int64)
+        self.assertMaskedEqual(
+            array, [convert_value(FieldSchemaType.DURATION, value, default_value='10') for value in values])
+        self.assertMaskedEqual(convert_duration_column(np.array([1, 2])), [1, 2])
+
+    def test_datetime(self):
+        array = convert_column(FieldSchemaType.DATETIME, ['2013-04-05', None, ''], default_value=None)
+
+        self.assertEqual(array.dtype, np.dtype('datetime64[us]'))
+        self.assertEqual(array[0], np.datetime64('2013-04-05T00:00:00'))
+        self.assertTrue(np.isnat(array[1:]).all())
+
+    def test_datetime_iso_vectorized(self):
+        values = ['2020-01-02', '2020-01-02 03:04:05', '2020-01-02T03:04:05.123456', None, '']
+        array = convert_column(FieldSchemaType.DATETIME, values)
+
+        self.assertEqual(array.dtype, np.dtype('datetime64[us]'))
+        self.assertEqual(array.tolist(), [convert_value(FieldSchemaType.DATETIME, value) for value in values])
+
+    def test_datetime_time_zone_not_vectorized(self):
+        array = convert_column(FieldSchemaType.DATETIME, ['2020-01-02T03:04:05+05:00', '2020-01-02'])
+
+        self.assertEqual(array.tolist(), [datetime(2020, 1, 1, 22, 4, 5), datetime(2020, 1, 2)])
+
+    def test_date_floored_vectorized(self):
+        array = convert_column(FieldSchemaType.DATE_FLOORED, ['2020-01-02 03:04:05', None], default_value='2001-01-01')
+
+        self.assertEqual(array.tolist(), [datetime(2020, 1, 2), datetime(2001, 1, 1)])
+
+    def test_datetime_format(self):
+        array = convert_column(FieldSchemaType.DATE_FLOORED, ['2013/04/05 10:00'], format_str='%Y/%m/%d %H:%M')
+        self.assertEqual(array.tolist(), [datetime(2013, 4, 5)])
+
+    def test_datetime_infer_format(self):
+        values = ['04/05/2013'] * 25 + ['2013-04-06']
+        array = convert_column(FieldSchemaType.DATETIME, values, infer_format=True)
+        self.assertEqual(array.tolist(), [datetime(2013, 4, 5)] * 25 + [datetime(2013, 4, 6)])
+
+    def test_string(self):
+        array = convert_column(FieldSchemaType.STRING, [' a ', None, 'b'], transform_case='UPPER')
+
+        self.assertEqual(array.dtype, np.dtype(object))
+        self.assertEqual(array.tolist(), ['A', None, 'B'])
+
+    def test_empty(self):
+        self.assertEqual(len(convert_column(FieldSchemaType.INT, [])), 0)
+        self.assertEqual(len(convert_column(FieldSchemaType.DATETIME, [])), 0)
+
+
+class ConvertArrayColumnTest(SimpleTestCase):
+    """
+    Tests converting NumPy arrays as a whole.
+    """
+    def test_int_from_float(self):
+        array = convert_column(FieldSchemaType.INT, np.array([1.9, -1.9, 3.0]))
+
+        self.assertEqual(array.dtype, np.int64)
+        self.assertEqual(array.tolist(), [convert_value(FieldSchemaType.INT, v) for v in [1.9, -1.9, 3.0]])
+
+    def test_int_nan(self):
+        with self.assertRaises(ValueError) as ctx:
+            convert_column(FieldSchemaType.INT, np.array([1.0, np.nan]))
+
+        self.assertTrue(np.isnan(ctx.exception.bad_value))
+        self.assertEqual(ctx.exception.expected_type, FieldSchemaType.INT)
+
+    def test_float_inf(self):
+        with self.assertRaises(ValueError) as ctx:
+            convert_column(FieldSchemaType.FLOAT, np.array([1.0, -np.inf]))
+
+        self.assertEqual(ctx.exception.bad_value, float('-inf'))
+
+    def test_float_from_int(self):
+        array = convert_column(FieldSchemaType.FLOAT, np.arange(3))
+
+        self.assertEqual(array.dtype, np.float64)
+        self.assertEqual(array.tolist(), [0.0, 1.0, 2.0])
+
+    def test_boolean(self):
+        array = convert_column(FieldSchemaType.BOOLEAN, np.array([1, 0, 2]))
+        self.assertEqual(array.tolist(), [True, False, None])
+
+    def test_datetime(self):
+        values = np.array([1447251508, 1447251508.1234, -1.5])
+        array = convert_column(FieldSchemaType.DATETIME, values)
+
+        self.assertEqual(array.dtype, np.dtype('datetime64[us]'))
+        self.assertEqual(array.tolist(), [convert_value(FieldSchemaType.DATETIME, v) for v in values.tolist()])
+
+    def test_date_floored(self):
+        array = convert_column(FieldSchemaType.DATE_FLOORED, np.array([1447251508, -1]))
+        self.assertEqual(array.tolist(), [datetime(2015, 11, 11), datetime(1969, 12, 31)])
+
+    def test_datetime_too_large(self):
+        with self.assertRaises(InvalidDateFormatException) as ctx:
+            convert_column(FieldSchemaType.DATETIME, np.array([1.0, 1e20]))
+
+        self.assertEqual(ctx.exception.bad_value, 1e20)
+
+    def test_string_not_vectorized(self):
+        array = convert_column(FieldSchemaType.STRING, np.array([1, 2]))
+        self.assertEqual(array.tolist(), ['1', '2'])
@@ -1,9 +1,14 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import re
 
 from django.test import SimpleTestCase
+from unittest.mock import patch
 
 from data_schema.models import FieldSchemaType
-from data_schema.convert_value import convert_value
+from data_schema.convert_value import (
+    FIELD_SCHEMA_CONVERTERS, INVALID, DatetimeConverter, convert_value, get_converter, get_string_preprocessor,
+)
 from data_schema.exceptions import InvalidDateFormatException
 
 
@@ -21,6 +26,57 @@ class ConvertValueExceptionTest(SimpleTestCase):
         self.assertEquals(FieldSchemaType.INT, ctx.exception.expected_type)
 
 
+class GetConverterTest(SimpleTestCase):
+    def test_bound_arguments(self):
+        """
+        Verifies that the returned converter applies the format, default value and case transform
+        """
+        self.assertEqual(get_converter(FieldSchemaType.STRING, transform_case='LOWER')(' ABC '), 'abc')
+        self.assertEqual(get_converter(FieldSchemaType.STRING, r'^\d+$')('abc'), None)
+        self.assertEqual(get_converter(FieldSchemaType.INT, default_value='5')(''), 5)
+        self.assertEqual(
+            get_converter(FieldSchemaType.DATETIME, '%Y-%m-%d')('2013-04-05'), datetime(2013, 4, 5))
+
+    def test_exception(self):
+        """
+        Verifies that bound converters attach the same information to exceptions as convert_value
+        """
+        with self.assertRaises(ValueError) as ctx:
+            get_converter(FieldSchemaType.FLOAT)('-')
+
+        self.assertEquals('-', ctx.exception.bad_value)
+        self.assertEquals(FieldSchemaType.FLOAT, ctx.exception.expected_type)
+
+    def test_lenient(self):
+        """
+        Verifies that lenient converters return INVALID instead of raising and convert like bound converters
+        """
+        for field_schema_type, values in (
+            (FieldSchemaType.INT, ['$1,000', '', None, 5.5]),
+            (FieldSchemaType.FLOAT, ['1.5', '']),
+            (FieldSchemaType.DURATION, ['1:02:03', '60', '']),
+            (FieldSchemaType.DATETIME, ['2013-04-05', 1365120000]),
+            (FieldSchemaType.STRING, [' abc ', 5]),
+        ):
+            convert = get_converter(field_schema_type, lenient=True)
+            bound_convert = get_converter(field_schema_type)
+            for value in values:
+                self.assertEqual(convert(value), bound_convert(value))
+
+        self.assertIs(get_converter(FieldSchemaType.FLOAT, lenient=True)('-'), INVALID)
+        self.assertIs(get_converter(FieldSchemaType.DURATION, lenient=True)('1.2.3'), INVALID)
+        self.assertIs(get_converter(FieldSchemaType.DATETIME, '%Y-%m-%d', lenient=True)('04/05/2013'), INVALID)
+        self.assertEqual(get_converter(FieldSchemaType.INT, default_value='5', lenient=True)(''), 5)
+        # Values that can not be preprocessed are invalid too
+        self.assertIs(get_converter(FieldSchemaType.STRING, transform_case='UPPER', lenient=True)(5), INVALID)
+
+    def test_lenient_inferred(self):
+        convert = get_converter(FieldSchemaType.DATETIME, infer_format=True, lenient=True)
+
+        self.assertEqual(convert('2013-04-05'), datetime(2013, 4, 5))
+        self.assertIs(convert('not a date'), INVALID)
+
+
 class BooleanConverterTest(SimpleTestCase):
 
     def test_convert_value_true(self):
@@ -81,6 +137,105 @@ class BooleanConverterTest(SimpleTestCase):
         self.assertIsNone(convert_value(FieldSchemaType.BOOLEAN, 'invalid', default_value=True))
 
 
+class DatetimeConverterTest(SimpleTestCase):
+
+    def test_iso_fast_path(self):
+        """
+        Verifies that ISO-8601 strings are parsed without dateutil and without trying timestamps
+        """
+        with patch('data_schema.convert_value.parse', spec_set=True) as parse_mock:
+            self.assertEqual(convert_value(FieldSchemaType.DATETIME, '2015-11-09'), datetime(2015, 11, 9))
+            self.assertEqual(
+                convert_value(FieldSchemaType.DATETIME, ' 2015-11-09 15:30:00.25 '),
+                datetime(2015, 11, 9, 15, 30, 0, 250000))
+            self.assertEqual(
+                convert_value(FieldSchemaType.DATETIME, '2015-11-09T15:30:00+05:00'), datetime(2015, 11, 9, 10, 30))
+            self.assertFalse(parse_mock.called)
+
+    def test_iso_fallback(self):
+        """
+        Verifies that ISO-looking strings that fromisoformat can not parse fall back to dateutil
+        """
+        self.assertEqual(convert_value(FieldSchemaType.DATETIME, '2017-03-01T10:30.000Z'), datetime(2017, 3, 1, 10, 30))
+        self.assertEqual(convert_value(FieldSchemaType.DATETIME, '2017-03-01 at 10am'), datetime(2017, 3, 1, 10))
+
+    def test_infer_format(self):
+        converter = FIELD_SCHEMA_CONVERTERS[FieldSchemaType.DATETIME]
+
+        self.assertEqual(converter.infer_format(['01/02/2013', '12/31/2013']), '%m/%d/%Y')
+        self.assertEqual(converter.infer_format(['2013/01/02 10:11:12', 'bad']), '%Y/%m/%d %H:%M:%S')
+        self.assertIsNone(converter.infer_format(['2013-01-02 10:11:12']))
+        self.assertEqual(converter.infer_format(['Jan 2, 2013']), '%b %d, %Y')
+        self.assertIsNone(converter.infer_format(['01/02/2013', 'Jan 2, 2013']))
+        self.assertIsNone(converter.infer_format(['bad']))
+
+    def test_bind_inferred(self):
+        """
+        Verifies that an inferred format is used once enough samples have been seen
+        """
+        convert = FIELD_SCHEMA_CONVERTERS[FieldSchemaType.DATETIME].bind_inferred(sample_size=2)
+
+        self.assertEqual(convert(' 01/02/2013 '), datetime(2013, 1, 2))
+        self.assertEqual(convert('1447251508'), datetime(2015, 11, 11, 14, 18, 28))
+        self.assertEqual(convert('12/31/2013'), datetime(2013, 12, 31))
+
+        with patch('data_schema.convert_value.parse', spec_set=True) as parse_mock:
+            self.assertEqual(convert('03/04/2013'), datetime(2013, 3, 4))
+            self.assertIsNone(convert(''))
+            self.assertFalse(parse_mock.called)
+
+        # Values that do not match the format fall back to being parsed without it
+        self.assertEqual(convert('2013-03-04 10:00'), datetime(2013, 3, 4, 10))
+        self.assertEqual(convert('March 4th 2013'), datetime(2013, 3, 4))
+        with self.assertRaises(ValueError):
+            convert('bad')
+
+    def test_bind_inferred_iso(self):
+        """
+        Verifies that ISO-8601 strings are not used as samples and are always parsed with fromisoformat
+        """
+        convert = FIELD_SCHEMA_CONVERTERS[FieldSchemaType.DATETIME].bind_inferred(sample_size=2)
+
+        with patch.object(DatetimeConverter, 'infer_format', spec_set=True) as infer_format_mock:
+            for _ in range(3):
+                self.assertEqual(convert('2013-01-02 10:11:12'), datetime(2013, 1, 2, 10, 11, 12))
+            self.assertFalse(infer_format_mock.called)
+
+        convert('01/02/2013')
+        convert('12/31/2013')
+        convert_value = DatetimeConverter._convert_value
+        with patch.object(DatetimeConverter, '_convert_value', autospec=True, side_effect=convert_value) as mock:
+            self.assertEqual(convert('2013-01-02T10:11:12'), datetime(2013, 1, 2, 10, 11, 12))
+            self.assertEqual(convert('03/04/2013'), datetime(2013, 3, 4))
+            self.assertEqual([call[0][2] for call in mock.call_args_list], [None, '%m/%d/%Y'])
+
+    def test_bind_inferred_threads(self):
+        convert = FIELD_SCHEMA_CONVERTERS[FieldSchemaType.DATETIME].bind_inferred(sample_size=50)
+        values = ['01/02/2013', '12/31/2013'] * 500
+
+        with ThreadPoolExecutor(4) as executor:
+            converted = list(executor.map(convert, values))
+
+        self.assertEqual(converted, [datetime(2013, 1, 2), datetime(2013, 12, 31)] * 500)
+
+    def test_bind_inferred_no_format(self):
+        convert = FIELD_SCHEMA_CONVERTERS[FieldSchemaType.DATE_FLOORED].bind_inferred(default_value='2013-01-01')
+
+        for value in ['01/02/2013 10:00', 'Jan 2, 2013'] * 10:
+            self.assertEqual(convert(value), datetime(2013, 1, 2))
+        self.assertEqual(convert(None), datetime(2013, 1, 1))
+
+    def test_get_converter_infer_format(self):
+        self.assertEqual(
+            get_converter(FieldSchemaType.DATETIME, infer_format=True).__qualname__,
+            'DatetimeConverter.bind_inferred.<locals>.convert')
+        self.assertEqual(
+            get_converter(FieldSchemaType.DATETIME, '%Y', infer_format=True).__qualname__,
+            'ValueConverter.bind.<locals>.convert')
+        self.assertEqual(
+            get_converter(FieldSchemaType.INT, infer_format=True).__qualname__, 'ValueConverter.bind.<locals>.convert')
+
+
 class DurationConverterTest(SimpleTestCase):
 
     def test_convert_valid_simple_number(self):
@@ -113,6 +268,40 @@ class DurationConverterTest(SimpleTestCase):
         self.assertIsNone(convert_value(FieldSchemaType.DURATION, 'sup'))
         self.assertIsNone(convert_value(FieldSchemaType.DURATION, ':::'))
 
+    def test_bound(self):
+        """
+        Verifies that bound duration converters dispatch durations and numbers like convert_value
+        """
+        convert = get_converter(FieldSchemaType.DURATION, default_value='60')
+        for value in ['1:05', '2:1:5', '70', ' 1:05 ', '$70', 70.5, '', None]:
+            self.assertEqual(convert(value), convert_value(FieldSchemaType.DURATION, value, default_value='60'))
+
+
+class NumericConverterTest(SimpleTestCase):
+    def test_clean_and_dirty_strings(self):
+        """
+        Verifies that clean strings skip stripping non-numeric characters and convert the same as dirty ones
+        """
+        self.assertEqual(convert_value(FieldSchemaType.INT, ' 123 '), 123)
+        self.assertEqual(convert_value(FieldSchemaType.INT, '1,234'), 1234)
+        self.assertEqual(convert_value(FieldSchemaType.FLOAT, '-4.5'), -4.5)
+        self.assertEqual(convert_value(FieldSchemaType.FLOAT, '4.5e2'), 450.0)
+
+    def test_clean_strings_not_substituted(self):
+        converter = FIELD_SCHEMA_CONVERTERS[FieldSchemaType.FLOAT]
+        with patch.object(converter, 'NON_NUMERIC_REGEX', spec_set=True) as regex_mock:
+            for value in ['4.5', '-3', '1e5', '12']:
+                self.assertEqual(converter(value, None, None), float(value))
+            self.assertFalse(regex_mock.sub.called)
+
+    def test_infinity(self):
+        """
+        Verifies that infinite floats are invalid
+        """
+        for value in ['1e999', '-1e999', float('inf')]:
+            with self.assertRaises(ValueError):
+                convert_value(FieldSchemaType.FLOAT, value)
+
 
 class DateFlooredConverterTest(SimpleTestCase):
 
@@ -132,3 +321,41 @@ class DateFlooredConverterTest(SimpleTestCase):
             convert_value(FieldSchemaType.DATE_FLOORED, 3333333333333333333333333)
 
         self.assertEqual(str(context.exception), 'Invalid date format: 3333333333333333333333333')
+
+
+class StringConverterTest(SimpleTestCase):
+    def test_preprocessor_cached(self):
+        """
+        Verifies that preprocessors are compiled once per format string and case transform
+        """
+        self.assertIs(get_string_preprocessor(r'^\d+$', 'LOWER'), get_string_preprocessor(r'^\d+$', 'LOWER'))
+        self.assertIsNot(get_string_preprocessor(r'^\d+$', 'LOWER'), get_string_preprocessor(r'^\d+$', 'UPPER'))
+
+        with patch('data_schema.convert_value.re.compile', side_effect=AssertionError):
+            get_converter(FieldSchemaType.STRING, r'^\d+$', transform_case='LOWER')('123')
+
+    def test_invalid_format_str(self):
+        """
+        Verifies that invalid format strings only raise when matched against string values
+        """
+        self.assertIsNone(convert_value(FieldSchemaType.STRING, None, '['))
+        self.assertEqual(convert_value(FieldSchemaType.STRING, 5, '['), '5')
+
+        convert = get_converter(FieldSchemaType.STRING, '[')
+        self.assertIsNone(convert(None))
+        self.assertEqual(convert(5), '5')
+        with self.assertRaises(re.error):
+            convert('a')
+
+    def test_bound(self):
+        """
+        Verifies that bound string converters convert the same as convert_value
+        """
+        for format_str, default_value, transform_case in (
+            (None, None, None), (r'^[a-z]+$', 'DEFAULT', None), (r'^[a-z]+', None, 'UPPER'), (None, 'x', 'LOWER'),
+        ):
+            convert = get_converter(FieldSchemaType.STRING, format_str, default_value, transform_case)
+            for value in [' abc ', 'ABC', '123', '', None, 'abc1']:
+                self.assertEqual(
+                    convert(value),
+                    convert_value(FieldSchemaType.STRING, value, format_str, default_value, transform_case))
@@ -0,0 +1,92 @@
+from datetime import datetime
+
+from django.test import TestCase
+from django_dynamic_fixture import G
+import numpy as np
+import pandas as pd
+from pandas.errors import OutOfBoundsDatetime
+
+from data_schema.field_schema_type import FieldSchemaCase, FieldSchemaType
+from data_schema.models import DataSchema, FieldSchema
+
+
+class DataFrameTest(TestCase):
+    """
+    Tests building DataFrames with DataSchema.to_dataframe.
+    """
+    def setUp(self):
+        self.data_schema = G(DataSchema)
+        for i, (field_key, field_type) in enumerate((
+            ('name', FieldSchemaType.STRING), ('count', FieldSchemaType.INT), ('score', FieldSchemaType.FLOAT),
+            ('active', FieldSchemaType.BOOLEAN), ('time', FieldSchemaType.DATETIME),
+            ('duration', FieldSchemaType.DURATION),
+        )):
+            G(
+                FieldSchema, data_schema=self.data_schema, field_key=field_key, field_position=i, field_type=field_type,
+                transform_case=FieldSchemaCase.UPPER if field_key == 'name' else None)
+        self.data_schema = DataSchema.objects.get(id=self.data_schema.id)
+
+    def test_dtypes(self):
+        self.assertEquals(self.data_schema.dtypes(), {
+            'name': 'string', 'count': 'Int64', 'score': 'Float64', 'active': 'boolean', 'time': 'datetime64[ns]',
+            'duration': 'Int64',
+        })
+
+    def test_to_dataframe(self):
+        rows = [
+            ['a', '$1,000', '1.5', 'true', '2020-01-02T03:04:05', '1:00:00'],
+            {'name': 'b', 'count': None, 'score': '', 'active': 'x', 'time': None},
+        ]
+
+        df = self.data_schema.to_dataframe(iter(rows))
+
+        self.assertEquals(list(df.columns), ['name', 'count', 'score', 'active', 'time', 'duration'])
+        self.assertEquals({key: str(dtype) for key, dtype in df.dtypes.items()}, self.data_schema.dtypes())
+        self.assertEquals(df['name'].tolist(), ['A', 'B'])
+        self.assertEquals(df['count'].tolist(), [1000, pd.NA])
+        self.assertEquals(df['score'].tolist(), [1.5, pd.NA])
+        self.assertEquals(df['active'].tolist(), [True, pd.NA])
+        self.assertEquals(df['time'][0], pd.Timestamp(datetime(2020, 1, 2, 3, 4, 5)))
+        self.assertTrue(pd.isna(df['time'][1]))
+        self.assertEquals(df['duration'].tolist(), [3600, pd.NA])
+
+    def test_matches_convert_rows(self):
+        rows = [['a', '1', '2', '0', '2020-01-02', '60'], ['b', '3', '4', '1', '2021-01-02', '120']]
+
+        df = self.data_schema.to_dataframe(rows)
+
+        self.assertEquals(
+            [tuple(row) for row in df.astype(object).itertuples(index=False)],
+            [tuple(pd.Timestamp(value) if isinstance(value, datetime) else value for value in row)
+             for row in self.data_schema.convert_rows(rows, output='tuple')])
+
+    def test_numpy_columns(self):
+        rows = [[None, np.int64(1), np.float64(2.5)]]
+
+        df = self.data_schema.to_dataframe(rows)
+
+        self.assertEquals(df['count'].tolist(), [1])
+        self.assertEquals(df['score'].tolist(), [2.5])
+
+    def test_empty(self):
+        df = self.data_schema.to_dataframe([])
+
+        self.assertEquals(len(df), 0)
+        self.assertEquals(str(df.dtypes['count']), 'Int64')
+
+    def test_exception(self):
+        with self.assertRaises(ValueError) as ctx:
+            self.data_schema.to_dataframe([['a', '1.2.3']])
+
+        self.assertEquals(ctx.exception.field_key, 'count')
+
+    def test_out_of_bounds_datetime(self):
+        """
+        Tests that datetimes that pandas can not hold raise with the field they belong to.
+        """
+        with self.assertRaises(OutOfBoundsDatetime) as ctx:
+            self.data_schema.to_dataframe([['a', '1', None, None, '2020-01-01'], ['b', '2', None, None, '9999-12-31']])
+
+        self.assertEquals(ctx.exception.field_key, 'time')
+        self.assertEquals(ctx.exception.expected_type, FieldSchemaType.DATETIME)
+        self.assertEquals(ctx.exception.bad_value, datetime(9999, 12, 31))
@@ -0,0 +1,104 @@
+from datetime import datetime
+import os
+import tempfile
+
+from django.test import TestCase
+from django_dynamic_fixture import G
+
+from data_schema.compiled_schema import RowOutput
+from data_schema.deduplication import DIGEST_SIZE, Keep, hash_key
+from data_schema.field_schema_type import FieldSchemaCase, FieldSchemaType
+from data_schema.models import DataSchema, FieldSchema
+
+
+class UniqueKeyTest(TestCase):
+    """
+    Tests get_unique_key and unique_keys.
+    """
+    def setUp(self):
+        self.data_schema = G(DataSchema)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='time', field_position=1,
+            field_type=FieldSchemaType.DATETIME, field_format='%Y-%m-%d', uniqueness_order=2)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='name', field_position=0,
+            field_type=FieldSchemaType.STRING, transform_case=FieldSchemaCase.UPPER, uniqueness_order=1)
+        G(FieldSchema, data_schema=self.data_schema, field_key='count', field_position=2, field_type='INT')
+
+    def test_get_unique_key(self):
+        self.assertEquals(
+            self.data_schema.get_unique_key({'name': 'a', 'time': '2020-01-02', 'count': '3'}),
+            ('A', datetime(2020, 1, 2)))
+        self.assertEquals(self.data_schema.get_unique_key(['a', '2020-01-02']), ('A', datetime(2020, 1, 2)))
+
+    def test_get_unique_key_no_unique_fields(self):
+        self.assertEquals(G(DataSchema).get_unique_key({'name': 'a'}), ())
+
+    def test_unique_keys_mixed_rows(self):
+        keys = self.data_schema.unique_keys([{'name': 'a', 'time': '2020-01-02'}, ['b', None]])
+
+        self.assertEquals(list(keys), [('A', datetime(2020, 1, 2)), ('B', None)])
+
+    def test_unique_keys_error(self):
+        with self.assertRaises(ValueError) as ctx:
+            list(self.data_schema.unique_keys([['a', '2020-01-02'], ['b', 'bad']]))
+
+        self.assertEquals(ctx.exception.field_key, 'time')
+        self.assertEquals(ctx.exception.bad_value, 'bad')
+
+
+class DeduplicateTest(TestCase):
+    """
+    Tests DataSchema.deduplicate.
+    """
+    def setUp(self):
+        self.data_schema = G(DataSchema)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='id', field_position=0,
+            field_type=FieldSchemaType.INT, uniqueness_order=1)
+        G(FieldSchema, data_schema=self.data_schema, field_key='name', field_position=1, field_type='STRING')
+        self.rows = [[1, 'a'], ['2', 'b'], ['1', 'c'], [3, 'd'], [2, 'e'], [4, 'f']]
+
+    def test_hash_key(self):
+        self.assertEquals(len(hash_key((1, 'a'))), DIGEST_SIZE)
+        self.assertEquals(hash_key((1, 'a')), hash_key((1, 'a')))
+        self.assertNotEquals(hash_key((1, 'a')), hash_key((1, 'b')))
+
+    def test_keep_first(self):
+        rows = self.data_schema.deduplicate(iter(self.rows))
+        self.assertEquals(list(rows), [[1, 'a'], ['2', 'b'], [3, 'd'], [4, 'f']])
+
+    def test_keep_first_lazy(self):
+        rows = self.data_schema.deduplicate(iter(self.rows))
+        self.assertEquals(next(rows), [1, 'a'])
+
+    def test_keep_last(self):
+        rows = self.data_schema.deduplicate(self.rows, keep=Keep.LAST)
+        self.assertEquals(list(rows), [['1', 'c'], [3, 'd'], [2, 'e'], [4, 'f']])
+
+    def test_spill(self):
+        with tempfile.TemporaryDirectory() as spill_dir:
+            for keep, expected in (
+                (Keep.FIRST, [[1, 'a'], ['2', 'b'], [3, 'd'], [4, 'f']]),
+                (Keep.LAST, [['1', 'c'], [3, 'd'], [2, 'e'], [4, 'f']]),
+            ):
+                rows = self.data_schema.deduplicate(self.rows, keep=keep, max_memory_keys=1, spill_dir=spill_dir)
+                self.assertEquals(list(rows), expected)
+
+                # The spill database is removed once the rows are consumed
+                self.assertEquals(os.listdir(spill_dir), [])
+
+    def test_spill_records(self):
+        records = list(self.data_schema.convert_rows(self.rows, output=RowOutput.RECORD))
+
+        rows = self.data_schema.deduplicate(records, keep=Keep.LAST, max_memory_keys=2)
+
+        self.assertEquals(list(rows), [records[2], records[3], records[4], records[5]])
+
+    def test_invalid_keep(self):
+        with self.assertRaises(ValueError):
+            self.data_schema.deduplicate(self.rows, keep='middle')
+
+    def test_no_unique_fields(self):
+        with self.assertRaises(ValueError):
+            G(DataSchema).deduplicate(self.rows)
@@ -0,0 +1,257 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import MagicMock, patch
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db.models import Q, UniqueConstraint
+from django.test import TestCase, override_settings
+from django_dynamic_fixture import G
+
+from data_schema.field_schema_type import FieldSchemaType
+from data_schema.ingest import (
+    CopyStream, IngestResult, can_upsert_natively, get_copy_defaults, get_unique_field_sets, iter_copy_lines,
+)
+from data_schema.models import DataSchema, FieldSchema
+from data_schema.tests.models import IngestDateModel, IngestModel
+
+
+class IngestTest(TestCase):
+    """
+    Tests upserting converted rows with DataSchema.ingest.
+    """
+    def setUp(self):
+        self.data_schema = G(DataSchema, model_content_type=ContentType.objects.get_for_model(IngestModel))
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='name', field_position=0,
+            field_type=FieldSchemaType.STRING, uniqueness_order=1)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='day', field_position=1,
+            field_type=FieldSchemaType.INT, uniqueness_order=2)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='count', field_position=2,
+            field_type=FieldSchemaType.INT)
+        self.data_schema = DataSchema.objects.get(id=self.data_schema.id)
+
+    def get_rows(self):
+        return list(IngestModel.objects.order_by('name', 'day').values_list('name', 'day', 'count'))
+
+    def test_insert(self):
+        result = self.data_schema.ingest([['a', '1', '10'], ['b', '1', '$20'], {'name': 'a', 'day': 2}])
+
+        self.assertEquals(result, IngestResult(inserted=3, updated=0, unchanged=0))
+        self.assertEquals(self.get_rows(), [('a', 1, 10), ('a', 2, None), ('b', 1, 20)])
+
+    def test_upsert(self):
+        G(IngestModel, name='a', day=1, count=10)
+        G(IngestModel, name='b', day=1, count=20)
+        G(IngestModel, name='c', day=1, count=30)
+
+        result = self.data_schema.ingest([['a', '1', '10'], ['b', '1', '21'], ['c', '2', '30']], batch_size=2)
+
+        self.assertEquals(result, IngestResult(inserted=1, updated=1, unchanged=1))
+        self.assertEquals(self.get_rows(), [('a', 1, 10), ('b', 1, 21), ('c', 1, 30), ('c', 2, 30)])
+
+    def test_duplicate_keys_in_batch(self):
+        result = self.data_schema.ingest([['a', '1', '10'], ['a', '1', '11']])
+
+        self.assertEquals(result, IngestResult(inserted=1, updated=0, unchanged=0))
+        self.assertEquals(self.get_rows(), [('a', 1, 11)])
+
+    def test_queryset(self):
+        G(IngestModel, name='a', day=1, count=10)
+
+        result = self.data_schema.ingest([['a', '1', '11']], queryset=IngestModel.objects.filter(day=1))
+
+        self.assertEquals(result, IngestResult(inserted=0, updated=1, unchanged=0))
+
+    def test_single_unique_field(self):
+        data_schema = G(DataSchema, model_content_type=ContentType.objects.get_for_model(IngestModel))
+        G(
+            FieldSchema, data_schema=data_schema, field_key='name', field_position=0, field_type='STRING',
+            uniqueness_order=1)
+        G(FieldSchema, data_schema=data_schema, field_key='score', field_position=1, field_type='FLOAT')
+        G(IngestModel, name='a', score=1.5)
+
+        result = data_schema.ingest([['a', '2.5'], ['b', '1']])
+
+        self.assertEquals(result, IngestResult(inserted=1, updated=1, unchanged=0))
+        self.assertEquals(IngestModel.objects.get(name='a').score, 2.5)
+
+    def test_large_batch(self):
+        """
+        Tests that batches with composite keys are not limited by the size of a query.
+        """
+        G(IngestModel, name='n5', day=5, count=0)
+        rows = [['n{0}'.format(i), str(i), '1'] for i in range(1000)]
+
+        result = self.data_schema.ingest(rows)
+
+        self.assertEquals(result, IngestResult(inserted=999, updated=1, unchanged=0))
+        self.assertEquals(self.data_schema.ingest(rows), IngestResult(inserted=0, updated=0, unchanged=1000))
+        self.assertEquals(IngestModel.objects.count(), 1000)
+
+    def test_date_and_decimal_fields(self):
+        """
+        Tests that converted values are compared with the values of date and decimal fields of the model.
+        """
+        data_schema = G(DataSchema, model_content_type=ContentType.objects.get_for_model(IngestDateModel))
+        for i, (field_key, field_type) in enumerate((
+            ('name', FieldSchemaType.STRING), ('day', FieldSchemaType.DATE), ('amount', FieldSchemaType.FLOAT),
+        )):
+            G(
+                FieldSchema, data_schema=data_schema, field_key=field_key, field_position=i, field_type=field_type,
+                uniqueness_order=i + 1 if field_key != 'amount' else None)
+        data_schema = DataSchema.objects.get(id=data_schema.id)
+        rows = [['a', '2020-01-02', '1.5'], ['b', '2020-01-02', '0.1']]
+
+        self.assertEquals(data_schema.ingest(rows), IngestResult(inserted=2, updated=0, unchanged=0))
+        self.assertEquals(data_schema.ingest(rows), IngestResult(inserted=0, updated=0, unchanged=2))
+        self.assertEquals(
+            data_schema.ingest([['a', '2020-01-02', '2.5']]), IngestResult(inserted=0, updated=1, unchanged=0))
+        self.assertEquals(
+            list(IngestDateModel.objects.order_by('name').values_list('name', 'day', 'amount')),
+            [('a', date(2020, 1, 2), Decimal('2.50')), ('b', date(2020, 1, 2), Decimal('0.10'))])
+
+    def test_not_model_field(self):
+        G(FieldSchema, data_schema=self.data_schema, field_key='other', field_position=3, field_type='STRING')
+
+        with self.assertRaises(ValueError):
+            DataSchema.objects.get(id=self.data_schema.id).ingest([['a', '1', '1', 'x']])
+
+    def test_no_unique_fields(self):
+        data_schema = G(DataSchema, model_content_type=ContentType.objects.get_for_model(IngestModel))
+
+        with self.assertRaises(ValueError):
+            data_schema.ingest([])
+
+
+class CanUpsertNativelyTest(TestCase):
+    """
+    Tests choosing native PostgreSQL upserts.
+    """
+    def setUp(self):
+        connection = MagicMock(vendor='postgresql')
+        patcher = patch('data_schema.ingest.connections', {'default': connection, 'other': connection})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_unique_together(self):
+        self.assertTrue(can_upsert_natively(IngestModel.objects.all(), ['day', 'name']))
+
+    def test_unique_field(self):
+        self.assertTrue(can_upsert_natively(ContentType.objects.all(), ['id']))
+
+    def test_no_unique_constraint(self):
+        self.assertFalse(can_upsert_natively(IngestModel.objects.all(), ['name']))
+        self.assertFalse(can_upsert_natively(IngestModel.objects.all(), ['name', 'day', 'count']))
+
+    def test_filtered_queryset(self):
+        self.assertFalse(can_upsert_natively(IngestModel.objects.filter(day=1), ['name', 'day']))
+
+    def test_other_database(self):
+        self.assertFalse(can_upsert_natively(IngestModel.objects.using('other'), ['name', 'day']))
+
+    def test_not_postgres(self):
+        patcher = patch('data_schema.ingest.connections', {'default': MagicMock(vendor='sqlite')})
+        with patcher:
+            self.assertFalse(can_upsert_natively(IngestModel.objects.all(), ['name', 'day']))
+
+    def test_unique_constraint(self):
+        unique_field_sets = get_unique_field_sets(IngestModel)
+        constraints = [
+            UniqueConstraint(fields=['name', 'count'], name='name_count'),
+            UniqueConstraint(fields=['name', 'score'], name='name_score', condition=Q(active=True)),
+        ]
+
+        with patch.object(IngestModel._meta, 'constraints', constraints):
+            self.assertEquals(get_unique_field_sets(IngestModel), unique_field_sets + [{'name', 'count'}])
+        self.assertIn({'id'}, unique_field_sets)
+        self.assertIn({'name', 'day'}, unique_field_sets)
+
+
+class CopyRowsTest(TestCase):
+    """
+    Tests inserting converted rows with DataSchema.copy_rows.
+    """
+    def setUp(self):
+        self.data_schema = G(DataSchema, model_content_type=ContentType.objects.get_for_model(IngestModel))
+        for i, (field_key, field_type) in enumerate((
+            ('name', FieldSchemaType.STRING), ('count', FieldSchemaType.INT), ('active', FieldSchemaType.BOOLEAN),
+            ('time', FieldSchemaType.DATETIME),
+        )):
+            G(FieldSchema, data_schema=self.data_schema, field_key=field_key, field_position=i, field_type=field_type)
+        self.data_schema = DataSchema.objects.get(id=self.data_schema.id)
+        self.rows = [
+            ['a\tb', '1', 'true', '2020-01-02T03:04:05+01:00'],
+            ['back\\slash\n', None, '0', None],
+        ]
+
+    def test_copy_lines(self):
+        lines = list(iter_copy_lines(self.data_schema.compile(), IngestModel, self.rows))
+
+        # The day and score fields of the model are not in the schema and are copied with their defaults
+        self.assertEquals(lines, [
+            'a\\tb\t1\tt\t2020-01-02T02:04:05+00:00\t0\t\\N\n',
+            'back\\\\slash\t\\N\tf\t\\N\t0\t\\N\n',
+        ])
+
+    def test_copy_defaults(self):
+        fields, defaults = get_copy_defaults(self.data_schema.compile(), IngestModel)
+
+        self.assertEquals([field.name for field in fields], ['day', 'score'])
+        self.assertEquals([default() for default in defaults], ['0', '\\N'])
+
+    def test_copy_stream(self):
+        stream = CopyStream(iter(['ab\n', 'cd\n', 'e\n']))
+
+        self.assertEquals(stream.read(4), 'ab\nc')
+        self.assertEquals(stream.read(), 'd\ne\n')
+        self.assertEquals(stream.read(4), '')
+
+    def test_postgres(self):
+        """
+        Tests that rows are streamed with COPY on PostgreSQL.
+        """
+        copied = []
+        driver_cursor = MagicMock(rowcount=2)
+        driver_cursor.copy_expert.side_effect = lambda sql, stream: copied.extend([sql, stream.read()])
+        connection = MagicMock(vendor='postgresql')
+        connection.ops.quote_name = '"{0}"'.format
+        connection.cursor.return_value.__enter__.return_value.cursor = driver_cursor
+
+        with patch('data_schema.ingest.connections', {'default': connection}), \
+                patch('data_schema.ingest.transaction.atomic'):
+            self.assertEquals(self.data_schema.copy_rows(self.rows), 2)
+
+        self.assertEquals(copied, [
+            'COPY "tests_ingestmodel" ("name", "count", "active", "time", "day", "score") FROM STDIN',
+            ''.join(iter_copy_lines(self.data_schema.compile(), IngestModel, self.rows)),
+        ])
+
+    @override_settings(USE_TZ=True)
+    def test_bulk_create(self):
+        """
+        Tests that rows are inserted with bulk_create on other databases.
+        """
+        with patch('data_schema.ingest.connections', {'default': MagicMock(vendor='sqlite')}):
+            self.assertEquals(self.data_schema.copy_rows(self.rows + [['c', '3', None, None]], batch_size=2), 3)
+
+        self.assertEquals(
+            list(IngestModel.objects.order_by('id').values_list('name', 'count', 'active', 'time', 'day')), [
+                ('a\tb', 1, True, datetime(2020, 1, 2, 2, 4, 5, tzinfo=timezone.utc), 0),
+                ('back\\slash', None, False, None, 0),
+                ('c', 3, None, None, 0),
+            ])
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY is only used on PostgreSQL')
+    @override_settings(USE_TZ=True)
+    def test_copy(self):
+        self.assertEquals(self.data_schema.copy_rows(self.rows), 2)
+
+        self.assertEquals(
+            list(IngestModel.objects.order_by('id').values_list('name', 'count', 'active', 'time', 'day', 'score')), [
+                ('a\tb', 1, True, datetime(2020, 1, 2, 2, 4, 5, tzinfo=timezone.utc), 0, None),
+                ('back\\slash', None, False, None, 0, None),
+            ])
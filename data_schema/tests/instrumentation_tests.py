@@ -0,0 +1,125 @@
+from django.test import TestCase
+from django_dynamic_fixture import G
+
+from data_schema import instrumentation
+from data_schema.compiled_schema import RowOutput
+from data_schema.field_schema_type import FieldSchemaType
+from data_schema.instrumentation import FieldMetrics, metrics
+from data_schema.models import DataSchema, FieldSchema
+
+
+class InstrumentationTest(TestCase):
+    """
+    Tests recording conversion metrics of schemas.
+    """
+    def setUp(self):
+        metrics.reset()
+        self.data_schema = G(DataSchema)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='count', field_position=0,
+            field_type=FieldSchemaType.INT, default_value='7')
+        G(FieldSchema, data_schema=self.data_schema, field_key='name', field_position=1, field_type='STRING')
+
+    def tearDown(self):
+        instrumentation.disable()
+        metrics.reset()
+
+    def get_metrics(self):
+        return {snapshot['field_key']: snapshot for snapshot in metrics.snapshot()}
+
+    def test_disabled(self):
+        list(self.data_schema.convert_rows([['1', 'a']]))
+        self.data_schema.get_value(['1', 'a'], 'count')
+
+        self.assertEquals(metrics.snapshot(), [])
+
+    def test_convert_rows(self):
+        instrumentation.enable()
+
+        list(self.data_schema.convert_rows([['1', 'a'], ['', None], [None, 'b']]))
+        with self.assertRaises(ValueError):
+            list(self.data_schema.convert_rows([['1.2.3', 'a']]))
+
+        snapshots = self.get_metrics()
+        self.assertEquals(snapshots['count']['schema_id'], self.data_schema.id)
+        self.assertEquals(snapshots['count']['calls'], 4)
+        self.assertEquals(snapshots['count']['defaults'], 2)
+        self.assertEquals(snapshots['count']['nulls'], 0)
+        self.assertEquals(snapshots['count']['errors'], {FieldSchemaType.INT: 1})
+        self.assertEquals(snapshots['name']['calls'], 3)
+        self.assertEquals(snapshots['name']['nulls'], 1)
+        self.assertEquals(snapshots['name']['defaults'], 0)
+        self.assertGreater(snapshots['name']['total_seconds'], 0)
+        self.assertIsNotNone(snapshots['name']['percentiles'][0.5])
+
+    def test_defaults_counted_by_converter(self):
+        """
+        Verifies that defaults are counted where the converter substitutes them, which depends on the type and
+        format of the field and not only on the raw value
+        """
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='code', field_position=2,
+            field_type=FieldSchemaType.STRING, field_format=r'^\d+$', default_value='000')
+        instrumentation.enable()
+
+        rows = [['abc', '', '12'], ['5', ' ', 'x'], [None, 'b', '']]
+        self.assertEquals(
+            [tuple(row) for row in self.data_schema.convert_rows(rows, output=RowOutput.TUPLE)],
+            [(7, '', '12'), (5, '', '000'), (7, 'b', '000')])
+        self.assertEquals(self.data_schema.get_value({'count': 'abc'}, 'count'), 7)
+
+        snapshots = self.get_metrics()
+        self.assertEquals(snapshots['count']['defaults'], 3)
+        self.assertEquals(snapshots['name']['defaults'], 0)
+        self.assertEquals(snapshots['code']['defaults'], 2)
+
+    def test_compiled_again_when_enabled(self):
+        compiled = self.data_schema.compile()
+        instrumentation.enable()
+
+        self.assertIsNot(self.data_schema.compile(), compiled)
+
+        instrumentation.disable()
+        self.assertIs(self.data_schema.compile(), compiled)
+
+    def test_get_value(self):
+        instrumentation.enable()
+
+        self.assertEquals(self.data_schema.get_value({'count': None}, 'count'), 7)
+        self.assertEquals(self.data_schema.get_value({'name': 'a'}, 'name'), 'a')
+
+        snapshots = self.get_metrics()
+        self.assertEquals(snapshots['count']['calls'], 1)
+        self.assertEquals(snapshots['count']['defaults'], 1)
+        self.assertEquals(snapshots['name']['calls'], 1)
+
+    def test_to_prometheus(self):
+        instrumentation.enable()
+        self.data_schema.get_value({'name': 'a'}, 'name')
+        with self.assertRaises(ValueError):
+            self.data_schema.get_value({'count': '1.2.3'}, 'count')
+
+        text = metrics.to_prometheus()
+
+        labels = 'schema="{0}",field="name",type="STRING"'.format(self.data_schema.id)
+        self.assertIn('# TYPE data_schema_conversions_total counter\n', text)
+        self.assertIn('data_schema_conversions_total{{{0}}} 1\n'.format(labels), text)
+        self.assertIn('data_schema_conversion_seconds_count{{{0}}} 1\n'.format(labels), text)
+        self.assertIn('data_schema_conversion_seconds{{{0},quantile="0.5"}}'.format(labels), text)
+        self.assertIn(
+            'data_schema_conversion_errors_total{{schema="{0}",field="count",type="INT",expected_type="INT"}} 1\n'
+            .format(self.data_schema.id), text)
+
+
+class FieldMetricsTest(TestCase):
+    def test_percentile_reservoir(self):
+        field_metrics = FieldMetrics(1, 'count', FieldSchemaType.INT, reservoir_size=10)
+        for i in range(100):
+            field_metrics.convert(int, i)
+
+        self.assertEquals(field_metrics.calls, 100)
+        self.assertEquals(len(field_metrics._latencies), 10)
+        self.assertLessEqual(field_metrics.percentile(0.5), field_metrics.percentile(0.99))
+
+    def test_percentile_empty(self):
+        self.assertIsNone(FieldMetrics(1, 'count', FieldSchemaType.INT).percentile(0.5))
@@ -0,0 +1,28 @@
+from django.db import models
+
+
+class IngestModel(models.Model):
+    """
+    A model that converted rows are loaded into in tests.
+    """
+    class Meta:
+        unique_together = ('name', 'day')
+
+    name = models.CharField(max_length=64)
+    day = models.IntegerField(default=0)
+    count = models.IntegerField(null=True)
+    score = models.FloatField(null=True)
+    active = models.BooleanField(null=True)
+    time = models.DateTimeField(null=True)
+
+
+class IngestDateModel(models.Model):
+    """
+    A model with a date in its unique key and a decimal that converted rows are loaded into in tests.
+    """
+    class Meta:
+        unique_together = ('name', 'day')
+
+    name = models.CharField(max_length=64)
+    day = models.DateField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2, null=True)
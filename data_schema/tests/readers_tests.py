@@ -0,0 +1,87 @@
+import io
+import os
+import tempfile
+
+from django.test import TestCase
+from django_dynamic_fixture import G
+
+from data_schema.compiled_schema import RowOutput
+from data_schema.field_schema_type import FieldSchemaType
+from data_schema.models import DataSchema, FieldSchema
+from data_schema.readers import CsvHeader
+
+
+class ReadCsvTest(TestCase):
+    """
+    Tests reading CSV files with DataSchema.read_csv.
+    """
+    def setUp(self):
+        self.data_schema = G(DataSchema)
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='count', field_position=2,
+            field_type=FieldSchemaType.INT, default_value='0')
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='name', field_position=0,
+            field_type=FieldSchemaType.STRING)
+        self.data_schema = DataSchema.objects.get(id=self.data_schema.id)
+
+    def test_position(self):
+        f = io.StringIO('a,ignored,1\nb,ignored,$2\nc\n')
+
+        rows = self.data_schema.read_csv(f, chunk_size=2)
+
+        self.assertEquals(list(rows), [
+            {'name': 'a', 'count': 1}, {'name': 'b', 'count': 2}, {'name': 'c', 'count': 0},
+        ])
+
+    def test_names(self):
+        f = io.StringIO('other\tcount\tname\nx\t1\ta\ny\t\tb\n')
+
+        rows = self.data_schema.read_csv(f, header=CsvHeader.NAMES, output=RowOutput.TUPLE, delimiter='\t')
+
+        self.assertEquals(list(rows), [('a', 1), ('b', 0)])
+
+    def test_blank_lines(self):
+        f = io.StringIO('a,,1\n\nb,,2\n\n')
+
+        rows = self.data_schema.read_csv(f, output=RowOutput.TUPLE)
+
+        self.assertEquals(list(rows), [('a', 1), ('b', 2)])
+
+        f = io.StringIO('\nname,count\n\na,1\n')
+        rows = self.data_schema.read_csv(f, header=CsvHeader.NAMES, output=RowOutput.TUPLE)
+        self.assertEquals(list(rows), [('a', 1)])
+
+    def test_names_missing_column(self):
+        f = io.StringIO('name\na\n')
+
+        self.assertEquals(list(self.data_schema.read_csv(f, header=CsvHeader.NAMES)), [{'name': 'a', 'count': 0}])
+
+    def test_unreferenced_columns_not_converted(self):
+        """
+        Tests that values of columns that no field references are not converted even if they are invalid.
+        """
+        f = io.StringIO('a,1.2.3,1\n')
+
+        self.assertEquals(list(self.data_schema.read_csv(f)), [{'name': 'a', 'count': 1}])
+
+    def test_path(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'rows.csv')
+            with open(path, 'w') as f:
+                f.write('a,,1\n')
+
+            self.assertEquals(list(self.data_schema.read_csv(path)), [{'name': 'a', 'count': 1}])
+
+    def test_lazy(self):
+        f = io.StringIO('a,,1\nb,,-\n')
+        rows = self.data_schema.read_csv(f, chunk_size=1)
+
+        self.assertEquals(next(rows), {'name': 'a', 'count': 1})
+        with self.assertRaises(ValueError) as ctx:
+            next(rows)
+        self.assertEquals(ctx.exception.field_key, 'count')
+
+    def test_invalid_header(self):
+        with self.assertRaises(ValueError):
+            self.data_schema.read_csv(io.StringIO(''), header='invalid')
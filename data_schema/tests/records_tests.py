@@ -0,0 +1,81 @@
+import pickle
+import sys
+
+from django.test import TestCase
+from django_dynamic_fixture import G
+
+from data_schema.field_schema_type import FieldSchemaType
+from data_schema.models import DataSchema, FieldSchema
+from data_schema.records import get_attribute_names, make_record_class
+
+
+class MakeRecordClassTest(TestCase):
+    def test_record(self):
+        record_class = make_record_class('Record', ['name', 'count'])
+        record = record_class('a', 1)
+
+        self.assertEquals((record.name, record.count), ('a', 1))
+        self.assertEquals(tuple(record), ('a', 1))
+        self.assertEquals(len(record), 2)
+        self.assertEquals(record, record_class._make(['a', 1]))
+        self.assertNotEquals(record, record_class('a', 2))
+        self.assertEquals(repr(record), "Record(name='a', count=1)")
+        self.assertFalse(hasattr(record, '__dict__'))
+
+        record.count = 2
+        self.assertEquals(record._asdict(), {'name': 'a', 'count': 2})
+        with self.assertRaises(AttributeError):
+            record.other = 1
+
+    def test_no_fields(self):
+        self.assertEquals(tuple(make_record_class('Record', [])()), ())
+
+    def test_attribute_names(self):
+        self.assertEquals(
+            get_attribute_names(['name', 'first name', 'class', '_id', '1st']), ('name', '_1', '_2', '_3', '_4'))
+
+        record = make_record_class('Record', ['first name', 'count'])('a', 1)
+        self.assertEquals(record._0, 'a')
+        self.assertEquals(record._asdict(), {'first name': 'a', 'count': 1})
+
+    def test_pickle(self):
+        record_class = make_record_class('Record', ['first name', 'count'])
+        record = record_class('a', 1)
+
+        unpickled = pickle.loads(pickle.dumps(record))
+
+        self.assertIs(unpickled.__class__, record_class)
+        self.assertEquals(unpickled, record)
+
+    def test_class_reused(self):
+        record_class = make_record_class('Record', ['name', 'count'])
+
+        self.assertIs(make_record_class('Record', ('name', 'count')), record_class)
+        self.assertIsNot(make_record_class('Record', ['name']), record_class)
+        self.assertIsNot(make_record_class('Other', ['name', 'count']), record_class)
+
+    def test_memory(self):
+        """
+        Tests that records of wide schemas use less than half the memory of dictionaries.
+        """
+        field_keys = ['field{0}'.format(i) for i in range(40)]
+        values = list(range(40))
+        record = make_record_class('Record', field_keys)._make(values)
+
+        self.assertLess(sys.getsizeof(record) * 2, sys.getsizeof(dict(zip(field_keys, values))))
+
+
+class RecordClassTest(TestCase):
+    """
+    Tests DataSchema.record_class.
+    """
+    def test_record_class(self):
+        data_schema = G(DataSchema)
+        G(FieldSchema, data_schema=data_schema, field_key='count', field_position=1, field_type=FieldSchemaType.INT)
+        G(FieldSchema, data_schema=data_schema, field_key='name', field_position=0, field_type='STRING')
+
+        record_class = data_schema.record_class()
+
+        self.assertIs(data_schema.record_class(), record_class)
+        self.assertEquals(record_class._fields, ('name', 'count'))
+        self.assertEquals(record_class.__name__, 'Record{0}'.format(data_schema.id))
@@ -0,0 +1,259 @@
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from django_dynamic_fixture import G
+from unittest.mock import patch
+
+from data_schema.cache import bump_cache_version, get_cache, get_cache_key, get_cache_version
+from data_schema.field_schema_type import FieldSchemaType
+from data_schema.models import DataSchema, FieldOption, FieldSchema
+from data_schema.registry import SchemaRegistry, schema_registry
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class SchemaRegistryTest(TestCase):
+    """
+    Tests the SchemaRegistry LRU.
+    """
+    def setUp(self):
+        get_cache().clear()
+        self.clock = FakeClock()
+        self.registry = SchemaRegistry(max_size=2, ttl=10, clock=self.clock)
+        self.content_type = ContentType.objects.get_for_model(DataSchema)
+        self.data_schemas = [G(DataSchema) for i in range(3)]
+        self.field = G(
+            FieldSchema, data_schema=self.data_schemas[0], field_key='count', field_type=FieldSchemaType.INT)
+
+    def test_get_hit(self):
+        compiled = self.registry.get(self.data_schemas[0].id)
+
+        with self.assertNumQueries(0):
+            self.assertIs(self.registry.get(self.data_schemas[0].id), compiled)
+
+        self.assertEquals(compiled.field_keys, ('count',))
+        self.assertEquals(self.registry.stats(), {'size': 1, 'hits': 1, 'misses': 1, 'evictions': 0})
+
+    def test_get_does_not_exist(self):
+        with self.assertRaises(DataSchema.DoesNotExist):
+            self.registry.get(0)
+
+    def test_lru_eviction(self):
+        self.registry.get(self.data_schemas[0].id)
+        self.registry.get(self.data_schemas[1].id)
+        # Use the first schema so that the second one is the least recently used
+        self.registry.get(self.data_schemas[0].id)
+        self.registry.get(self.data_schemas[2].id)
+
+        self.assertEquals(len(self.registry), 2)
+        self.assertEquals(self.registry.stats()['evictions'], 1)
+        self.registry.get(self.data_schemas[0].id)
+        self.assertEquals(self.registry.stats()['hits'], 2)
+        self.registry.get(self.data_schemas[1].id)
+        self.assertEquals(self.registry.stats()['misses'], 4)
+
+    def test_ttl(self):
+        self.registry.get(self.data_schemas[0].id)
+        self.clock.now = 10
+        self.registry.get(self.data_schemas[0].id)
+
+        self.assertEquals(self.registry.stats(), {'size': 1, 'hits': 0, 'misses': 2, 'evictions': 1})
+
+    def test_version_changed(self):
+        """
+        Verifies that schemas changed by other processes are reloaded once their cache version is checked
+        """
+        compiled = self.registry.get(self.data_schemas[0].id)
+        bump_cache_version(self.data_schemas[0].id)
+
+        self.assertIs(self.registry.get(self.data_schemas[0].id), compiled)
+        self.clock.now = 1
+        self.assertIsNone(self.registry.peek(self.data_schemas[0].id))
+        self.assertIsNot(self.registry.get(self.data_schemas[0].id), compiled)
+        self.assertEquals(self.registry.stats(), {'size': 1, 'hits': 1, 'misses': 2, 'evictions': 1})
+
+    def test_version_unchanged(self):
+        compiled = self.registry.get(self.data_schemas[0].id)
+        self.clock.now = 1
+
+        with self.assertNumQueries(0):
+            self.assertIs(self.registry.get(self.data_schemas[0].id), compiled)
+        self.assertIs(self.registry.peek(self.data_schemas[0].id), compiled)
+        self.assertEquals(self.registry.stats(), {'size': 1, 'hits': 2, 'misses': 1, 'evictions': 0})
+
+    def test_version_check_interval(self):
+        registry = SchemaRegistry(version_check_interval=0, clock=self.clock)
+        compiled = registry.get(self.data_schemas[0].id)
+
+        self.assertIsNone(registry.peek(self.data_schemas[0].id))
+        self.assertIs(registry.get(self.data_schemas[0].id), compiled)
+
+    def test_invalidated_while_checking_version(self):
+        compiled = self.registry.get(self.data_schemas[0].id)
+        self.clock.now = 1
+
+        def get_cache_version_and_invalidate(pk):
+            self.registry.invalidate(pk)
+            return get_cache_version(pk)
+
+        with patch('data_schema.registry.get_cache_version', side_effect=get_cache_version_and_invalidate):
+            self.assertIsNot(self.registry.get(self.data_schemas[0].id), compiled)
+
+    def test_get_for_content_type_version_checked(self):
+        data_schema = G(DataSchema, model_content_type=self.content_type)
+        compiled = self.registry.get_for_content_type(self.content_type)
+        self.clock.now = 1
+
+        with self.assertNumQueries(0):
+            self.assertIs(self.registry.get_for_content_type(self.content_type), compiled)
+
+        bump_cache_version(data_schema.id)
+        self.clock.now = 2
+        self.assertIsNot(self.registry.get_for_content_type(self.content_type), compiled)
+
+    def test_get_for_content_type(self):
+        data_schema = G(DataSchema, model_content_type=self.content_type)
+
+        compiled = self.registry.get_for_content_type(self.content_type)
+        with self.assertNumQueries(0):
+            self.assertIs(self.registry.get_for_content_type(self.content_type.id), compiled)
+            self.assertIs(self.registry.get(data_schema.id), compiled)
+
+        self.registry.invalidate(data_schema.id)
+        self.assertIsNot(self.registry.get_for_content_type(self.content_type), compiled)
+
+    def test_get_for_content_type_does_not_exist(self):
+        with self.assertRaises(DataSchema.DoesNotExist):
+            self.registry.get_for_content_type(self.content_type)
+
+    def test_invalidate_field_schema(self):
+        compiled = self.registry.get(self.data_schemas[0].id)
+        self.registry.get(self.data_schemas[1].id)
+
+        self.registry.invalidate_field_schema(self.field.id)
+
+        self.assertEquals(len(self.registry), 1)
+        self.assertIsNot(self.registry.get(self.data_schemas[0].id), compiled)
+
+    def test_invalidated_while_loading(self):
+        """
+        Verifies that a schema that is invalidated while it is loaded is returned but not registered
+        """
+        get_cached = DataSchema.objects.get_cached
+
+        def get_cached_and_invalidate(pk):
+            data_schema = get_cached(pk)
+            self.registry.invalidate(pk)
+            return data_schema
+
+        with patch.object(DataSchema.objects, 'get_cached', side_effect=get_cached_and_invalidate):
+            compiled = self.registry.get(self.data_schemas[0].id)
+
+        self.assertEquals(compiled.field_keys, ('count',))
+        self.assertEquals(len(self.registry), 0)
+        self.assertIsNot(self.registry.get(self.data_schemas[0].id), compiled)
+        self.assertEquals(len(self.registry), 1)
+
+    def test_field_schema_invalidated_while_loading(self):
+        get_cached = DataSchema.objects.get_cached
+
+        def get_cached_and_invalidate(pk):
+            data_schema = get_cached(pk)
+            self.registry.invalidate_field_schema(self.field.id)
+            return data_schema
+
+        with patch.object(DataSchema.objects, 'get_cached', side_effect=get_cached_and_invalidate):
+            self.registry.get(self.data_schemas[0].id)
+
+        self.assertEquals(len(self.registry), 0)
+
+    def test_clear(self):
+        self.registry.get(self.data_schemas[0].id)
+        self.registry.clear()
+        self.assertEquals(self.registry.stats(), {'size': 0, 'hits': 0, 'misses': 0, 'evictions': 0})
+
+
+class SchemaRegistrySignalsTest(TestCase):
+    """
+    Tests that the default registry and the shared cache are invalidated by signals.
+    """
+    def setUp(self):
+        get_cache().clear()
+        schema_registry.clear()
+        self.data_schema = G(DataSchema)
+        self.field = G(
+            FieldSchema, data_schema=self.data_schema, field_key='name', field_type=FieldSchemaType.STRING)
+        self.compiled = DataSchema.objects.get_compiled(self.data_schema.id)
+
+    def assertInvalidated(self):
+        self.assertIsNot(DataSchema.objects.get_compiled(self.data_schema.id), self.compiled)
+
+    def test_get_compiled(self):
+        self.assertIs(DataSchema.objects.get_compiled(self.data_schema.id), self.compiled)
+
+    def test_get_compiled_content_type(self):
+        content_type = ContentType.objects.get_for_model(FieldSchema)
+        data_schema = G(DataSchema, model_content_type=content_type)
+
+        self.assertEquals(
+            DataSchema.objects.get_compiled(model_content_type=content_type),
+            DataSchema.objects.get_compiled(data_schema.id))
+
+    def test_not_invalidated_before_commit(self):
+        cache_key = get_cache_key(self.data_schema.id)
+
+        with self.captureOnCommitCallbacks(execute=False):
+            self.data_schema.save()
+
+        self.assertIs(DataSchema.objects.get_compiled(self.data_schema.id), self.compiled)
+        self.assertEquals(get_cache_key(self.data_schema.id), cache_key)
+
+    def test_data_schema_saved(self):
+        cache_key = get_cache_key(self.data_schema.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data_schema.save()
+
+        self.assertInvalidated()
+        self.assertNotEquals(get_cache_key(self.data_schema.id), cache_key)
+
+    def test_field_schema_saved(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            G(FieldSchema, data_schema=self.data_schema, field_key='other', field_type=FieldSchemaType.STRING)
+
+        self.assertInvalidated()
+        self.assertEquals(DataSchema.objects.get_compiled(self.data_schema.id).field_keys, ('name', 'other'))
+
+    def test_field_schema_deleted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.field.delete()
+
+        self.assertInvalidated()
+
+    def test_field_option_saved(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            G(FieldOption, field_schema=self.field, value='a')
+
+        self.assertInvalidated()
+
+    def test_field_option_deleted_with_field(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            G(FieldOption, field_schema=self.field, value='a')
+        self.compiled = DataSchema.objects.get_compiled(self.data_schema.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            FieldSchema.objects.filter(id=self.field.id).delete()
+
+        self.assertInvalidated()
+        self.assertEquals(DataSchema.objects.get_compiled(self.data_schema.id).field_keys, ())
+
+    def test_update(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.data_schema.update(fieldschema_set=[])
+
+        self.assertInvalidated()
@@ -0,0 +1,106 @@
+import json
+import pickle
+import sys
+
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from django_dynamic_fixture import G
+from unittest.mock import patch
+
+from data_schema.field_schema_type import FieldSchemaCase, FieldSchemaType
+from data_schema.models import DataSchema, FieldOption, FieldSchema
+from data_schema.snapshot import SNAPSHOT_VERSION, DataSchemaSnapshot, SnapshotFormat
+
+
+class DataSchemaSnapshotTest(TestCase):
+    """
+    Tests serializing and loading schema snapshots.
+    """
+    def setUp(self):
+        self.data_schema = G(DataSchema, model_content_type=ContentType.objects.get_for_model(FieldSchema))
+        G(
+            FieldSchema, data_schema=self.data_schema, field_key='name', field_position=0,
+            field_type=FieldSchemaType.STRING, transform_case=FieldSchemaCase.UPPER, uniqueness_order=1)
+        status = G(
+            FieldSchema, data_schema=self.data_schema, field_key='status', field_position=1,
+            field_type=FieldSchemaType.INT, has_options=True, default_value='1')
+        G(FieldOption, field_schema=status, value='1')
+        G(FieldOption, field_schema=status, value='2')
+        self.data_schema = DataSchema.objects.get(id=self.data_schema.id)
+
+    def assert_snapshot(self, snapshot):
+        self.assertEquals(snapshot.schema_id, self.data_schema.id)
+        self.assertEquals(snapshot.model_content_type, ('data_schema', 'fieldschema'))
+        self.assertEquals(snapshot.field_keys, ('name', 'status'))
+        self.assertEquals(snapshot.get_fields(), self.data_schema.compile().get_fields())
+        self.assertEquals([field.field_key for field in snapshot.get_unique_fields()], ['name'])
+        self.assertEquals(snapshot.get_value(['a', None], 'name'), 'A')
+        self.assertEquals(snapshot.get_value({'status': None}, 'status'), 1)
+
+    def test_json(self):
+        data = self.data_schema.to_snapshot().to_bytes()
+
+        self.assertEquals(json.loads(data)['version'], SNAPSHOT_VERSION)
+        self.assert_snapshot(DataSchemaSnapshot.from_bytes(data))
+
+    def test_msgpack(self):
+        data = self.data_schema.to_snapshot().to_bytes(format=SnapshotFormat.MSGPACK)
+
+        self.assert_snapshot(DataSchemaSnapshot.from_bytes(data))
+        self.assert_snapshot(DataSchemaSnapshot.from_bytes(data, format=SnapshotFormat.MSGPACK))
+
+    def test_load_without_queries(self):
+        data = self.data_schema.to_snapshot().to_bytes()
+
+        with self.assertNumQueries(0):
+            snapshot = DataSchemaSnapshot.from_bytes(data)
+            snapshot.get_value({'status': '2'}, 'status')
+
+    def test_no_content_type(self):
+        snapshot = G(DataSchema).to_snapshot()
+
+        self.assertIsNone(DataSchemaSnapshot.from_bytes(snapshot.to_bytes()).model_content_type)
+
+    def test_set_value(self):
+        snapshot = DataSchemaSnapshot.from_bytes(self.data_schema.to_snapshot().to_bytes())
+        obj = {}
+        snapshot.set_value(obj, 'status', 2)
+        row = [None, None]
+        snapshot.set_value(row, 'name', 'a')
+
+        self.assertEquals(obj, {'status': 2})
+        self.assertEquals(row, ['a', None])
+        with self.assertRaises(Exception):
+            snapshot.set_value(obj, 'status', 3)
+
+    def test_read_only(self):
+        with self.assertRaises(AttributeError):
+            self.data_schema.to_snapshot().schema_id = 1
+
+    def test_pickle(self):
+        snapshot = pickle.loads(pickle.dumps(self.data_schema.to_snapshot()))
+
+        self.assert_snapshot(snapshot)
+
+    def test_unsupported_version(self):
+        snapshot = self.data_schema.to_snapshot().to_dict()
+        snapshot['version'] = SNAPSHOT_VERSION + 1
+
+        with self.assertRaises(ValueError):
+            DataSchemaSnapshot.from_dict(snapshot)
+
+    def test_unsupported_format(self):
+        with self.assertRaises(ValueError):
+            self.data_schema.to_snapshot().to_bytes(format='xml')
+
+        with self.assertRaises(ValueError):
+            DataSchemaSnapshot.from_bytes(self.data_schema.to_snapshot().to_bytes(), format='xml')
+
+    def test_msgpack_not_installed(self):
+        data = self.data_schema.to_snapshot().to_bytes(format=SnapshotFormat.MSGPACK)
+
+        with patch.dict(sys.modules, {'msgpack': None}):
+            with self.assertRaisesRegex(ImportError, 'msgpack must be installed'):
+                self.data_schema.to_snapshot().to_bytes(format=SnapshotFormat.MSGPACK)
+            with self.assertRaisesRegex(ImportError, 'msgpack must be installed'):
+                DataSchemaSnapshot.from_bytes(data)
@@ -182,6 +182,68 @@ class DataSchemaUpdateTest(TestCase):
         self.assertTrue(fs.has_options)
         self.assertEquals(set(['option1', 'option2']), set(fs.fieldoption_set.values_list('value', flat=True)))
 
+    def get_fieldschema_set(self, num_fields, options):
+        return [{
+            'field_key': 'field{0}'.format(i),
+            'field_type': FieldSchemaType.STRING,
+            'field_position': i,
+            'fieldoption_set': options,
+        } for i in range(num_fields)]
+
+    def test_constant_queries(self):
+        """
+        Tests that the number of queries does not depend on the number of fields and options.
+        """
+        content_type = ContentType.objects.get_for_model(DataSchema)
+        # SQLite allows updating up to 90 fields per query
+        for num_fields in (10, 80):
+            ds = G(DataSchema)
+            ds.update(fieldschema_set=self.get_fieldschema_set(num_fields, ['a', 'b']))
+
+            # Update every field and create, delete and keep options. Besides the savepoint queries, this
+            # saves the data schema, fetches and updates the fields, fetches the options, deletes options
+            # (with a query for collecting them for signals) and creates options
+            with self.assertNumQueries(9):
+                ds.update(
+                    model_content_type=content_type,
+                    fieldschema_set=[
+                        dict(values, field_position=values['field_position'] + 1)
+                        for values in self.get_fieldschema_set(num_fields, ['b', 'c'])
+                    ])
+
+            self.assertEquals(FieldOption.objects.filter(field_schema__data_schema=ds).count(), num_fields * 2)
+            self.assertEquals(
+                set(FieldOption.objects.filter(field_schema__data_schema=ds).values_list('value', flat=True)),
+                set(['b', 'c']))
+            self.assertEquals(ds.fieldschema_set.get(field_key='field9').field_position, 10)
+
+    def test_no_changes(self):
+        """
+        Tests that updating a schema with the values it already has does not write anything.
+        """
+        ds = G(DataSchema)
+        G(
+            FieldSchema, data_schema=ds, field_key='count', field_type=FieldSchemaType.INT, display_name='',
+            uniqueness_order=None, field_position=None, field_format=None, default_value=None,
+            has_options=False, transform_case=None)
+        fieldschema_set = self.get_fieldschema_set(2, ['a', 'b']) + [{'field_key': 'count', 'field_type': 'INT'}]
+        self.assertTrue(ds.update(fieldschema_set=fieldschema_set))
+
+        # Only the fields and options are read within a savepoint
+        with self.captureOnCommitCallbacks() as callbacks, self.assertNumQueries(4):
+            self.assertFalse(ds.update(fieldschema_set=fieldschema_set))
+        self.assertEquals(callbacks, [])
+
+    def test_clears_cached_fields(self):
+        ds = G(DataSchema)
+        G(FieldSchema, data_schema=ds, field_key='old', field_type=FieldSchemaType.STRING)
+        self.assertEquals(ds.compile().field_keys, ('old',))
+
+        ds.update(fieldschema_set=[{'field_key': 'new', 'field_type': FieldSchemaType.STRING}])
+
+        self.assertEquals([f.field_key for f in ds.get_fields()], ['new'])
+        self.assertEquals(ds.compile().field_keys, ('new',))
+
 
 class DataSchemaTest(TestCase):
     """
@@ -1046,3 +1108,94 @@ class FieldOptionTest(TestCase):
         }
         field_schema.set_value(item, 1)
         self.assertEqual(1, item['my_key'])
+
+    def test_option_values_cached(self):
+        """
+        The converted option values of prefetched options should only be built once
+        """
+        field_schema = G(FieldSchema, field_type=FieldSchemaType.INT, field_key='my_key', has_options=True)
+        G(FieldOption, field_schema=field_schema, value='1')
+        G(FieldOption, field_schema=field_schema, value='2')
+        field_schema = FieldSchema.objects.prefetch_related('fieldoption_set').get(id=field_schema.id)
+
+        self.assertEqual(field_schema.get_option_values(), frozenset([1, 2]))
+        with self.assertNumQueries(0), patch.object(FieldSchema, 'get_value', spec_set=True) as get_value_mock:
+            field_schema.set_value({}, 1)
+            self.assertEqual(field_schema.get_option_values(), frozenset([1, 2]))
+            self.assertFalse(get_value_mock.called)
+
+    def test_option_values_not_prefetched(self):
+        """
+        Options that are not prefetched should be read every time, so options created elsewhere are valid
+        """
+        data_schema = G(DataSchema)
+        field_schema = G(
+            FieldSchema, data_schema=data_schema, field_type=FieldSchemaType.STRING, field_key='my_key',
+            has_options=True)
+        G(FieldOption, field_schema=field_schema, value='a')
+        field_schema.set_value({}, 'a')
+
+        data_schema.update(fieldschema_set=[{
+            'field_key': 'my_key',
+            'field_type': FieldSchemaType.STRING,
+            'fieldoption_set': ['a', 'b'],
+        }])
+        field_schema.set_value({}, 'b')
+
+        FieldOption.objects.create(field_schema_id=field_schema.id, value='c')
+        field_schema.set_value({}, 'c')
+
+    def test_option_values_cleared(self):
+        """
+        The cached option values should be cleared when an option of the field schema changes
+        """
+        field_schema = G(FieldSchema, field_type=FieldSchemaType.INT, field_key='my_key', has_options=True)
+        G(FieldOption, field_schema=field_schema, value='1')
+        self.assertEqual(field_schema.get_option_values(), frozenset([1]))
+
+        field_option = field_schema.fieldoption_set.create(value='2')
+        self.assertEqual(field_schema.get_option_values(), frozenset([1, 2]))
+
+        field_option.delete()
+        self.assertEqual(field_schema.get_option_values(), frozenset([1]))
+
+    def test_set_value_prefetched_options(self):
+        """
+        Setting values should not query options of schemas loaded with the model manager
+        """
+        data_schema = G(DataSchema)
+        field_schema = G(
+            FieldSchema, data_schema=data_schema, field_type=FieldSchemaType.STRING, field_key='my_key',
+            has_options=True)
+        G(FieldOption, field_schema=field_schema, value='one')
+
+        data_schema = DataSchema.objects.get(id=data_schema.id)
+        with self.assertNumQueries(0):
+            data_schema.set_value({}, 'my_key', 'one')
+
+    def test_validate_options(self):
+        """
+        Validating a list of values should return the indices of the invalid values
+        """
+        data_schema = G(DataSchema)
+        field_schema = G(
+            FieldSchema, data_schema=data_schema, field_type=FieldSchemaType.INT, field_key='my_key',
+            has_options=True)
+        G(FieldOption, field_schema=field_schema, value='1')
+        G(FieldOption, field_schema=field_schema, value='2')
+
+        self.assertEqual(field_schema.validate_options([1, 3, 2, '1', None]), [1, 3, 4])
+        self.assertEqual(data_schema.validate_options('my_key', [2, 5]), [1])
+        self.assertEqual(data_schema.compile().validate_options('my_key', [2, 5]), [1])
+
+    def test_validate_options_no_options(self):
+        """
+        All values should be valid for fields without options
+        """
+        data_schema = G(DataSchema)
+        field_schema = G(
+            FieldSchema, data_schema=data_schema, field_type=FieldSchemaType.INT, field_key='my_key',
+            has_options=False)
+
+        self.assertEqual(field_schema.validate_options([1, 'a']), [])
+        self.assertEqual(data_schema.compile().validate_options('my_key', [1, 'a']), [])
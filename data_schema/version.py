@@ -1 +1 @@
-__version__ = '2.1.0'
+__version__ = '2.2.0'